@@ -2,18 +2,126 @@
 
 from __future__ import annotations
 
+import threading
 import time
-from typing import Iterable
+from contextlib import closing
+from datetime import date, timedelta
+from typing import Iterable, Iterator
 from xml.etree import ElementTree as ET
 
-import requests
-
 from papyr.adapters.base import Provider
 from papyr.core.models import PaperRecord, ProviderState, RateLimitPolicy, RawRecord, SearchQuery
-from papyr.core.rate_limit import RateLimiter
+from papyr.core.http import get_with_retries
+from papyr.core.prefetch import PAGE_END, PageStream, merge_streams, stream_pages
+from papyr.core.pushdown import accepted_types, search_fields
+from papyr.core.rate_limit import AdaptivePacer, rate_limit_store_path, shared_limiter
+from papyr.util.config import config_int
 from papyr.util.time import now_iso
 
 
+_QUERY_URL = "https://export.arxiv.org/api/query"
+_ATOM = "{http://www.w3.org/2005/Atom}"
+_ENTRY = f"{_ATOM}entry"
+_ID = f"{_ATOM}id"
+_TITLE = f"{_ATOM}title"
+_SUMMARY = f"{_ATOM}summary"
+_PUBLISHED = f"{_ATOM}published"
+_AUTHOR = f"{_ATOM}author"
+_NAME = f"{_ATOM}name"
+_TOTAL_RESULTS = "{http://a9.com/-/spec/opensearch/1.1/}totalResults"
+_CHUNK_SIZE = 64 * 1024
+_FIELD_PREFIXES = {"title": "ti", "abstract": "abs", "authors": "au"}
+# Every arXiv result is an open-access preprint.
+_ARXIV_TYPES = {"preprint", "posted-content"}
+
+ARXIV_FIRST_YEAR = 1991
+# Windows are opt-in: windowed runs return the oldest submissions first rather
+# than the most relevant ones, which changes what a result limit selects.
+DEFAULT_WINDOW_RESULTS = 0
+DEFAULT_PAGE_SIZE = 200
+MAX_PAGE_SIZE = 2000
+
+
+def _page_size(query: SearchQuery) -> int:
+    return min(MAX_PAGE_SIZE, max(1, config_int(query.extra, "arxiv_page_size", DEFAULT_PAGE_SIZE)))
+
+
+def _window_query(expression: str, start: date, end: date) -> str:
+    """arXiv search expression restricted to submissions between `start` and `end` (inclusive)."""
+    return f"{expression} AND submittedDate:[{start:%Y%m%d}0000 TO {end:%Y%m%d}2359]"
+
+
+def _date_range(query: SearchQuery) -> tuple[date, date]:
+    first = date(int(query.year_start or ARXIV_FIRST_YEAR), 1, 1)
+    last = date(int(query.year_end), 12, 31) if query.year_end else date.today()
+    return first, last
+
+
+def search_expression(query: SearchQuery) -> str:
+    """Keyword expression, scoped with `ti:`/`abs:`/`au:` prefixes when the search fields allow it.
+
+    Every keyword must match within one field; the fields are OR-ed.
+    """
+    fields = search_fields(query)
+    terms = query.keywords.split()
+    if not fields or not terms or not set(fields) <= set(_FIELD_PREFIXES):
+        return f"all:{query.keywords}"
+    clauses = [" AND ".join(f"{_FIELD_PREFIXES[field]}:{term}" for term in terms) for field in fields]
+    if len(clauses) == 1 and len(terms) == 1:
+        return clauses[0]
+    return "(" + " OR ".join(f"({clause})" for clause in clauses) + ")"
+
+
+def iter_entries(chunks: Iterable[bytes]) -> Iterator[dict]:
+    """Parse Atom feed bytes incrementally, yielding each entry as soon as it closes.
+
+    Parsed elements are dropped after every entry, so memory stays flat no
+    matter how large the page is.
+    """
+    parser = ET.XMLPullParser(events=("start", "end"))
+    root = None
+    for chunk in chunks:
+        parser.feed(chunk)
+        for event, elem in parser.read_events():
+            if event == "start":
+                if root is None:
+                    root = elem
+                continue
+            if elem.tag == _ENTRY:
+                yield _entry_data(elem)
+                root.clear()
+    parser.close()
+
+
+def total_results(chunks: Iterable[bytes]) -> int:
+    """Read `opensearch:totalResults` from a feed, stopping as soon as it is parsed."""
+    parser = ET.XMLPullParser(events=("end",))
+    for chunk in chunks:
+        parser.feed(chunk)
+        for _event, elem in parser.read_events():
+            if elem.tag == _TOTAL_RESULTS:
+                return int((elem.text or "0").strip() or 0)
+    return 0
+
+
+def _entry_data(entry: ET.Element) -> dict:
+    data = {"title": "", "summary": "", "authors": [], "published": "", "arxiv_id": "", "url": ""}
+    for child in entry:
+        if child.tag == _ID:
+            arxiv_url = (child.text or "").strip()
+            data["url"] = arxiv_url
+            data["arxiv_id"] = arxiv_url.rsplit("/", 1)[-1] if arxiv_url else ""
+        elif child.tag == _TITLE:
+            data["title"] = (child.text or "").strip()
+        elif child.tag == _SUMMARY:
+            data["summary"] = (child.text or "").strip()
+        elif child.tag == _PUBLISHED:
+            data["published"] = child.text or ""
+        elif child.tag == _AUTHOR:
+            data["authors"].append(child.findtext(_NAME, default=""))
+    return data
+
+
 class ArxivProvider(Provider):
     name = "arXiv"
     requires_credentials = False
@@ -28,84 +136,230 @@ class ArxivProvider(Provider):
     def rate_limit_policy(self) -> RateLimitPolicy:
         return RateLimitPolicy(min_delay_seconds=3.0)
 
+    def pushdown(self, query: SearchQuery, state: ProviderState) -> set[str]:
+        # Type and access constraints are all-or-nothing for arXiv: `search`
+        # returns nothing when they exclude preprints or open access.
+        pushed = {"types", "access"}
+        if not self._windowed(query, state) and self._offset_query(query, state) == f"all:{query.keywords}":
+            return pushed
+        pushed.add("years")
+        if search_expression(query) != f"all:{query.keywords}":
+            pushed.add("fields")
+        return pushed
+
     def search(self, query: SearchQuery, state: ProviderState) -> Iterable[RawRecord]:
+        if query.access_filter == "closed":
+            return
+        if accepted_types(query) and not accepted_types(query) & _ARXIV_TYPES:
+            return
+        policy = self.rate_limit_policy()
+        limiter = shared_limiter(self.name, policy, rate_limit_store_path(query.extra))
+        pacer = AdaptivePacer(limiter, policy, state.extra.get("pacing"))
+        if self._windowed(query, state):
+            window_results = config_int(query.extra, "arxiv_window_results", DEFAULT_WINDOW_RESULTS)
+            yield from self._search_windows(query, state, pacer, window_results)
+        else:
+            yield from self._search_offset(query, state, pacer)
+
+    def _windowed(self, query: SearchQuery, state: ProviderState) -> bool:
+        # Runs started with a single offset cursor keep it, so resume stays exact.
+        # Incremental refresh passes only read the newest pages, so they skip
+        # window planning and page the whole date range by offset.
+        if state.extra.get("refresh"):
+            return False
+        window_results = config_int(query.extra, "arxiv_window_results", DEFAULT_WINDOW_RESULTS)
+        return "windows" in state.extra or (window_results > 0 and not state.cursor)
+
+    def _offset_query(self, query: SearchQuery, state: ProviderState) -> str:
+        """Search expression for an offset run, scoped to the query's fields and dates.
+
+        The expression is kept in `state.extra["search_query"]` so a resumed
+        cursor pages the same result list. Cursors saved before it was kept
+        page the unscoped keywords they started with.
+        """
+        if "search_query" in state.extra:
+            return state.extra["search_query"]
+        if state.cursor:
+            return f"all:{query.keywords}"
+        return _window_query(search_expression(query), *_date_range(query))
+
+    def _search_offset(
+        self, query: SearchQuery, state: ProviderState, pacer: AdaptivePacer
+    ) -> Iterable[RawRecord]:
         start = int(state.cursor or "0")
         remaining = query.limit
-        limiter = RateLimiter(self.rate_limit_policy())
-        max_retries = 4
-        while True:
-            max_results = 100
-            if remaining is not None:
-                max_results = min(100, remaining)
+        depth = config_int(query.extra, "prefetch_pages", 1)
+        page_size = _page_size(query)
+        requested = 0
+        search_query = self._offset_query(query, state)
+        state.extra["search_query"] = search_query
+
+        def fetch_page(offset: int) -> PageStream:
+            nonlocal requested
+            max_results = page_size
+            if query.limit is not None:
+                max_results = min(page_size, query.limit - requested)
                 if max_results <= 0:
-                    break
-            if max_results > 50:
-                max_results = 50
-            search_query = f"all:{query.keywords}"
-            params = {
-                "search_query": search_query,
-                "start": start,
-                "max_results": max_results,
-            }
-            limiter.wait()
-            last_exc: Exception | None = None
-            for attempt in range(1, max_retries + 1):
-                try:
-                    resp = requests.get(
-                        "https://export.arxiv.org/api/query",
-                        params=params,
-                        timeout=45,
-                    )
-                    if resp.status_code == 429 or resp.status_code >= 500:
-                        backoff = 3.0 * attempt
-                        time.sleep(backoff)
-                        last_exc = requests.HTTPError(
-                            f"{resp.status_code} error for url: {resp.url}", response=resp
-                        )
-                        continue
-                    resp.raise_for_status()
-                    last_exc = None
-                    break
-                except (requests.Timeout, requests.ConnectionError) as exc:
-                    backoff = 3.0 * attempt
-                    time.sleep(backoff)
-                    last_exc = exc
-            if last_exc:
-                raise last_exc
-            root = ET.fromstring(resp.text)
-            ns = {"atom": "http://www.w3.org/2005/Atom"}
-            entries = root.findall("atom:entry", ns)
-            if not entries:
-                break
-            for entry in entries:
-                arxiv_url = entry.findtext("atom:id", default="", namespaces=ns)
-                arxiv_id = arxiv_url.rsplit("/", 1)[-1] if arxiv_url else ""
-                title = entry.findtext("atom:title", default="", namespaces=ns)
-                summary = entry.findtext("atom:summary", default="", namespaces=ns)
-                authors = [
-                    a.findtext("atom:name", default="", namespaces=ns)
-                    for a in entry.findall("atom:author", ns)
-                ]
-                published = entry.findtext("atom:published", default="", namespaces=ns)
-                data = {
-                    "title": title.strip(),
-                    "summary": summary.strip(),
-                    "authors": authors,
-                    "published": published,
-                    "arxiv_id": arxiv_id,
-                    "url": arxiv_url,
-                }
-                yield RawRecord(provider=self.name, data=data, record_id=arxiv_id)
+                    return None
+            count = 0
+            for raw in self._fetch_entries(search_query, offset, max_results, pacer, query.sort_order):
+                count += 1
+                yield raw
+            requested += count
+            return offset + count
+
+        # Records are handed over as each entry is parsed; the cursor only
+        # moves once the whole page was consumed, so resume stays exact.
+        for raw, next_start in stream_pages(fetch_page, start, max(0, depth) * page_size):
+            if raw is not PAGE_END:
+                yield raw
                 if remaining is not None:
                     remaining -= 1
-                    if remaining <= 0:
-                        break
-            start += len(entries)
-            state.cursor = str(start)
+                continue
+            if next_start is not None:
+                state.cursor = str(next_start)
             state.last_request_time = time.time()
+            state.extra["pacing"] = pacer.snapshot()
+            state.checkpoint()
             if remaining is not None and remaining <= 0:
                 break
 
+    def _search_windows(
+        self, query: SearchQuery, state: ProviderState, pacer: AdaptivePacer, window_results: int
+    ) -> Iterable[RawRecord]:
+        """Page `submittedDate` windows of at most `window_results` results each.
+
+        Every window is paged with its own offset, so no request goes deeper
+        than `window_results`. The plan and the per-window offsets live in
+        `state.extra["windows"]`; windows run `arxiv_window_workers` at a time
+        through the shared arXiv limiter, or newest first one at a time for
+        date-sorted queries.
+        """
+        if "windows" not in state.extra:
+            state.extra["windows"] = [
+                {"from": first.isoformat(), "until": last.isoformat(), "total": total, "offset": 0, "done": False}
+                for first, last, total in self._plan_windows(query, pacer, window_results)
+            ]
+            state.checkpoint()
+        windows = [dict(window) for window in state.extra["windows"]]
+        remaining = query.limit
+        depth = config_int(query.extra, "prefetch_pages", 1)
+        workers = max(1, config_int(query.extra, "arxiv_window_workers", 2))
+        page_size = _page_size(query)
+        lock = threading.Lock()
+        requested = 0
+
+        def window_fetcher(window: dict):
+            search_query = _window_query(
+                search_expression(query), date.fromisoformat(window["from"]), date.fromisoformat(window["until"])
+            )
+
+            total = window.get("total")
+
+            def fetch_page(offset: int) -> PageStream:
+                nonlocal requested
+                if total is not None and offset >= total:
+                    return offset
+                max_results = page_size
+                with lock:
+                    if query.limit is not None:
+                        max_results = min(page_size, query.limit - requested)
+                        if max_results <= 0:
+                            return None
+                    requested += max_results
+                count = 0
+                try:
+                    for raw in self._fetch_entries(search_query, offset, max_results, pacer, query.sort_order):
+                        count += 1
+                        yield raw
+                finally:
+                    with lock:
+                        requested -= max_results - count
+                return offset + count
+
+            return fetch_page
+
+        pending = [idx for idx, window in enumerate(windows) if not window["done"]]
+        if query.sort_order == "date":
+            # Newest window first, one at a time, so records arrive newest first.
+            pending.reverse()
+            workers = 1
+        for batch_start in range(0, len(pending), workers):
+            sources = {
+                idx: (window_fetcher(windows[idx]), int(windows[idx]["offset"]))
+                for idx in pending[batch_start : batch_start + workers]
+            }
+            counts = dict.fromkeys(sources, 0)
+            buffer = max(1, depth) * page_size * len(sources)
+            for idx, raw, next_offset in merge_streams(sources, buffer):
+                if raw is not PAGE_END:
+                    yield raw
+                    counts[idx] += 1
+                    if remaining is not None:
+                        remaining -= 1
+                    continue
+                window = dict(windows[idx])
+                if not counts[idx]:
+                    # None means the run limit stopped the window, not its end.
+                    window["done"] = next_offset is not None
+                elif next_offset is not None:
+                    window["offset"] = next_offset
+                counts[idx] = 0
+                windows[idx] = window
+                state.extra["windows"] = [dict(item) for item in windows]
+                state.last_request_time = time.time()
+                state.extra["pacing"] = pacer.snapshot()
+                state.checkpoint()
+                if remaining is not None and remaining <= 0:
+                    return
+
+    def _plan_windows(
+        self, query: SearchQuery, pacer: AdaptivePacer, window_results: int
+    ) -> list[tuple[date, date, int | None]]:
+        """Bisect the query's date range until every window holds at most `window_results`.
+
+        Returns `(first, last, total)` per window; `total` is None when no count was needed.
+        """
+        first, last = _date_range(query)
+        if query.limit is not None and query.limit <= window_results:
+            return [(first, last, None)]
+        windows: list[tuple[date, date, int | None]] = []
+        stack = [(first, last)]
+        while stack:
+            start, end = stack.pop()
+            total = self._count(_window_query(search_expression(query), start, end), pacer)
+            if total == 0:
+                continue
+            if total <= window_results or start == end:
+                windows.append((start, end, total))
+                continue
+            middle = start + (end - start) // 2
+            stack.append((middle + timedelta(days=1), end))
+            stack.append((start, middle))
+        return windows or [(first, last, 0)]
+
+    def _count(self, search_query: str, pacer: AdaptivePacer) -> int:
+        params = {"search_query": search_query, "start": 0, "max_results": 0}
+        resp = get_with_retries(_QUERY_URL, params, pacer, transport=self.http, timeout=45, stream=True)
+        with closing(resp):
+            return total_results(resp.iter_content(_CHUNK_SIZE))
+
+    def _fetch_entries(
+        self, search_query: str, offset: int, max_results: int, pacer: AdaptivePacer, sort_order: str
+    ) -> Iterator[RawRecord]:
+        """Stream the records of one result page, each as soon as its entry is parsed."""
+        params = {
+            "search_query": search_query,
+            "start": offset,
+            "max_results": max_results,
+        }
+        if sort_order == "date":
+            params.update({"sortBy": "submittedDate", "sortOrder": "descending"})
+        resp = get_with_retries(_QUERY_URL, params, pacer, transport=self.http, timeout=45, stream=True)
+        with closing(resp):
+            for data in iter_entries(resp.iter_content(_CHUNK_SIZE)):
+                yield RawRecord(provider=self.name, data=data, record_id=data["arxiv_id"])
+
     def normalize(self, raw: RawRecord) -> PaperRecord:
         data = raw.data
         authors = []
@@ -2,9 +2,11 @@
 
 from __future__ import annotations
 
+import asyncio
 from abc import ABC, abstractmethod
-from typing import Iterable
+from typing import AsyncIterator, Iterable
 
+from papyr.core.http import HttpTransport, default_transport
 from papyr.core.models import PaperRecord, ProviderState, RawRecord, RateLimitPolicy, SearchQuery
 
 
@@ -14,6 +16,14 @@ class Provider(ABC):
     name: str
     requires_credentials: bool
     credential_fields: list[str]
+    transport: HttpTransport | None = None
+    # Whether `search` honours `state.extra["delta_since"]` (see `PAPYR_SYNC`).
+    delta_sync: bool = False
+
+    @property
+    def http(self) -> HttpTransport:
+        """Transport for this provider's requests (shared pooled sessions)."""
+        return self.transport or default_transport()
 
     @abstractmethod
     def is_configured(self, config: dict[str, str]) -> bool:
@@ -27,6 +37,34 @@ class Provider(ABC):
     def search(self, query: SearchQuery, state: ProviderState) -> Iterable[RawRecord]:
         raise NotImplementedError
 
+    def pushdown(self, query: SearchQuery, state: ProviderState) -> set[str]:
+        """Constraints (see `papyr.core.pushdown.CONSTRAINTS`) this provider enforces server-side.
+
+        Requested constraints not listed here are applied locally to the
+        normalized records.
+        """
+        return set()
+
+    async def asearch(self, query: SearchQuery, state: ProviderState) -> AsyncIterator[RawRecord]:
+        """Async counterpart of `search`.
+
+        The default drives the sync generator from a worker thread, so blocking
+        HTTP calls and rate-limit sleeps never stall the event loop. Adapters
+        with native async I/O can override this.
+        """
+        iterator = iter(self.search(query, state))
+        done = object()
+        try:
+            while True:
+                raw = await asyncio.to_thread(next, iterator, done)
+                if raw is done:
+                    break
+                yield raw
+        finally:
+            close = getattr(iterator, "close", None)
+            if close is not None:
+                await asyncio.to_thread(close)
+
     @abstractmethod
     def normalize(self, raw: RawRecord) -> PaperRecord:
         raise NotImplementedError
@@ -2,21 +2,220 @@
 
 from __future__ import annotations
 
+import logging
+import math
+import threading
 import time
-from typing import Iterable
+from collections import deque
+from typing import Any, Callable, Iterable
 
 import requests
 
 from papyr.adapters.base import Provider
 from papyr.core.models import PaperRecord, ProviderState, RateLimitPolicy, RawRecord, SearchQuery
-from papyr.core.rate_limit import RateLimiter
+from papyr.core.http import from_cache, get_with_retries
+from papyr.core.prefetch import merge_pages, prefetch_pages
+from papyr.core.pushdown import accepted_types, language_codes, search_fields
+from papyr.core.rate_limit import AdaptivePacer, rate_limit_store_path, shared_limiter
+from papyr.util.config import config_float, config_int
 from papyr.util.time import now_iso
 
 
+_WORKS_URL = "https://api.crossref.org/works"
+
+logger = logging.getLogger(__name__)
+
+# PaperRecord fields and the Crossref work elements `normalize` builds them
+# from. The `select` projection is derived from this map, so a new element
+# read by `normalize` must be declared here.
+FIELD_MAP: dict[str, tuple[str, ...]] = {
+    "authors": ("author",),
+    "title": ("title",),
+    "abstract": ("abstract",),
+    "volume": ("volume",),
+    "issue": ("issue",),
+    "pages": ("page",),
+    "publisher": ("publisher",),
+    "month": ("issued",),
+    "year": ("issued",),
+    "type": ("type",),
+    "keywords": ("subject",),
+    "citations": ("is-referenced-by-count",),
+    "id": ("DOI", "ISBN"),
+    "url": ("DOI", "URL"),
+    "license": ("license",),
+    "score": ("score",),
+}
+
+# Work types Crossref accepts in `type` filters; aliases outside this set are dropped.
+CROSSREF_TYPES = {
+    "book",
+    "book-chapter",
+    "book-part",
+    "book-section",
+    "component",
+    "dataset",
+    "dissertation",
+    "edited-book",
+    "journal-article",
+    "monograph",
+    "other",
+    "peer-review",
+    "posted-content",
+    "proceedings-article",
+    "reference-book",
+    "reference-entry",
+    "report",
+    "standard",
+}
+
+# `SearchQuery.sort_order` values and the Crossref sort keys they map to; relevance is the default.
+_SORT_KEYS = {"date": "published", "citations": "is-referenced-by-count"}
+
+# Works per DOI-only page when fast-forwarding a fresh cursor (Crossref's maximum).
+_FAST_FORWARD_ROWS = 1000
+
+# Scores in the rolling mean the relevance cutoff compares against its threshold.
+DEFAULT_SCORE_WINDOW = 20
+
+SELECT_FIELDS = ",".join(sorted({element for elements in FIELD_MAP.values() for element in elements}))
+
+
+def balanced_year_ranges(counts: dict[int, int], start: int, end: int, count: int) -> list[tuple[int, int]]:
+    """Split `start..end` into at most `count` contiguous year ranges of similar total `counts`."""
+    total = sum(counts.values())
+    if count <= 1 or total == 0:
+        return [(start, end)]
+    target = total / count
+    ranges: list[tuple[int, int]] = []
+    shard_start = start
+    running = 0
+    for year in range(start, end + 1):
+        running += counts.get(year, 0)
+        if running >= target * (len(ranges) + 1) and year < end and len(ranges) < count - 1:
+            ranges.append((shard_start, year))
+            shard_start = year + 1
+    ranges.append((shard_start, end))
+    return ranges
+
+
+def _query_params(query: SearchQuery) -> dict[str, str]:
+    """Keyword query, scoped to a Crossref field query where the search fields allow it."""
+    fields = search_fields(query)
+    if fields == ["title"]:
+        params = {"query.title": query.keywords}
+    elif fields == ["authors"]:
+        params = {"query.author": query.keywords}
+    elif fields and set(fields) <= {"title", "authors"}:
+        params = {"query.bibliographic": query.keywords}
+    else:
+        params = {"query": query.keywords}
+    sort = _SORT_KEYS.get(query.sort_order)
+    if sort:
+        params.update({"sort": sort, "order": "desc"})
+    return params
+
+
+def _cursor_expired(exc: requests.HTTPError, cursor: str) -> bool:
+    """Whether a failed request was rejected because its deep-paging cursor is no longer valid."""
+    status = getattr(exc.response, "status_code", None)
+    return cursor != "*" and status in (400, 404, 410)
+
+
+def _crossref_types(query: SearchQuery) -> set[str]:
+    return {value for value in accepted_types(query) if value in CROSSREF_TYPES} or accepted_types(query)
+
+
+class RelevanceCutoff:
+    """Stop relevance-ordered paging once item scores have decayed.
+
+    Keeps the top score and a rolling window of the latest scores. The cutoff
+    is reached when the window is full and its mean falls below `min_score`
+    or below `min_ratio` times the top score. `snapshot()` round-trips the
+    state through `ProviderState.extra`, so a resumed run keeps its top score.
+    """
+
+    def __init__(
+        self,
+        min_score: float = 0.0,
+        min_ratio: float = 0.0,
+        window: int = DEFAULT_SCORE_WINDOW,
+        snapshot: dict[str, Any] | None = None,
+    ) -> None:
+        self.min_score = max(0.0, min_score)
+        self.min_ratio = min(max(0.0, min_ratio), 1.0)
+        self.window = max(1, window)
+        snapshot = snapshot or {}
+        self.top = float(snapshot.get("top", 0.0))
+        self.position = int(snapshot.get("position", 0))
+        self._recent: deque[float] = deque(
+            (float(score) for score in snapshot.get("recent", [])), maxlen=self.window
+        )
+
+    @classmethod
+    def from_query(cls, query: SearchQuery, snapshot: dict[str, Any] | None = None) -> RelevanceCutoff | None:
+        """The cutoff configured for `query`; None when unset or results are not in relevance order."""
+        min_score = config_float(query.extra, "crossref_min_score", 0.0)
+        min_ratio = config_float(query.extra, "crossref_min_score_ratio", 0.0)
+        if query.sort_order in _SORT_KEYS or (min_score <= 0 and min_ratio <= 0):
+            return None
+        window = config_int(query.extra, "crossref_score_window", DEFAULT_SCORE_WINDOW)
+        return cls(min_score, min_ratio, window, snapshot)
+
+    @property
+    def threshold(self) -> float:
+        return max(self.min_score, self.min_ratio * self.top)
+
+    @property
+    def mean(self) -> float:
+        return sum(self._recent) / len(self._recent) if self._recent else 0.0
+
+    @property
+    def reached(self) -> bool:
+        return len(self._recent) == self.window and self.mean < self.threshold
+
+    def add(self, score: Any) -> bool:
+        """Record the next item's score; returns True once the cutoff is reached."""
+        self.position += 1
+        try:
+            value = float(score)
+        except (TypeError, ValueError):
+            return False
+        self.top = max(self.top, value)
+        self._recent.append(value)
+        return self.reached
+
+    def projected(self) -> int | None:
+        """Items expected before the cutoff, extrapolating the decay so far linearly."""
+        if len(self._recent) < self.window:
+            return None
+        mean = self.mean
+        if mean < self.threshold:
+            return self.position
+        if mean >= self.top:
+            return None
+        return math.ceil(self.position * (self.top - self.threshold) / (self.top - mean))
+
+    def snapshot(self) -> dict[str, Any]:
+        return {"top": self.top, "position": self.position, "recent": list(self._recent)}
+
+
+def _remaining(total: int | None, fetched: int, cutoff: RelevanceCutoff | None) -> int | None:
+    """Works still expected from one cursor: its result count, capped by the cutoff's projection."""
+    if cutoff is not None and cutoff.reached:
+        return 0
+    if total is None:
+        return None
+    projected = cutoff.projected() if cutoff is not None else None
+    expected = total if projected is None else min(total, projected)
+    return max(0, expected - fetched)
+
+
 class CrossrefProvider(Provider):
     name = "Crossref"
     requires_credentials = True
     credential_fields: list[str] = ["CROSSREF_EMAIL", "CROSSREF_USER_AGENT"]
+    delta_sync = True
 
     def is_configured(self, config: dict[str, str]) -> bool:
         if config.get("CROSSREF_ENABLED", "1") == "0":
@@ -32,64 +231,351 @@ class CrossrefProvider(Provider):
     def rate_limit_policy(self) -> RateLimitPolicy:
         return RateLimitPolicy(min_delay_seconds=1.0)
 
+    def pushdown(self, query: SearchQuery, state: ProviderState) -> set[str]:
+        pushed = {"years", "types", "access"}
+        if search_fields(query) in (["title"], ["authors"]):
+            pushed.add("fields")
+        return pushed
+
     def search(self, query: SearchQuery, state: ProviderState) -> Iterable[RawRecord]:
-        cursor = state.cursor or "*"
+        policy = self.rate_limit_policy()
+        limiter = shared_limiter(self.name, policy, rate_limit_store_path(query.extra))
+        pacer = AdaptivePacer(limiter, policy, state.extra.get("pacing"))
+        shards = config_int(query.extra, "crossref_shards", 0)
+        # A run keeps the mode it started with, so resume never mixes a single
+        # cursor with shard cursors. Date-sorted runs are not sharded, so records
+        # arrive newest first across the whole range.
+        if "shards" in state.extra or (
+            shards > 1
+            and not state.cursor
+            and query.year_start
+            and query.year_end
+            and query.sort_order != "date"
+        ):
+            yield from self._search_shards(query, state, pacer, shards)
+        else:
+            yield from self._search_cursor(query, state, pacer)
+
+    def _search_cursor(
+        self, query: SearchQuery, state: ProviderState, pacer: AdaptivePacer
+    ) -> Iterable[RawRecord]:
         remaining = query.limit
-        limiter = RateLimiter(self.rate_limit_policy())
-        while True:
+        depth = config_int(query.extra, "prefetch_pages", 1)
+        cutoff = RelevanceCutoff.from_query(query, state.extra.get("relevance"))
+        fetched = state.extra.get("fetched", 0)
+        resumed_at = fetched
+        total: int | None = None
+        requested = 0
+        fetch = self._works_pager(query, state, pacer, query.year_start, query.year_end, state.cursor or "*")
+
+        def fetch_page(cursor: str) -> tuple[list[dict], str | None]:
+            nonlocal requested, total
             rows = 100
-            if remaining is not None:
-                rows = min(100, remaining)
+            if query.limit is not None:
+                rows = min(100, query.limit - requested)
                 if rows <= 0:
-                    break
-            params = {
-                "query": query.keywords,
-                "rows": rows,
-                "cursor": cursor,
-            }
-            filters: list[str] = []
-            if query.year_start:
-                filters.append(f"from-pub-date:{query.year_start}-01-01")
-            if query.year_end:
-                filters.append(f"until-pub-date:{query.year_end}-12-31")
-            if query.types:
-                filters.append(f"type:{query.types[0]}")
-            if filters:
-                params["filter"] = ",".join(filters)
-            email = query.extra.get("crossref_email") if hasattr(query, "extra") else None
-            if email:
-                params["mailto"] = email
-            limiter.wait()
-            headers = {}
-            user_agent = query.extra.get("crossref_user_agent") if hasattr(query, "extra") else None
-            if user_agent:
-                headers["User-Agent"] = user_agent
-            resp = requests.get(
-                "https://api.crossref.org/works",
-                params=params,
-                headers=headers,
-                timeout=30,
-            )
-            resp.raise_for_status()
-            payload = resp.json().get("message", {})
-            items = payload.get("items", [])
+                    return [], None
+            items, next_cursor, total = fetch(cursor, rows)
+            requested += len(items)
+            return items, next_cursor
+
+        # The cursor is only advanced once every item of a page was handed to
+        # the consumer, so prefetched-but-unconsumed pages are refetched on resume.
+        for items, next_cursor in prefetch_pages(fetch_page, state.cursor or "*", depth):
             for item in items:
                 doi = item.get("DOI")
                 yield RawRecord(provider=self.name, data=item, record_id=doi)
+                fetched += 1
+                if cutoff is not None and cutoff.add(item.get("score")):
+                    break
                 if remaining is not None:
                     remaining -= 1
                     if remaining <= 0:
                         break
-            next_cursor = payload.get("next-cursor")
             if next_cursor:
-                cursor = next_cursor
-                state.cursor = cursor
+                state.cursor = next_cursor
             state.last_request_time = time.time()
-            if not items or not next_cursor:
+            state.extra["pacing"] = pacer.snapshot()
+            state.extra["fetched"] = fetched
+            if cutoff is not None:
+                state.extra["relevance"] = cutoff.snapshot()
+            self._set_estimate(query, state, fetched - resumed_at, _remaining(total, fetched, cutoff))
+            state.checkpoint()
+            if cutoff is not None and cutoff.reached:
+                self._log_cutoff(cutoff, fetched)
+                break
+            if remaining is not None and remaining <= 0:
                 break
+
+    def _search_shards(
+        self, query: SearchQuery, state: ProviderState, pacer: AdaptivePacer, count: int
+    ) -> Iterable[RawRecord]:
+        """Page balanced publication-year shards concurrently, one cursor each.
+
+        The shard plan and per-shard cursors live in `state.extra["shards"]`;
+        a shard is marked done once Crossref returns an empty page for it or
+        its relevance cutoff is reached.
+        """
+        if "shards" not in state.extra:
+            state.extra["shards"] = [
+                {"from": start, "until": end, "cursor": "*", "done": False}
+                for start, end in self._plan_shards(query, pacer, count, state.extra.get("delta_since"))
+            ]
+        shards = [dict(shard) for shard in state.extra["shards"]]
+        cutoffs = [RelevanceCutoff.from_query(query, shard.get("relevance")) for shard in shards]
+        resumed_at = sum(shard.get("fetched", 0) for shard in shards)
+        remaining = query.limit
+        depth = config_int(query.extra, "prefetch_pages", 1)
+        lock = threading.Lock()
+        requested = 0
+        totals: dict[int, int | None] = {}
+
+        def shard_fetcher(idx: int, shard: dict):
+            fetch = self._works_pager(query, state, pacer, shard["from"], shard["until"], shard["cursor"])
+
+            def fetch_page(cursor: str) -> tuple[list[dict], str | None]:
+                nonlocal requested
+                if cutoffs[idx] is not None and cutoffs[idx].reached:
+                    return [], None
+                rows = 100
+                with lock:
+                    if query.limit is not None:
+                        rows = min(100, query.limit - requested)
+                        if rows <= 0:
+                            return [], None
+                    requested += rows
+                items, next_cursor, total = fetch(cursor, rows)
+                with lock:
+                    requested -= rows - len(items)
+                    totals[idx] = total
+                # An exhausted shard still reports a cursor; None means "stopped at the limit".
+                return items, next_cursor or cursor
+
+            return fetch_page
+
+        sources = {
+            idx: (shard_fetcher(idx, shard), shard["cursor"])
+            for idx, shard in enumerate(shards)
+            if not shard["done"]
+        }
+        for idx, items, next_cursor in merge_pages(sources, depth):
+            shard = dict(shards[idx])
+            cutoff = cutoffs[idx]
+            # Pages a shard prefetched before its cutoff was reached are dropped.
+            if shard["done"]:
+                continue
+            fetched = shard.get("fetched", 0)
+            for item in items:
+                yield RawRecord(provider=self.name, data=item, record_id=item.get("DOI"))
+                fetched += 1
+                if cutoff is not None and cutoff.add(item.get("score")):
+                    break
+                if remaining is not None:
+                    remaining -= 1
+                    if remaining <= 0:
+                        break
+            if cutoff is not None and cutoff.reached:
+                self._log_cutoff(cutoff, fetched)
+                shard["done"] = True
+            elif not items:
+                shard["done"] = next_cursor is not None
+            elif next_cursor:
+                shard["cursor"] = next_cursor
+            shard["fetched"] = fetched
+            if cutoff is not None:
+                shard["relevance"] = cutoff.snapshot()
+            shards[idx] = shard
+            state.extra["shards"] = [dict(item) for item in shards]
+            state.last_request_time = time.time()
+            state.extra["pacing"] = pacer.snapshot()
+            with lock:
+                estimates = [
+                    0 if item["done"] else _remaining(totals.get(pos), item.get("fetched", 0), cutoffs[pos])
+                    for pos, item in enumerate(shards)
+                ]
+            if None not in estimates:
+                fetched_now = sum(item.get("fetched", 0) for item in shards) - resumed_at
+                self._set_estimate(query, state, fetched_now, sum(estimates))
+            state.checkpoint()
             if remaining is not None and remaining <= 0:
                 break
 
+    def _set_estimate(self, query: SearchQuery, state: ProviderState, fetched: int, remaining: int | None) -> None:
+        """Publish the works this search is expected to yield as `state.extra["estimate"]`."""
+        if remaining is None:
+            return
+        estimate = fetched + remaining
+        if query.limit is not None:
+            estimate = min(estimate, query.limit)
+        state.extra["estimate"] = estimate
+
+    def _log_cutoff(self, cutoff: RelevanceCutoff, fetched: int) -> None:
+        logger.info(
+            "Crossref relevance cutoff reached after %d works (rolling score %.2f below %.2f)",
+            fetched,
+            cutoff.mean,
+            cutoff.threshold,
+        )
+
+    def _plan_shards(
+        self, query: SearchQuery, pacer: AdaptivePacer, count: int, since: str | None = None
+    ) -> list[tuple[int, int]]:
+        """Split the query's year range into up to `count` ranges of similar size."""
+        start, end = int(query.year_start), int(query.year_end)
+        params = {**_query_params(query), "rows": 0, "facet": "published:*"}
+        filters = self._filters(query, start, end, since)
+        if filters:
+            params["filter"] = ",".join(filters)
+        resp = get_with_retries(_WORKS_URL, params, pacer, transport=self.http, timeout=30)
+        values = resp.json().get("message", {}).get("facets", {}).get("published", {}).get("values", {})
+        counts = {}
+        for year, total in values.items():
+            if str(year).isdigit() and start <= int(year) <= end:
+                counts[int(year)] = int(total)
+        return balanced_year_ranges(counts, start, end, count)
+
+    def _filters(
+        self, query: SearchQuery, year_start: int | None, year_end: int | None, since: str | None = None
+    ) -> list[str]:
+        filters: list[str] = []
+        if since:
+            # The index date moves on every deposit or metadata update, so this
+            # covers both new and changed works.
+            filters.append(f"from-index-date:{since}")
+        if year_start:
+            filters.append(f"from-pub-date:{year_start}-01-01")
+        if year_end:
+            filters.append(f"until-pub-date:{year_end}-12-31")
+        # Repeated `type` filters are OR-ed by Crossref.
+        for value in sorted(_crossref_types(query)):
+            filters.append(f"type:{value}")
+        if query.access_filter == "open":
+            filters.extend(["has-license:true", "has-full-text:true"])
+        elif query.access_filter == "closed":
+            filters.append("has-license:false")
+        return filters
+
+    def _works_pager(
+        self,
+        query: SearchQuery,
+        state: ProviderState,
+        pacer: AdaptivePacer,
+        year_start: int | None,
+        year_end: int | None,
+        start: str,
+    ) -> Callable[[str, int], tuple[list[dict], str | None, int | None]]:
+        """Return `fetch(cursor, rows)`, paging one `/works` cursor from `start`.
+
+        Cursor tokens differ between sessions, so passes that start from `*`
+        cache each page under its page index; refresh and delta passes always
+        page live. A cached page carries the `next-cursor` of the session that
+        fetched it, so the first page missing from the cache re-establishes a
+        live cursor by fast-forwarding past the works already paged.
+        """
+        since = state.extra.get("delta_since")
+        cacheable = start == "*" and not since and not state.extra.get("refresh")
+        page = 0
+        position = 0
+        live = True
+
+        def fetch(cursor: str, rows: int) -> tuple[list[dict], str | None, int | None]:
+            nonlocal page, position, live
+            params = self._works_params(query, cursor, rows, year_start, year_end, since)
+            # `language` cannot be selected, so language filtering needs full items.
+            if query.extra.get("crossref_full_raw", "0") != "1" and not language_codes(query):
+                params["select"] = SELECT_FIELDS
+
+            def live_params() -> dict[str, Any]:
+                if live:
+                    return params
+                skip = position if cacheable else None
+                return {**params, "cursor": self._recover_cursor(query, state, pacer, year_start, year_end, skip)}
+
+            def send() -> requests.Response:
+                return get_with_retries(
+                    _WORKS_URL,
+                    params,
+                    pacer,
+                    transport=self.http,
+                    timeout=30,
+                    cache=cacheable,
+                    cache_params={**params, "cursor": f"page:{page}"},
+                    live_params=live_params,
+                )
+
+            try:
+                resp = send()
+            except requests.HTTPError as exc:
+                if not live or not _cursor_expired(exc, cursor):
+                    raise
+                live = False
+                resp = send()
+            live = not from_cache(resp)
+            page += 1
+            payload = resp.json().get("message", {})
+            items = payload.get("items", [])
+            position += len(items)
+            total = payload.get("total-results")
+            return items, payload.get("next-cursor"), total if isinstance(total, int) else None
+
+        return fetch
+
+    def _works_params(
+        self,
+        query: SearchQuery,
+        cursor: str,
+        rows: int,
+        year_start: int | None,
+        year_end: int | None,
+        since: str | None,
+    ) -> dict[str, str | int]:
+        params: dict[str, str | int] = {
+            **_query_params(query),
+            "rows": rows,
+            "cursor": cursor,
+        }
+        filters = self._filters(query, year_start, year_end, since)
+        if filters:
+            params["filter"] = ",".join(filters)
+        return params
+
+    def _recover_cursor(
+        self,
+        query: SearchQuery,
+        state: ProviderState,
+        pacer: AdaptivePacer,
+        year_start: int | None,
+        year_end: int | None,
+        skip: int | None = None,
+    ) -> str:
+        """Re-establish paging position without a usable cursor.
+
+        Starts a fresh cursor and skips ahead with DOI-only pages of up to
+        `_FAST_FORWARD_ROWS` works: past exactly `skip` works when the position
+        is known, otherwise for as long as every DOI is already stored. In the
+        latter case the cursor of the first page holding an unseen work is
+        returned, so at most one partially known page is fetched again in full.
+        """
+        cursor = "*"
+        skipped = 0
+        while True:
+            rows = _FAST_FORWARD_ROWS if skip is None else min(_FAST_FORWARD_ROWS, skip - skipped)
+            if rows <= 0:
+                break
+            params = self._works_params(query, cursor, rows, year_start, year_end, state.extra.get("delta_since"))
+            params["select"] = "DOI"
+            resp = get_with_retries(_WORKS_URL, params, pacer, transport=self.http, timeout=30, cache=False)
+            payload = resp.json().get("message", {})
+            items = payload.get("items", [])
+            dois = [item.get("DOI") for item in items if item.get("DOI")]
+            next_cursor = payload.get("next-cursor")
+            if not items or not next_cursor or (skip is None and (not dois or not state.all_seen(dois))):
+                break
+            skipped += len(items)
+            cursor = next_cursor
+        logger.info("Crossref cursor re-established by fast-forwarding past %d works", skipped)
+        return cursor
+
     def normalize(self, raw: RawRecord) -> PaperRecord:
         data = raw.data
         doi = raw.record_id or ""
@@ -110,17 +596,32 @@ class CrossrefProvider(Provider):
         abstract = data.get("abstract", "")
         publisher = data.get("publisher", "")
         year = ""
+        month = ""
         if data.get("issued") and data["issued"].get("date-parts"):
-            year = str(data["issued"]["date-parts"][0][0])
+            parts = data["issued"]["date-parts"][0] or []
+            year = str(parts[0]) if parts and parts[0] else ""
+            month = str(parts[1]) if len(parts) > 1 and parts[1] else ""
+        licenses = data.get("license", []) or []
+        citations = data.get("is-referenced-by-count")
+        score = data.get("score")
         record = PaperRecord(
             authors="; ".join(authors),
             title=title,
             abstract=abstract,
             origin=self.name,
+            volume=str(data.get("volume", "") or ""),
+            issue=str(data.get("issue", "") or ""),
+            pages=str(data.get("page", "") or ""),
             publisher=publisher,
+            month=month,
             year=year,
+            type=data.get("type", "") or "",
+            keywords="; ".join(data.get("subject", []) or []),
+            citations="" if citations is None else str(citations),
+            score="" if score is None else str(score),
             id=doi or isbn,
             url=f"https://doi.org/{doi}" if doi else data.get("URL", ""),
+            license=licenses[0].get("URL", "") if licenses else "",
             retrieved_at=now_iso(),
         )
         return record
@@ -2,11 +2,15 @@
 
 from __future__ import annotations
 
+from pathlib import Path
+
 import typer
 from rich.console import Console
 
 from papyr.cli import prompts, wizard
 from papyr.adapters import default_providers
+from papyr.core.state import db, repo
+from papyr.core.state.raw_codec import RawPolicy
 from papyr.util.config import DEFAULT_ENV_PATH, load_env_file, write_env_file
 
 app = typer.Typer(add_completion=False, help="Papyr CLI")
@@ -95,6 +99,33 @@ def doctor() -> None:
     _print_next_choices()
 
 
+@app.command("compact")
+def compact_command(
+    run_path: str = typer.Argument(..., help="Path to run folder containing state.sqlite"),
+) -> None:
+    """Compress stored raw payloads (including the shared library's), apply raw retention and shrink state.sqlite."""
+    db_path = Path(run_path) / "state.sqlite"
+    if not db_path.exists():
+        console.print(f"No state.sqlite found in {run_path}.")
+        raise typer.Exit(code=1)
+    config = load_env_file(DEFAULT_ENV_PATH)
+    policy = RawPolicy.from_config(config)
+    size_before = db_path.stat().st_size
+    conn = db.open_state(db_path, config)
+    library_path = config.get("PAPYR_LIBRARY_DB", "").strip()
+    if library_path:
+        db.attach_library(conn, Path(library_path).expanduser())
+    recoded, dropped = repo.compact_raw(conn, policy)
+    conn.execute("PRAGMA wal_checkpoint(TRUNCATE);")
+    conn.execute("VACUUM;")
+    db.release_state(db_path)
+    size_after = db_path.stat().st_size
+    console.print(
+        f"Compacted {db_path}: {recoded} payloads re-encoded ({policy.codec}), {dropped} dropped; "
+        f"{size_before // 1024} KiB -> {size_after // 1024} KiB."
+    )
+
+
 @app.command("reset-cache")
 def reset_cache() -> None:
     """Reset local cache/state for a run (ask for confirmation)."""
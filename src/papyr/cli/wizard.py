@@ -12,13 +12,14 @@ from papyr.adapters import default_providers
 from papyr.adapters.crossref import CrossrefProvider
 from papyr.adapters.ssrn import SsrnProvider
 from papyr.cli import prompts
-from papyr.core.models import PaperRecord, SearchQuery
+from papyr.core.models import SearchQuery
 from papyr.core.pipeline import run_metasearch
 from papyr.core.state import db, repo
-from papyr.core.downloader import download_pdf
+from papyr.core.download_queue import DownloadQueue
+from papyr.core.http import HttpTransport
 from papyr.util.fs import safe_filename
 from papyr.util.hashing import stable_hash
-from papyr.util.config import DEFAULT_ENV_PATH, load_env_file, set_env_value
+from papyr.util.config import DEFAULT_ENV_PATH, config_int, load_env_file, set_env_value
 
 
 def _configure_crossref(console: Console, env_path: str = str(DEFAULT_ENV_PATH)) -> None:
@@ -210,8 +211,7 @@ def run_resume_wizard(console: Console, params_path: str) -> None:
 
 def _resolve_run_id(query: SearchQuery, original_hash: str) -> int:
     output_dir = Path(query.output_dir)
-    conn = db.connect(output_dir / "state.sqlite")
-    db.init_db(conn)
+    conn = db.open_state(output_dir / "state.sqlite", load_env_file(DEFAULT_ENV_PATH))
     run_row = repo.get_run_by_hash(conn, original_hash)
     if run_row:
         return int(run_row["id"])
@@ -248,8 +248,7 @@ def _maybe_edit_resume_query(
 
 def _count_existing_records(query: SearchQuery, run_id: int) -> int:
     output_dir = Path(query.output_dir)
-    conn = db.connect(output_dir / "state.sqlite")
-    db.init_db(conn)
+    conn = db.open_state(output_dir / "state.sqlite", load_env_file(DEFAULT_ENV_PATH))
     return repo.count_records(conn, run_id)
 
 
@@ -409,16 +408,15 @@ def _download_missing_pdfs(
     run_id: int,
 ) -> None:
     output_dir = Path(query.output_dir)
-    conn = db.connect(output_dir / "state.sqlite")
-    db.init_db(conn)
-    rows = repo.list_records(conn, run_id)
-    downloaded_ids = repo.list_downloaded_ids(conn, run_id)
+    config = load_env_file(DEFAULT_ENV_PATH)
+    conn = db.open_state(output_dir / "state.sqlite", config)
+    skip_ids = repo.list_downloaded_ids(conn, run_id) | repo.list_pending_download_ids(conn, run_id)
     providers_by_name = {provider.name: provider for provider in providers}
     files_dir = output_dir / "files"
     files_dir.mkdir(parents=True, exist_ok=True)
-    for row in rows:
-        record = PaperRecord.model_validate_json(row["normalized_json"])
-        if record.id and record.id in downloaded_ids:
+    queued: list[tuple[str | None, str, str | None, str, int, str | None]] = []
+    for record in repo.iter_paper_records(conn, run_id):
+        if record.id and record.id in skip_ids:
             continue
         provider = providers_by_name.get(record.origin)
         if not provider:
@@ -428,30 +426,25 @@ def _download_missing_pdfs(
         if not pdf_url:
             continue
         filename = safe_filename(record.title, record.id or record.url)
-        dest = files_dir / filename
-        if dest.exists():
-            repo.upsert_download(
-                conn,
-                run_id,
-                record.id or None,
-                pdf_url,
-                str(dest),
-                "ok",
-                0,
-                None,
-            )
-            if record.id:
-                downloaded_ids.add(record.id)
-            continue
-        result = download_pdf(pdf_url, dest)
-        status = "ok" if result.ok else "failed"
-        repo.upsert_download(
-            conn,
+        queued.append((record.id or None, pdf_url, str(files_dir / filename), "queued", 0, None))
+    with conn:
+        repo.insert_downloads(conn, run_id, queued)
+    pending = repo.count_queued_downloads(conn, run_id)
+    if not pending:
+        console.print("No missing PDFs to download.")
+        return
+    console.print(f"Downloading {pending} missing PDFs...")
+    transport = HttpTransport.from_config(config)
+    try:
+        downloads = DownloadQueue(
+            output_dir / "state.sqlite",
             run_id,
-            record.id or None,
-            pdf_url,
-            str(dest) if result.ok else None,
-            status,
-            result.attempts,
-            None if result.ok else result.message,
+            workers=config_int(config, "PAPYR_DOWNLOAD_WORKERS", 4),
+            per_host=config_int(config, "PAPYR_DOWNLOADS_PER_HOST", 2),
+            transport=transport,
         )
+        downloads.start()
+        downloads.close(drain=True)
+    finally:
+        transport.close()
+    console.print(f"Downloads finished: {downloads.ok} ok, {downloads.failed} failed.")
@@ -24,10 +24,25 @@ def normalize_authors(authors: str) -> str:
     return simplified.casefold()
 
 
+def normalize_id(record_id: str) -> str:
+    """Normalize record IDs for dedup comparison."""
+    return (record_id or "").strip().casefold()
+
+
 def _is_preprint(record: PaperRecord) -> bool:
     return record.type.strip().lower() == "preprint" or record.origin.strip().lower() == "arxiv"
 
 
+def dedup_keys(record: PaperRecord) -> tuple[str, str, str, int]:
+    """Return (title_key, id_key, authors_key, is_preprint) as stored in the dedup index."""
+    return (
+        normalize_title(record.title),
+        normalize_id(record.id),
+        normalize_authors(record.authors),
+        1 if _is_preprint(record) else 0,
+    )
+
+
 def find_duplicates(records: Iterable[PaperRecord]) -> list[tuple[PaperRecord, PaperRecord, str]]:
     """Return list of duplicates as (duplicate, canonical, reason)."""
     by_key: dict[tuple[str, str], PaperRecord] = {}
@@ -36,7 +51,7 @@ def find_duplicates(records: Iterable[PaperRecord]) -> list[tuple[PaperRecord, P
     by_title: dict[str, list[PaperRecord]] = {}
     for record in records:
         title_key = normalize_title(record.title)
-        id_key = (record.id or "").strip().casefold()
+        id_key = normalize_id(record.id)
         key = (title_key, id_key)
         if title_key:
             by_title.setdefault(title_key, []).append(record)
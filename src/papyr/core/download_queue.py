@@ -0,0 +1,165 @@
+"""Persistent PDF download queue with a bounded worker pool."""
+
+from __future__ import annotations
+
+import queue
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from pathlib import Path
+
+from papyr.core.downloader import DownloadResult, download_pdf
+from papyr.core.http import HttpTransport
+from papyr.core.state import db, repo
+
+
+class DownloadQueue:
+    """Download PDFs queued in the `downloads` table.
+
+    Rows with status `queued` are picked up by a dispatcher thread and handed
+    to a pool of `workers` threads, with at most `per_host` concurrent
+    downloads per host. The dispatcher owns its own SQLite connection and is
+    the only writer of download status updates. Rows that are still queued
+    when the queue is closed without draining stay queued for the next run.
+    If the dispatcher itself fails, its error is kept in `error` and raised
+    from `close()`; unfinished rows stay queued.
+    """
+
+    def __init__(
+        self,
+        db_path: Path,
+        run_id: int,
+        workers: int = 4,
+        per_host: int = 2,
+        poll_interval: float = 0.5,
+        transport: HttpTransport | None = None,
+    ) -> None:
+        self._db_path = db_path
+        self._run_id = run_id
+        self._workers = max(1, workers)
+        self._per_host = max(1, per_host)
+        self._poll_interval = poll_interval
+        self._owns_transport = transport is None
+        self._transport = transport or HttpTransport(pool_size=self._per_host)
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._drain = True
+        self._results: queue.Queue = queue.Queue()
+        self._in_flight: dict[int, str] = {}
+        self._host_counts: dict[str, int] = {}
+        self._thread: threading.Thread | None = None
+        self.error: Exception | None = None
+        self.ok = 0
+        self.failed = 0
+
+    def start(self) -> None:
+        """Start the dispatcher thread."""
+        self._thread = threading.Thread(target=self._run, name="papyr-downloads", daemon=True)
+        self._thread.start()
+
+    def wake(self) -> None:
+        """Signal that new rows may have been committed to the queue."""
+        self._wake.set()
+
+    def close(self, drain: bool = True) -> None:
+        """Stop the dispatcher; with `drain`, first finish every queued row.
+
+        Raises RuntimeError if the dispatcher thread failed.
+        """
+        self._drain = drain
+        self._stop.set()
+        self._wake.set()
+        if self._thread:
+            self._thread.join()
+        if self.error is not None:
+            raise RuntimeError(f"PDF download dispatcher failed: {self.error}") from self.error
+
+    def _run(self) -> None:
+        conn = None
+        try:
+            conn = db.open_state(self._db_path)
+            repo.requeue_stale_downloads(conn, self._run_id)
+            with ThreadPoolExecutor(max_workers=self._workers, thread_name_prefix="papyr-download") as pool:
+                while True:
+                    self._record_results(conn)
+                    if self._stop.is_set() and not self._drain:
+                        break
+                    dispatched = self._dispatch(conn, pool)
+                    if (
+                        self._stop.is_set()
+                        and not dispatched
+                        and not self._in_flight
+                        and repo.count_queued_downloads(conn, self._run_id) == 0
+                    ):
+                        break
+                    self._wake.wait(self._poll_interval)
+                    self._wake.clear()
+            self._record_results(conn)
+        except Exception as exc:  # noqa: BLE001 - surfaced to the caller by close()
+            self.error = exc
+        finally:
+            if conn is not None:
+                db.release_state(self._db_path)
+            if self._owns_transport:
+                self._transport.close()
+
+    def _dispatch(self, conn, pool: ThreadPoolExecutor) -> int:
+        free = self._workers - len(self._in_flight)
+        if free <= 0:
+            return 0
+        dispatched = 0
+        busy = [host for host, count in self._host_counts.items() if count >= self._per_host]
+        rows = repo.list_queued_downloads(
+            conn, self._run_id, limit=self._workers * 8, per_host=self._per_host, skip_hosts=busy
+        )
+        for row in rows:
+            if dispatched >= free:
+                break
+            host = repo.download_host(row["pdf_url"])
+            if self._host_counts.get(host, 0) >= self._per_host:
+                continue
+            download_id = int(row["id"])
+            dest = Path(row["file_path"])
+            repo.update_download(conn, download_id, "running", row["file_path"], int(row["attempts"]))
+            self._in_flight[download_id] = host
+            self._host_counts[host] = self._host_counts.get(host, 0) + 1
+            future = pool.submit(_download, row["pdf_url"], dest, self._transport)
+            future.add_done_callback(
+                lambda done, download_id=download_id, dest=dest: self._finish(download_id, dest, done)
+            )
+            dispatched += 1
+        return dispatched
+
+    def _finish(self, download_id: int, dest: Path, future) -> None:
+        try:
+            result = future.result()
+        except Exception as exc:  # noqa: BLE001 - recorded as a failed download
+            result = DownloadResult(False, 1, str(exc))
+        self._results.put((download_id, dest, result))
+        self._wake.set()
+
+    def _record_results(self, conn) -> None:
+        while True:
+            try:
+                download_id, dest, result = self._results.get_nowait()
+            except queue.Empty:
+                return
+            host = self._in_flight.pop(download_id, "")
+            self._host_counts[host] = max(0, self._host_counts.get(host, 1) - 1)
+            if result.ok:
+                self.ok += 1
+            else:
+                self.failed += 1
+            repo.update_download(
+                conn,
+                download_id,
+                "ok" if result.ok else "failed",
+                str(dest) if result.ok else None,
+                result.attempts,
+                None if result.ok else result.message,
+            )
+
+
+def _download(url: str, dest: Path, transport: HttpTransport) -> DownloadResult:
+    if dest.exists():
+        return DownloadResult(True, 0, "ok")
+    return download_pdf(url, dest, session=transport.session_for(url))
@@ -17,15 +17,19 @@ class DownloadResult:
         self.message = message
 
 
-def download_pdf(url: str, dest_path: Path) -> DownloadResult:
-    """Download a PDF if content-type and magic bytes are valid."""
+def download_pdf(url: str, dest_path: Path, session: requests.Session | None = None) -> DownloadResult:
+    """Download a PDF if content-type and magic bytes are valid.
+
+    Pass a pooled `session` to reuse connections across downloads.
+    """
+    get = session.get if session is not None else requests.get
     dest_path.parent.mkdir(parents=True, exist_ok=True)
     attempts = 0
     delay = 1.0
     while attempts < 3:
         attempts += 1
         try:
-            with requests.get(url, stream=True, timeout=30) as resp:
+            with get(url, stream=True, timeout=30) as resp:
                 resp.raise_for_status()
                 content_type = resp.headers.get("Content-Type", "")
                 if "pdf" not in content_type.lower():
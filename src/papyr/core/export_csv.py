@@ -4,6 +4,7 @@ from __future__ import annotations
 
 import csv
 from pathlib import Path
+from typing import Iterable
 
 from papyr.core.models import PaperRecord
 
@@ -44,11 +45,42 @@ def _csv_value(value: object) -> str:
     return text
 
 
-def export_csv(records: list[PaperRecord], path: Path, append: bool = False) -> None:
-    """Write CSV in UTF-8 with BOM for Excel friendliness."""
+def _csv_row(record: PaperRecord) -> dict[str, str]:
+    """Map a record to the fixed export columns."""
+    return {
+        "Authors": _csv_value(record.authors),
+        "Title": _csv_value(record.title),
+        "Abstract": _csv_value(record.abstract),
+        "Origin": _csv_value(record.origin),
+        "Volume": _csv_value(record.volume),
+        "Issue": _csv_value(record.issue),
+        "Pages": _csv_value(record.pages),
+        "Publisher": _csv_value(record.publisher),
+        "Month": _csv_value(record.month),
+        "Year": _csv_value(record.year),
+        "Type": _csv_value(record.type),
+        "Keywords": _csv_value(record.keywords),
+        "Citations": _csv_value(record.citations),
+        "OA": _csv_value(record.oa),
+        "ID": _csv_value(record.id),
+        "URL": _csv_value(record.url),
+        "License": _csv_value(record.license),
+        "RetrievedAt": _csv_value(record.retrieved_at),
+        "QueryHash": _csv_value(record.query_hash),
+        "DuplicateOf": _csv_value(record.duplicate_of),
+    }
+
+
+def export_csv(records: Iterable[PaperRecord], path: Path, append: bool = False) -> int:
+    """Write CSV in UTF-8 with BOM for Excel friendliness.
+
+    Records are written as they are consumed, so `records` can be a lazy
+    iterator. Returns the number of rows written.
+    """
     path.parent.mkdir(parents=True, exist_ok=True)
     mode = "a" if append and path.exists() else "w"
     write_header = mode == "w"
+    count = 0
     with path.open(mode, encoding="utf-8-sig", newline="") as handle:
         writer = csv.DictWriter(
             handle,
@@ -60,27 +92,6 @@ def export_csv(records: list[PaperRecord], path: Path, append: bool = False) ->
         if write_header:
             writer.writeheader()
         for record in records:
-            writer.writerow(
-                {
-                    "Authors": _csv_value(record.authors),
-                    "Title": _csv_value(record.title),
-                    "Abstract": _csv_value(record.abstract),
-                    "Origin": _csv_value(record.origin),
-                    "Volume": _csv_value(record.volume),
-                    "Issue": _csv_value(record.issue),
-                    "Pages": _csv_value(record.pages),
-                    "Publisher": _csv_value(record.publisher),
-                    "Month": _csv_value(record.month),
-                    "Year": _csv_value(record.year),
-                    "Type": _csv_value(record.type),
-                    "Keywords": _csv_value(record.keywords),
-                    "Citations": _csv_value(record.citations),
-                    "OA": _csv_value(record.oa),
-                    "ID": _csv_value(record.id),
-                    "URL": _csv_value(record.url),
-                    "License": _csv_value(record.license),
-                    "RetrievedAt": _csv_value(record.retrieved_at),
-                    "QueryHash": _csv_value(record.query_hash),
-                    "DuplicateOf": _csv_value(record.duplicate_of),
-                }
-            )
+            writer.writerow(_csv_row(record))
+            count += 1
+    return count
@@ -0,0 +1,224 @@
+"""HTTP transport shared by provider adapters and the downloader."""
+
+from __future__ import annotations
+
+import threading
+import time
+from typing import Any, Callable
+from urllib.parse import urlparse
+
+import requests
+from requests.adapters import HTTPAdapter
+from requests.structures import CaseInsensitiveDict
+
+from papyr import __version__
+from papyr.core.http_cache import CachedResponse, HttpCache
+from papyr.core.rate_limit import AdaptivePacer
+
+_CROSSREF_API_HOST = "api.crossref.org"
+
+
+class HttpTransport:
+    """Pooled keep-alive sessions, one per host.
+
+    Every request negotiates gzip. Requests to the Crossref API identify the
+    user (`CROSSREF_USER_AGENT` or a `mailto:` User-Agent plus the polite-pool
+    `mailto` parameter); other hosts get a plain `papyr/<version>` agent. With a
+    `cache`, GETs are stored and stale entries are revalidated with
+    conditional requests; a streamed GET is then read in full once to store it.
+    """
+
+    def __init__(
+        self,
+        mailto: str | None = None,
+        user_agent: str | None = None,
+        pool_size: int = 10,
+        cache: HttpCache | None = None,
+    ) -> None:
+        self.mailto = mailto or None
+        self.user_agent = _default_user_agent(None)
+        self.crossref_user_agent = user_agent or _default_user_agent(mailto)
+        self.cache = cache
+        self._pool_size = max(1, pool_size)
+        self._sessions: dict[str, requests.Session] = {}
+        self._lock = threading.Lock()
+
+    @classmethod
+    def from_config(cls, config: dict[str, str]) -> HttpTransport:
+        from papyr.util.config import config_int
+
+        return cls(
+            mailto=config.get("CROSSREF_EMAIL"),
+            user_agent=config.get("CROSSREF_USER_AGENT"),
+            pool_size=config_int(config, "PAPYR_HTTP_POOL_SIZE", 10),
+            cache=HttpCache.from_config(config),
+        )
+
+    def session_for(self, url: str) -> requests.Session:
+        """Return the pooled session for the URL's host."""
+        host = urlparse(url).netloc.lower()
+        with self._lock:
+            session = self._sessions.get(host)
+            if session is None:
+                session = requests.Session()
+                adapter = HTTPAdapter(pool_connections=1, pool_maxsize=self._pool_size)
+                session.mount("https://", adapter)
+                session.mount("http://", adapter)
+                # The contact email only goes to Crossref, never to arXiv or PDF hosts.
+                agent = self.crossref_user_agent if host == _CROSSREF_API_HOST else self.user_agent
+                session.headers.update({"User-Agent": agent, "Accept-Encoding": "gzip, deflate"})
+                self._sessions[host] = session
+        return session
+
+    def lookup(self, url: str, params: dict[str, Any] | None = None) -> tuple[str | None, CachedResponse | None]:
+        """Return the cache key and entry (fresh or stale) for a GET; (None, None) without a cache."""
+        if self.cache is None:
+            return None, None
+        key = HttpCache.key(url, params)
+        return key, self.cache.lookup(key)
+
+    def get(
+        self,
+        url: str,
+        params: dict[str, Any] | None = None,
+        headers: dict[str, str] | None = None,
+        timeout: float = 30,
+        stream: bool = False,
+        cache: bool = True,
+    ) -> requests.Response:
+        """GET `url`, served from the cache when fresh; `cache=False` bypasses the cache entirely."""
+        key, entry = self.lookup(url, params) if cache else (None, None)
+        if entry is not None and self.cache.is_fresh(entry):
+            return _cached_response(entry)
+        return self.send(url, params, headers, timeout, stream, key, entry)
+
+    def send(
+        self,
+        url: str,
+        params: dict[str, Any] | None = None,
+        headers: dict[str, str] | None = None,
+        timeout: float = 30,
+        stream: bool = False,
+        key: str | None = None,
+        entry: CachedResponse | None = None,
+    ) -> requests.Response:
+        """GET `url` over the network.
+
+        With a cache `key` a 200 response is stored under it, and a stale
+        `entry` from `lookup` is revalidated with a conditional request.
+        """
+        headers = dict(headers or {})
+        if entry is not None and entry.etag:
+            headers["If-None-Match"] = entry.etag
+        if entry is not None and entry.last_modified:
+            headers["If-Modified-Since"] = entry.last_modified
+        params = dict(params or {})
+        if self.mailto and urlparse(url).netloc.lower() == _CROSSREF_API_HOST:
+            params.setdefault("mailto", self.mailto)
+        resp = self.session_for(url).get(url, params=params, headers=headers, timeout=timeout, stream=stream)
+        if key is None or self.cache is None:
+            return resp
+        if resp.status_code == 304 and entry is not None:
+            self.cache.touch(key)
+            return _cached_response(entry)
+        if resp.status_code == 200:
+            self.cache.store(
+                key,
+                url,
+                resp.content,
+                resp.headers.get("Content-Type", ""),
+                resp.encoding,
+                resp.headers.get("ETag"),
+                resp.headers.get("Last-Modified"),
+            )
+        return resp
+
+    def close(self) -> None:
+        with self._lock:
+            for session in self._sessions.values():
+                session.close()
+            self._sessions.clear()
+
+
+def _cached_response(entry: CachedResponse) -> requests.Response:
+    resp = requests.Response()
+    resp.status_code = 200
+    resp.url = entry.url
+    resp._content = entry.body
+    resp._content_consumed = True
+    resp.encoding = entry.encoding
+    resp.headers = CaseInsensitiveDict({"Content-Type": entry.content_type, "X-Papyr-Cache": "hit"})
+    return resp
+
+
+def from_cache(resp: requests.Response) -> bool:
+    """Whether `resp` was served from the response cache rather than the network."""
+    return resp.headers.get("X-Papyr-Cache") == "hit"
+
+
+def _default_user_agent(mailto: str | None) -> str:
+    agent = f"papyr/{__version__} (https://github.com/granziollucas/papyr"
+    if mailto:
+        agent += f"; mailto:{mailto}"
+    return agent + ")"
+
+
+_DEFAULT: HttpTransport | None = None
+_DEFAULT_LOCK = threading.Lock()
+
+
+def default_transport() -> HttpTransport:
+    """Return the process-wide transport used when none was injected."""
+    global _DEFAULT
+    with _DEFAULT_LOCK:
+        if _DEFAULT is None:
+            _DEFAULT = HttpTransport()
+        return _DEFAULT
+
+
+def get_with_retries(
+    url: str,
+    params: dict[str, Any],
+    pacer: AdaptivePacer,
+    transport: HttpTransport | None = None,
+    headers: dict[str, str] | None = None,
+    timeout: float = 30,
+    max_retries: int = 4,
+    stream: bool = False,
+    cache: bool = True,
+    cache_params: dict[str, Any] | None = None,
+    live_params: Callable[[], dict[str, Any]] | None = None,
+) -> requests.Response:
+    """GET `url` under `pacer`, backing off on 429/5xx and connection errors.
+
+    The cache is consulted once: fresh hits are returned before waiting for a
+    rate-limit slot and stale entries are revalidated. Pass `cache=False` for
+    responses that must not be replayed, such as refresh pages. `cache_params`
+    replaces `params` in the cache key, for requests carrying per-session
+    tokens. `live_params` is called once, only when the request has to go to
+    the network, and returns the params to send. With `stream`, the body is
+    left unread for `iter_content`.
+    """
+    transport = transport or default_transport()
+    key, entry = transport.lookup(url, cache_params or params) if cache else (None, None)
+    if entry is not None and transport.cache.is_fresh(entry):
+        return _cached_response(entry)
+    if live_params is not None:
+        params = live_params()
+    last_exc: Exception | None = None
+    for _attempt in range(1, max_retries + 1):
+        pacer.wait()
+        try:
+            resp = transport.send(url, params, headers, timeout, stream, key, entry)
+        except (requests.Timeout, requests.ConnectionError) as exc:
+            last_exc = exc
+            time.sleep(pacer.throttled(None))
+            continue
+        if resp.status_code == 429 or resp.status_code >= 500:
+            last_exc = requests.HTTPError(f"{resp.status_code} error for url: {resp.url}", response=resp)
+            time.sleep(pacer.throttled(resp))
+            continue
+        resp.raise_for_status()
+        pacer.succeeded(resp)
+        return resp
+    raise last_exc or requests.HTTPError(f"Request failed for url: {url}")
@@ -0,0 +1,158 @@
+"""On-disk HTTP response cache."""
+
+from __future__ import annotations
+
+import hashlib
+import json
+import sqlite3
+import threading
+import time
+import zlib
+from dataclasses import dataclass
+from pathlib import Path
+from typing import Any
+
+DEFAULT_CACHE_PATH = Path.home() / ".papyr" / "http_cache.sqlite"
+
+
+@dataclass
+class CachedResponse:
+    """A cached response body with its validators."""
+
+    key: str
+    url: str
+    body: bytes
+    content_type: str
+    encoding: str | None
+    etag: str | None
+    last_modified: str | None
+    stored_at: float
+
+
+class HttpCache:
+    """SQLite-backed response cache with TTL, revalidation and LRU eviction.
+
+    Bodies are stored zlib-compressed with their `ETag`/`Last-Modified`
+    validators. Entries younger than `ttl_seconds` are fresh; older ones are
+    revalidated by the transport. When the stored bodies exceed `max_bytes`
+    the least recently used entries are evicted.
+    """
+
+    def __init__(self, path: Path, ttl_seconds: int = 86400, max_bytes: int = 512 * 1024 * 1024) -> None:
+        self._path = path
+        self.ttl_seconds = max(0, ttl_seconds)
+        self.max_bytes = max(0, max_bytes)
+        self._local = threading.local()
+
+    @classmethod
+    def from_config(cls, config: dict[str, str]) -> HttpCache | None:
+        """Build the cache from `PAPYR_HTTP_CACHE*` settings; None when disabled."""
+        from papyr.util.config import config_int
+
+        value = str(config.get("PAPYR_HTTP_CACHE", "")).strip()
+        if value.lower() in {"", "0", "off", "none", "false"}:
+            return None
+        path = DEFAULT_CACHE_PATH if value.lower() in {"1", "on", "true"} else Path(value).expanduser()
+        return cls(
+            path,
+            ttl_seconds=config_int(config, "PAPYR_HTTP_CACHE_TTL", 86400),
+            max_bytes=config_int(config, "PAPYR_HTTP_CACHE_MAX_MB", 512) * 1024 * 1024,
+        )
+
+    @staticmethod
+    def key(url: str, params: dict[str, Any] | None) -> str:
+        """Cache key for a GET of `url` with `params`."""
+        payload = json.dumps([url, sorted((str(k), str(v)) for k, v in (params or {}).items())])
+        return hashlib.sha256(payload.encode("utf-8")).hexdigest()
+
+    def lookup(self, key: str) -> CachedResponse | None:
+        """Return the entry for `key` (fresh or stale) and mark it as used."""
+        try:
+            conn = self._conn()
+            row = conn.execute(
+                "SELECT url, body, content_type, encoding, etag, last_modified, stored_at FROM responses WHERE key=?",
+                (key,),
+            ).fetchone()
+            if row is None:
+                return None
+            conn.execute("UPDATE responses SET accessed_at=? WHERE key=?", (time.time(), key))
+        except sqlite3.Error:
+            return None
+        url, body, content_type, encoding, etag, last_modified, stored_at = row
+        return CachedResponse(key, url, zlib.decompress(body), content_type, encoding, etag, last_modified, stored_at)
+
+    def is_fresh(self, entry: CachedResponse) -> bool:
+        return time.time() - entry.stored_at < self.ttl_seconds
+
+    def store(
+        self,
+        key: str,
+        url: str,
+        body: bytes,
+        content_type: str,
+        encoding: str | None,
+        etag: str | None,
+        last_modified: str | None,
+    ) -> None:
+        compressed = zlib.compress(body, 6)
+        now = time.time()
+        try:
+            conn = self._conn()
+            conn.execute(
+                """
+                INSERT OR REPLACE INTO responses
+                (key, url, body, content_type, encoding, etag, last_modified, stored_at, accessed_at, size)
+                VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)
+                """,
+                (key, url, compressed, content_type, encoding, etag, last_modified, now, now, len(compressed)),
+            )
+            self._evict(conn)
+        except sqlite3.Error:
+            return
+
+    def touch(self, key: str) -> None:
+        """Mark a revalidated entry as fresh again."""
+        now = time.time()
+        try:
+            self._conn().execute("UPDATE responses SET stored_at=?, accessed_at=? WHERE key=?", (now, now, key))
+        except sqlite3.Error:
+            return
+
+    def _evict(self, conn: sqlite3.Connection) -> None:
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM responses").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        excess = total - self.max_bytes
+        victims: list[tuple[str]] = []
+        for key, size in conn.execute("SELECT key, size FROM responses ORDER BY accessed_at"):
+            victims.append((key,))
+            excess -= size
+            if excess <= 0:
+                break
+        conn.executemany("DELETE FROM responses WHERE key=?", victims)
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self._path), timeout=30, isolation_level=None)
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute(
+                """
+                CREATE TABLE IF NOT EXISTS responses (
+                    key TEXT PRIMARY KEY,
+                    url TEXT NOT NULL,
+                    body BLOB NOT NULL,
+                    content_type TEXT,
+                    encoding TEXT,
+                    etag TEXT,
+                    last_modified TEXT,
+                    stored_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    size INTEGER NOT NULL
+                )
+                """
+            )
+            conn.execute("CREATE INDEX IF NOT EXISTS idx_responses_accessed ON responses(accessed_at)")
+            self._local.conn = conn
+        return conn
@@ -2,9 +2,9 @@
 
 from __future__ import annotations
 
-from typing import Any, Literal
+from typing import Any, Callable, Literal
 
-from pydantic import BaseModel, Field
+from pydantic import BaseModel, Field, PrivateAttr
 
 
 AccessFilter = Literal["open", "closed", "both"]
@@ -54,6 +54,7 @@ class PaperRecord(BaseModel):
     type: str = ""
     keywords: str = ""
     citations: str = ""
+    score: str = ""
     oa: str = "unknown"
     id: str = ""
     url: str = ""
@@ -69,9 +70,31 @@ class ProviderState(BaseModel):
     cursor: str | None = None
     last_request_time: float | None = None
     extra: dict[str, Any] = Field(default_factory=dict)
+    _on_checkpoint: Callable[[ProviderState], None] | None = PrivateAttr(default=None)
+    _seen: Callable[[list[str]], bool] | None = PrivateAttr(default=None)
+
+    def bind_checkpoint(self, callback: Callable[[ProviderState], None] | None) -> None:
+        """Set the callback that persists this state at page boundaries."""
+        self._on_checkpoint = callback
+
+    def checkpoint(self) -> None:
+        """Persist the state now; adapters call this after each fully consumed page."""
+        if self._on_checkpoint is not None:
+            self._on_checkpoint(self)
+
+    def bind_seen(self, callback: Callable[[list[str]], bool] | None) -> None:
+        """Set the callback that checks record IDs against the records stored for the run."""
+        self._seen = callback
+
+    def all_seen(self, record_ids: list[str]) -> bool:
+        """Return True if every record ID is already stored (always False when unbound)."""
+        if self._seen is None or not record_ids:
+            return False
+        return bool(self._seen(record_ids))
 
 
 class RateLimitPolicy(BaseModel):
     """Rate limit policy."""
 
     min_delay_seconds: float = 1.0
+    burst: int = 1
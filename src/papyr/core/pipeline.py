@@ -2,24 +2,33 @@
 
 from __future__ import annotations
 
+import asyncio
 import csv
+import itertools
 import json
+import sqlite3
 import threading
-import time
 import traceback
+from concurrent.futures import Future
+from concurrent.futures import TimeoutError as FutureTimeoutError
 from pathlib import Path
-from typing import Iterable
+from typing import Any, Callable, Iterable
 
 from rich.console import Console
 from rich.progress import BarColumn, Progress, SpinnerColumn, TaskProgressColumn, TextColumn, TimeRemainingColumn
 
-from papyr.core.dedup import find_duplicates
-from papyr.core.downloader import download_pdf
+from papyr.core.download_queue import DownloadQueue
 from papyr.core.export_csv import export_csv
 from papyr.core.export_tsv import export_tsv
+from papyr.core.http import HttpTransport
 from papyr.core.models import PaperRecord, ProviderState, RawRecord, SearchQuery
 from papyr.core.normalize import normalize_generic
+from papyr.core.pushdown import ResidualFilter
 from papyr.core.state import db, repo
+from papyr.core.state.raw_codec import RawPolicy
+from papyr.core.state.seen import SeenRecords
+from papyr.core.state.writer import StateWriter
+from papyr.util.config import config_int
 from papyr.util.control import KeyboardControl, poll_control, wait_if_paused
 from papyr.util.fs import safe_filename
 from papyr.util.hashing import stable_hash
@@ -45,7 +54,7 @@ def apply_metadata(records: list[PaperRecord], query: SearchQuery) -> list[Paper
     return records
 
 
-def export_results(records: list[PaperRecord], output_dir: Path, output_format: str) -> Path:
+def export_results(records: Iterable[PaperRecord], output_dir: Path, output_format: str) -> Path:
     """Export results in the requested format and return its path."""
     if output_format == "tsv":
         path = output_dir / "results.tsv"
@@ -56,7 +65,7 @@ def export_results(records: list[PaperRecord], output_dir: Path, output_format:
     return path
 
 
-def append_results(records: list[PaperRecord], output_dir: Path, output_format: str) -> Path:
+def append_results(records: Iterable[PaperRecord], output_dir: Path, output_format: str) -> Path:
     """Append results in the requested format and return its path."""
     if output_format == "tsv":
         path = output_dir / "results.tsv"
@@ -67,14 +76,6 @@ def append_results(records: list[PaperRecord], output_dir: Path, output_format:
     return path
 
 
-def deduplicate(records: list[PaperRecord]) -> tuple[list[PaperRecord], list[tuple[PaperRecord, PaperRecord, str]]]:
-    """Return canonical records and duplicate pairs."""
-    duplicates = find_duplicates(records)
-    duplicate_ids = {id(dup[0]) for dup in duplicates}
-    canonical = [record for record in records if id(record) not in duplicate_ids]
-    return canonical, duplicates
-
-
 def run_search(query: SearchQuery, providers: Iterable) -> list[PaperRecord]:
     """Run a basic search across providers (sequential, no persistence yet)."""
     all_records: list[PaperRecord] = []
@@ -94,8 +95,11 @@ def run_metasearch(
     resume_run_id: int | None = None,
     max_new: int | None = None,
     append_new_only: bool = False,
-) -> tuple[list[PaperRecord], str]:
-    """Run sequential provider searches with persistence and CSV export."""
+) -> tuple[int, str]:
+    """Run provider searches with persistence and export.
+
+    Returns the number of canonical records stored for the run and the exit reason.
+    """
     console = console or Console()
     output_dir = Path(query.output_dir)
     output_dir.mkdir(parents=True, exist_ok=True)
@@ -105,10 +109,24 @@ def run_metasearch(
     query_hash = stable_hash(query.model_dump())
     if not query.extra:
         query.extra = {}
-    if config.get("CROSSREF_EMAIL"):
-        query.extra["crossref_email"] = config.get("CROSSREF_EMAIL", "")
-    if config.get("CROSSREF_USER_AGENT"):
-        query.extra["crossref_user_agent"] = config.get("CROSSREF_USER_AGENT", "")
+    if config.get("PAPYR_PREFETCH_PAGES"):
+        query.extra["prefetch_pages"] = config.get("PAPYR_PREFETCH_PAGES", "")
+    if config.get("PAPYR_CROSSREF_FULL_RAW"):
+        query.extra["crossref_full_raw"] = config.get("PAPYR_CROSSREF_FULL_RAW", "")
+    if config.get("PAPYR_CROSSREF_SHARDS"):
+        query.extra["crossref_shards"] = config.get("PAPYR_CROSSREF_SHARDS", "")
+    for key in (
+        "PAPYR_CROSSREF_MIN_SCORE",
+        "PAPYR_CROSSREF_MIN_SCORE_RATIO",
+        "PAPYR_CROSSREF_SCORE_WINDOW",
+        "PAPYR_ARXIV_WINDOW_RESULTS",
+        "PAPYR_ARXIV_PAGE_SIZE",
+        "PAPYR_ARXIV_WINDOW_WORKERS",
+    ):
+        if config.get(key):
+            query.extra[key.removeprefix("PAPYR_").lower()] = config.get(key, "")
+    if config.get("PAPYR_RATE_LIMIT_DB"):
+        query.extra["rate_limit_db"] = config.get("PAPYR_RATE_LIMIT_DB", "")
     logs_dir = output_dir / "logs"
     logs_dir.mkdir(parents=True, exist_ok=True)
     log_stamp = now_iso().replace(":", "").replace("+", "")
@@ -116,66 +134,81 @@ def run_metasearch(
     error_path = logs_dir / f"errors_{log_stamp}.jsonl"
     logger = setup_file_logger(log_path)
 
-    conn = db.connect(output_dir / "state.sqlite")
-    db.init_db(conn)
-
-    if resume_run_id is not None:
-        run_id = resume_run_id
-    else:
-        run_row = repo.get_run_by_hash(conn, query_hash)
-        run_id = run_row["id"] if run_row else repo.create_run(conn, query_hash, query.model_dump())
-
-    existing_ids = repo.list_record_ids(conn, run_id)
-    downloaded_ids = repo.list_downloaded_ids(conn, run_id)
-    all_records: list[PaperRecord] = []
-    record_row_ids: dict[int, int] = {}
-    new_row_ids: set[int] = set()
-    control_path = output_dir / ".papyr_control"
-    keyboard = KeyboardControl()
-    keyboard.start()
-    stop_requested = False
-    exit_reason = "completed"
-    new_count = 0
-
-    total = max_new if max_new is not None else query.limit
-    progress_columns = [
-        SpinnerColumn(),
-        TextColumn("{task.description}"),
-        BarColumn(),
-        TaskProgressColumn(show_speed=True),
-        TimeRemainingColumn(),
-    ]
+    conn = db.open_state(output_dir / "state.sqlite", config)
+    # The connection (and its library ATTACH) is this thread's shared one;
+    # release it so a later run in the same process starts clean.
     try:
-        with Progress(*progress_columns, console=console) as progress:
-            task_id = progress.add_task("Searching", total=total)
-            if query.parallel_providers:
-                (
-                    stop_requested,
-                    exit_reason,
-                    new_row_ids,
-                    existing_ids,
-                    downloaded_ids,
-                ) = _run_parallel_providers(
-                    progress,
-                    task_id,
-                    providers,
-                    query,
-                    query_hash,
-                    config,
-                    output_dir,
-                    control_path,
-                    keyboard,
-                    run_id,
-                    max_new,
-                    existing_ids,
-                    downloaded_ids,
-                    error_path,
-                    log_path,
-                )
-            else:
-                stop_requested, exit_reason, new_row_ids = _run_sequential_providers(
+        library_path = config.get("PAPYR_LIBRARY_DB", "").strip()
+        if library_path:
+            try:
+                db.attach_library(conn, Path(library_path).expanduser())
+            except (sqlite3.Error, OSError) as exc:
+                logger.warning("Shared library unavailable (%s): %s", library_path, exc)
+                console.print(f"Shared library unavailable, continuing without it: {exc}")
+
+        if resume_run_id is not None:
+            run_id = resume_run_id
+        else:
+            run_row = repo.get_run_by_hash(conn, query_hash)
+            run_id = run_row["id"] if run_row else repo.create_run(conn, query_hash, query.model_dump())
+
+        raw_policy = RawPolicy.from_config(config)
+        if raw_policy.retention_days is not None:
+            with conn:
+                repo.purge_raw(conn, raw_policy, run_id)
+        downloaded_ids = repo.list_downloaded_ids(conn, run_id)
+        last_row_id = repo.last_record_row_id(conn, run_id)
+        transport = HttpTransport.from_config(config)
+        providers = list(providers)
+        for provider in providers:
+            provider.transport = transport
+        downloads: DownloadQueue | None = None
+        if query.download_pdfs and not query.dry_run:
+            downloads = DownloadQueue(
+                output_dir / "state.sqlite",
+                run_id,
+                workers=config_int(config, "PAPYR_DOWNLOAD_WORKERS", 4),
+                per_host=config_int(config, "PAPYR_DOWNLOADS_PER_HOST", 2),
+                transport=transport,
+            )
+            downloads.start()
+        writer = StateWriter(
+            conn,
+            run_id,
+            max_rows=config_int(config, "PAPYR_WRITE_BATCH_ROWS", 500),
+            max_delay_ms=config_int(config, "PAPYR_WRITE_BATCH_MS", 1000),
+            on_commit=downloads.wake if downloads else None,
+            raw_policy=raw_policy,
+        )
+        seen = SeenRecords(
+            conn,
+            run_id,
+            writer,
+            bloom_capacity=config_int(config, "PAPYR_SEEN_BLOOM_CAPACITY", 1_000_000),
+        )
+        control_path = output_dir / ".papyr_control"
+        keyboard = KeyboardControl()
+        keyboard.start()
+        stop_requested = False
+        exit_reason = "completed"
+
+        total = max_new if max_new is not None else query.limit
+        progress_columns = [
+            SpinnerColumn(),
+            TextColumn("{task.description}"),
+            BarColumn(),
+            TaskProgressColumn(show_speed=True),
+            TimeRemainingColumn(),
+        ]
+        try:
+            with Progress(*progress_columns, console=console) as progress:
+                task_id = progress.add_task("Searching", total=total)
+                totals = SearchProgress(progress, task_id, estimate=total is None)
+                runner = _run_parallel_providers if query.parallel_providers else _run_sequential_providers
+                stop_requested, exit_reason = runner(
                     progress,
                     task_id,
+                    totals,
                     providers,
                     query,
                     query_hash,
@@ -183,52 +216,90 @@ def run_metasearch(
                     output_dir,
                     control_path,
                     keyboard,
+                    conn,
+                    writer,
                     run_id,
                     max_new,
-                    existing_ids,
+                    seen,
                     downloaded_ids,
                     error_path,
                     log_path,
                 )
+                writer.flush()
+                if downloads:
+                    progress.update(task_id, description="Downloading PDFs")
+                    pending, downloads = downloads, None
+                    _close_downloads(pending, exit_reason == "completed", conn, run_id, error_path, log_path)
+        finally:
+            keyboard.stop()
+            writer.flush()
+            if downloads:
+                _close_downloads(downloads, False, conn, run_id, error_path, log_path)
+            transport.close()
+
+        # Duplicates were resolved against the dedup index as records were committed,
+        # so export streams canonical rows straight from SQLite.
+        # Records updated in place by a delta pass may sit before `last_row_id`,
+        # so such runs re-export everything.
+        append_only = append_new_only and not writer.updated
+        export_after = last_row_id if append_only else 0
+        canonical = repo.iter_paper_records(conn, run_id, after_id=export_after, canonical_only=True)
+        if append_only:
+            append_results(canonical, output_dir, query.output_format)
+        else:
+            export_results(canonical, output_dir, query.output_format)
+        _export_duplicates(repo.iter_duplicates(conn, run_id), output_dir)
+        return repo.count_records(conn, run_id, canonical_only=True), exit_reason
     finally:
-        keyboard.stop()
-
-    all_rows = repo.list_records(conn, run_id)
-    all_records = []
-    record_row_ids = {}
-    row_id_to_record: dict[int, PaperRecord] = {}
-    for row in all_rows:
-        record = PaperRecord.model_validate_json(row["normalized_json"])
-        all_records.append(record)
-        record_row_ids[id(record)] = int(row["id"])
-        row_id_to_record[int(row["id"])] = record
-
-    canonical, duplicates = deduplicate(all_records)
-    for duplicate, canonical_record, _reason in duplicates:
-        duplicate_of = canonical_record.id or canonical_record.url
-        if duplicate_of:
-            duplicate.duplicate_of = duplicate_of
-            row_id = record_row_ids.get(id(duplicate))
-            if row_id:
-                repo.mark_duplicate(conn, row_id, duplicate_of)
-
-    if append_new_only:
-        new_canonical = [
-            record
-            for record in canonical
-            if record_row_ids.get(id(record)) in new_row_ids
-        ]
-        if new_canonical:
-            append_results(new_canonical, output_dir, query.output_format)
-    else:
-        export_results(canonical, output_dir, query.output_format)
-    _export_duplicates(duplicates, output_dir)
-    return canonical, exit_reason
+        db.release_state(output_dir / "state.sqlite")
+
+
+class SearchProgress:
+    """Advance the search progress bar and size it from provider estimates.
+
+    Adapters may publish the number of records they expect to yield as
+    `state.extra["estimate"]`. When neither a limit nor `max_new` fixes the
+    total, the bar's total is the sum of those estimates; providers without
+    one, and finished providers, count the records they actually returned.
+    """
+
+    def __init__(self, progress: Progress, task_id: int, estimate: bool = True) -> None:
+        self._progress = progress
+        self._task_id = task_id
+        self._estimate = estimate
+        self._counts: dict[str, int] = {}
+        self._estimates: dict[str, int] = {}
+
+    def advance(self, provider_name: str, state: ProviderState) -> None:
+        self._progress.advance(self._task_id, 1)
+        self._counts[provider_name] = self._counts.get(provider_name, 0) + 1
+        if not self._estimate:
+            return
+        estimate = state.extra.get("estimate")
+        if isinstance(estimate, int):
+            self._estimates[provider_name] = estimate
+        if self._estimates:
+            self._update()
+
+    def finish(self, provider_name: str) -> None:
+        """Replace a finished provider's estimate with the records it returned."""
+        if provider_name in self._estimates:
+            self._estimates[provider_name] = self._counts.get(provider_name, 0)
+            self._update()
+
+    @property
+    def total(self) -> int:
+        names = set(self._counts) | set(self._estimates)
+        return sum(max(self._counts.get(name, 0), self._estimates.get(name, 0)) for name in names)
+
+    def _update(self) -> None:
+        self._progress.update(self._task_id, total=self.total)
 
 
 def _run_sequential_providers(
     progress: Progress,
     task_id: int,
+    totals: SearchProgress,
     providers: Iterable,
     query: SearchQuery,
     query_hash: str,
@@ -236,20 +307,20 @@ def _run_sequential_providers(
     output_dir: Path,
     control_path: Path,
     keyboard: KeyboardControl,
+    conn: sqlite3.Connection,
+    writer: StateWriter,
     run_id: int,
     max_new: int | None,
-    existing_ids: set[str],
+    seen: SeenRecords,
     downloaded_ids: set[str],
     error_path: Path,
     log_path: Path,
-) -> tuple[bool, str, set[int]]:
+) -> tuple[bool, str]:
     stop_requested = False
     exit_reason = "completed"
     new_count = 0
-    new_row_ids: set[int] = set()
-    conn = db.connect(output_dir / "state.sqlite")
-    db.init_db(conn)
     logger = setup_file_logger(log_path)
+    reuse_library = _reuse_library(conn, config)
     for provider in providers:
         if not provider.is_configured(config):
             continue
@@ -275,10 +346,21 @@ def _run_sequential_providers(
             status = "Running"
             progress.update(task_id, description=f"Searching {provider.name} [{status}]")
         state = repo.get_provider_state(conn, run_id, provider.name) or ProviderState()
+        state = _begin_pass(provider, query, config, state)
+        stop_after = _incremental_stop_after(query, config, state)
+        delta = "delta_since" in state.extra
+        writer.track_state(provider.name, state)
+        state.bind_checkpoint(lambda _state: writer.flush())
+        state.bind_seen(_seen_callback(seen, provider.name))
+        residual = ResidualFilter(query, provider.pushdown(query, state))
+        seen_streak = 0
         try:
             for raw in provider.search(query, state):
-                progress.advance(task_id, 1)
+                totals.advance(provider.name, state)
+                writer.maybe_flush()
                 cmd = poll_control(control_path, keyboard)
+                if cmd in ("STOP", "SAVE_EXIT", "PAUSE"):
+                    writer.flush()
                 if cmd == "STOP":
                     stop_requested = True
                     exit_reason = "stopped"
@@ -297,59 +379,37 @@ def _run_sequential_providers(
                         break
                     status = "Running"
                     progress.update(task_id, description=f"Searching {provider.name} [{status}]")
-                if raw.record_id and raw.record_id in existing_ids:
+                known = bool(raw.record_id) and seen.seen(provider.name, raw.record_id)
+                if known and not delta:
+                    seen_streak += 1
+                    if stop_after and seen_streak >= stop_after:
+                        logger.info("%s: stopped after %d consecutive known records", provider.name, seen_streak)
+                        _mark_complete(state)
+                        break
+                    continue
+                seen_streak = 0
+                record = _normalize_record(provider, raw, query_hash, conn, reuse_library)
+                if not residual.matches(raw, record):
+                    continue
+                # Delta passes re-fetch changed works; they replace the stored row.
+                writer.add_record(provider.name, raw, record, update=known)
+                if known:
                     continue
-                record = provider.normalize(raw)
-                record.query_hash = query_hash
-                record.retrieved_at = now_iso()
-                row_id = repo.insert_record(conn, run_id, provider.name, raw, record)
-                new_row_ids.add(row_id)
                 if raw.record_id:
-                    existing_ids.add(raw.record_id)
+                    seen.add(provider.name, raw.record_id)
                 new_count += 1
                 if query.download_pdfs and not query.dry_run:
-                    urls = provider.get_official_urls(record)
-                    pdf_url = urls.get("pdf_url") if urls else None
-                    if pdf_url:
-                        filename = safe_filename(record.title, record.id or record.url)
-                        dest = output_dir / "files" / filename
-                        if record.id and record.id in downloaded_ids:
-                            continue
-                        if dest.exists():
-                            repo.upsert_download(
-                                conn,
-                                run_id,
-                                record.id or None,
-                                pdf_url,
-                                str(dest),
-                                "ok",
-                                0,
-                                None,
-                            )
-                            if record.id:
-                                downloaded_ids.add(record.id)
-                            continue
-                        result = download_pdf(pdf_url, dest)
-                        status = "ok" if result.ok else "failed"
-                        repo.upsert_download(
-                            conn,
-                            run_id,
-                            record.id or None,
-                            pdf_url,
-                            str(dest) if result.ok else None,
-                            status,
-                            result.attempts,
-                            None if result.ok else result.message,
-                        )
-                        if result.ok and record.id:
-                            downloaded_ids.add(record.id)
+                    _queue_download(writer, provider, record, output_dir, downloaded_ids)
                 if max_new is not None and new_count >= max_new:
                     stop_requested = True
                     exit_reason = "completed"
                     break
+            else:
+                _mark_complete(state)
         except Exception as exc:  # noqa: BLE001 - log and continue per resilience requirements
             message = str(exc) or "Provider search failed."
             stack = traceback.format_exc()
+            writer.flush()
             repo.log_failure(
                 conn,
                 run_id,
@@ -370,15 +430,18 @@ def _run_sequential_providers(
             )
             logger.exception("Provider search failed: %s", provider.name)
             print(f"An error occurred. Please check the log at: {log_path}")
-        repo.upsert_provider_state(conn, run_id, provider.name, state)
+        writer.release_state(provider.name)
+        totals.finish(provider.name)
+        _log_filters(logger, provider.name, residual)
         if stop_requested:
             break
-    return stop_requested, exit_reason, new_row_ids
+    return stop_requested, exit_reason
 
 
 def _run_parallel_providers(
     progress: Progress,
     task_id: int,
+    totals: SearchProgress,
     providers: Iterable,
     query: SearchQuery,
     query_hash: str,
@@ -386,172 +449,323 @@ def _run_parallel_providers(
     output_dir: Path,
     control_path: Path,
     keyboard: KeyboardControl,
+    conn: sqlite3.Connection,
+    writer: StateWriter,
     run_id: int,
     max_new: int | None,
-    existing_ids: set[str],
+    seen: SeenRecords,
     downloaded_ids: set[str],
     error_path: Path,
     log_path: Path,
-) -> tuple[bool, str, set[int], set[str], set[str]]:
-    status = "Running"
-    progress.update(task_id, description=f"Searching providers [{status}]")
-    ids_lock = threading.Lock()
-    db_lock = threading.Lock()
-    progress_lock = threading.Lock()
-    new_row_ids: set[int] = set()
-    stop_event = threading.Event()
-    pause_event = threading.Event()
-    pause_event.set()
-    exit_reason = {"value": "completed"}
-    new_count = {"value": 0}
+) -> tuple[bool, str]:
+    """Drive all configured providers from a single asyncio event loop."""
+    return asyncio.run(
+        _run_async_providers(
+            progress,
+            task_id,
+            totals,
+            providers,
+            query,
+            query_hash,
+            config,
+            output_dir,
+            control_path,
+            keyboard,
+            conn,
+            writer,
+            run_id,
+            max_new,
+            seen,
+            downloaded_ids,
+            error_path,
+            log_path,
+        )
+    )
+
+
+async def _run_async_providers(
+    progress: Progress,
+    task_id: int,
+    totals: SearchProgress,
+    providers: Iterable,
+    query: SearchQuery,
+    query_hash: str,
+    config: dict[str, str],
+    output_dir: Path,
+    control_path: Path,
+    keyboard: KeyboardControl,
+    conn: sqlite3.Connection,
+    writer: StateWriter,
+    run_id: int,
+    max_new: int | None,
+    seen: SeenRecords,
+    downloaded_ids: set[str],
+    error_path: Path,
+    log_path: Path,
+) -> tuple[bool, str]:
+    # Every SQLite write and shared-set update happens on the loop thread, so
+    # no locks are needed; blocking fetches run in worker threads and PDFs are
+    # handed to the download queue.
+    progress.update(task_id, description="Searching providers [Running]")
     logger = setup_file_logger(log_path)
     providers_list = [p for p in providers if p.is_configured(config)]
+    stop_event = asyncio.Event()
+    pause_event = asyncio.Event()
+    pause_event.set()
+    exit_reason = "completed"
+    new_count = 0
+    reuse_library = _reuse_library(conn, config)
+    loop = asyncio.get_running_loop()
+    checkpoint = _loop_checkpoint(writer, loop)
 
-    def control_loop() -> None:
+    async def control_loop() -> None:
+        nonlocal exit_reason
         last_status = "Running"
         while not stop_event.is_set():
             cmd = poll_control(control_path, keyboard)
+            if cmd in ("PAUSE", "STOP", "SAVE_EXIT"):
+                writer.flush()
             if cmd == "PAUSE":
                 pause_event.clear()
                 if last_status != "Paused":
-                    with progress_lock:
-                        progress.update(task_id, description="Searching providers [Paused]")
+                    progress.update(task_id, description="Searching providers [Paused]")
                     last_status = "Paused"
             elif cmd == "RESUME":
                 pause_event.set()
                 if last_status != "Running":
-                    with progress_lock:
-                        progress.update(task_id, description="Searching providers [Running]")
+                    progress.update(task_id, description="Searching providers [Running]")
                     last_status = "Running"
-            elif cmd == "STOP":
-                exit_reason["value"] = "stopped"
+            elif cmd in ("STOP", "SAVE_EXIT"):
+                exit_reason = "stopped" if cmd == "STOP" else "save_exit"
                 stop_event.set()
                 pause_event.set()
                 break
-            elif cmd == "SAVE_EXIT":
-                exit_reason["value"] = "save_exit"
-                stop_event.set()
-                pause_event.set()
-                break
-            time.sleep(0.2)
+            writer.maybe_flush()
+            await asyncio.sleep(0.2)
 
-    def provider_worker(provider) -> None:
-        conn = db.connect(output_dir / "state.sqlite")
-        db.init_db(conn)
+    async def provider_worker(provider) -> None:
+        nonlocal new_count
         state = repo.get_provider_state(conn, run_id, provider.name) or ProviderState()
+        state = _begin_pass(provider, query, config, state)
+        stop_after = _incremental_stop_after(query, config, state)
+        delta = "delta_since" in state.extra
+        writer.track_state(provider.name, state)
+        state.bind_checkpoint(checkpoint)
+        state.bind_seen(_seen_callback(seen, provider.name))
+        residual = ResidualFilter(query, provider.pushdown(query, state))
+        seen_streak = 0
+        stream = provider.asearch(query, state)
         try:
-            for raw in provider.search(query, state):
+            async for raw in stream:
+                await pause_event.wait()
                 if stop_event.is_set():
                     break
-                pause_event.wait()
-                with progress_lock:
-                    progress.advance(task_id, 1)
-                with ids_lock:
-                    if raw.record_id and raw.record_id in existing_ids:
-                        continue
-                record = provider.normalize(raw)
-                record.query_hash = query_hash
-                record.retrieved_at = now_iso()
-                with db_lock:
-                    row_id = repo.insert_record(conn, run_id, provider.name, raw, record)
-                    new_row_ids.add(row_id)
-                with ids_lock:
-                    if raw.record_id:
-                        existing_ids.add(raw.record_id)
-                with ids_lock:
-                    new_count["value"] += 1
-                    reached_limit = max_new is not None and new_count["value"] >= max_new
+                totals.advance(provider.name, state)
+                writer.maybe_flush()
+                known = bool(raw.record_id) and seen.seen(provider.name, raw.record_id)
+                if known and not delta:
+                    seen_streak += 1
+                    if stop_after and seen_streak >= stop_after:
+                        logger.info("%s: stopped after %d consecutive known records", provider.name, seen_streak)
+                        _mark_complete(state)
+                        break
+                    continue
+                seen_streak = 0
+                record = _normalize_record(provider, raw, query_hash, conn, reuse_library)
+                if not residual.matches(raw, record):
+                    continue
+                # Delta passes re-fetch changed works; they replace the stored row.
+                writer.add_record(provider.name, raw, record, update=known)
+                if known:
+                    continue
+                if raw.record_id:
+                    seen.add(provider.name, raw.record_id)
+                new_count += 1
                 if query.download_pdfs and not query.dry_run:
-                    urls = provider.get_official_urls(record)
-                    pdf_url = urls.get("pdf_url") if urls else None
-                    if pdf_url:
-                        filename = safe_filename(record.title, record.id or record.url)
-                        dest = output_dir / "files" / filename
-                        with ids_lock:
-                            already_downloaded = bool(record.id and record.id in downloaded_ids)
-                        if already_downloaded:
-                            pass
-                        elif dest.exists():
-                            with db_lock:
-                                repo.upsert_download(
-                                    conn,
-                                    run_id,
-                                    record.id or None,
-                                    pdf_url,
-                                    str(dest),
-                                    "ok",
-                                    0,
-                                    None,
-                                )
-                            if record.id:
-                                with ids_lock:
-                                    downloaded_ids.add(record.id)
-                        else:
-                            result = download_pdf(pdf_url, dest)
-                            status = "ok" if result.ok else "failed"
-                            with db_lock:
-                                repo.upsert_download(
-                                    conn,
-                                    run_id,
-                                    record.id or None,
-                                    pdf_url,
-                                    str(dest) if result.ok else None,
-                                    status,
-                                    result.attempts,
-                                    None if result.ok else result.message,
-                                )
-                            if result.ok and record.id:
-                                with ids_lock:
-                                    downloaded_ids.add(record.id)
-                if reached_limit:
+                    _queue_download(writer, provider, record, output_dir, downloaded_ids)
+                if max_new is not None and new_count >= max_new:
                     stop_event.set()
                     break
+            else:
+                _mark_complete(state)
         except Exception as exc:  # noqa: BLE001 - log and continue per resilience requirements
             message = str(exc) or "Provider search failed."
             stack = traceback.format_exc()
-            with db_lock:
-                repo.log_failure(
-                    conn,
-                    run_id,
-                    provider.name,
-                    "search",
-                    message,
-                    type(exc).__name__,
-                    stack,
-                    None,
-                )
-                _append_error_jsonl(
-                    error_path,
-                    provider.name,
-                    "search",
-                    message,
-                    type(exc).__name__,
-                    stack,
-                )
+            writer.flush()
+            repo.log_failure(
+                conn,
+                run_id,
+                provider.name,
+                "search",
+                message,
+                type(exc).__name__,
+                stack,
+                None,
+            )
+            _append_error_jsonl(
+                error_path,
+                provider.name,
+                "search",
+                message,
+                type(exc).__name__,
+                stack,
+            )
             logger.exception("Provider search failed: %s", provider.name)
             print(f"An error occurred. Please check the log at: {log_path}")
-        with db_lock:
-            repo.upsert_provider_state(conn, run_id, provider.name, state)
-
-    control_thread = threading.Thread(target=control_loop, name="papyr-control", daemon=True)
-    control_thread.start()
-    threads = [
-        threading.Thread(target=provider_worker, args=(provider,), daemon=True)
-        for provider in providers_list
-    ]
-    for thread in threads:
-        thread.start()
-    for thread in threads:
-        thread.join()
+        finally:
+            await stream.aclose()
+        writer.release_state(provider.name)
+        totals.finish(provider.name)
+        _log_filters(logger, provider.name, residual)
+
+    control_task = asyncio.create_task(control_loop())
+    await asyncio.gather(*(provider_worker(provider) for provider in providers_list))
     stop_event.set()
-    return stop_event.is_set(), exit_reason["value"], new_row_ids, existing_ids, downloaded_ids
+    await control_task
+    return True, exit_reason
+
+
+def _loop_checkpoint(writer: StateWriter, loop: asyncio.AbstractEventLoop):
+    """Checkpoint callback for adapters driven from worker threads.
+
+    The flush runs on the event loop thread, which owns the connection, and
+    the adapter waits for it before fetching the next page.
+    """
+    flush = _loop_call(writer.flush, loop)
+    return lambda _state: flush()
+
+
+def _loop_call(func: Callable[..., Any], loop: asyncio.AbstractEventLoop) -> Callable[..., Any]:
+    """Wrap `func` so calls from worker threads run on the event loop thread and wait for the result."""
+    loop_thread = threading.get_ident()
+
+    def call(*args: Any) -> Any:
+        if threading.get_ident() == loop_thread:
+            return func(*args)
+        done: Future = Future()
+
+        def run() -> None:
+            try:
+                result = func(*args)
+            except BaseException as exc:  # noqa: BLE001 - re-raised in the calling thread
+                done.set_exception(exc)
+            else:
+                done.set_result(result)
+
+        loop.call_soon_threadsafe(run)
+        while True:
+            try:
+                return done.result(timeout=0.5)
+            except FutureTimeoutError:
+                if not loop.is_running():
+                    return None
+
+    return call
+
+
+def _seen_callback(seen: SeenRecords, provider_name: str) -> Callable[[list[str]], bool]:
+    # Adapters call this from their paging threads, so it must not use the run's connection there.
+    return lambda record_ids: seen.all_stored(provider_name, record_ids)
+
+
+def _begin_pass(provider, query: SearchQuery, config: dict[str, str], state: ProviderState) -> ProviderState:
+    """Return the state to page with, starting a new pass for providers that finished one.
+
+    With `PAPYR_SYNC=1`, providers that support delta sync fetch only works
+    indexed since the last completed pass (`state.extra["high_water"]`).
+    Otherwise date-sorted queries start an incremental refresh pass.
+    """
+    if state.extra.get("complete"):
+        if config.get("PAPYR_SYNC", "0") == "1" and provider.delta_sync and state.extra.get("high_water"):
+            return _next_pass(state, delta_since=state.extra["high_water"])
+        if _incremental_stop_after(query, config, state):
+            return _next_pass(state, refresh=True)
+        return state
+    state.extra.setdefault("pass_started", _today())
+    return state
+
+
+def _incremental_stop_after(query: SearchQuery, config: dict[str, str], state: ProviderState) -> int:
+    """Consecutive known records after which a refresh pass stops (0 = page to the end).
+
+    Only date-sorted queries whose provider already finished a full pass
+    (`state.extra["complete"]`), or is part-way through a refresh pass, refresh
+    incrementally.
+    """
+    if query.sort_order != "date" or not (state.extra.get("complete") or state.extra.get("refresh")):
+        return 0
+    return max(0, config_int(config, "PAPYR_INCREMENTAL_STOP_AFTER", 100))
+
+
+def _next_pass(state: ProviderState, **flags: Any) -> ProviderState:
+    """Fresh paging state for a new pass, keeping the learned request pace and the high-water mark."""
+    extra = {key: state.extra[key] for key in ("pacing", "high_water") if key in state.extra}
+    return ProviderState(extra={**extra, **flags, "pass_started": _today()})
+
+
+def _mark_complete(state: ProviderState) -> None:
+    """Record a finished pass; its start date becomes the next delta's high-water mark."""
+    state.extra["high_water"] = state.extra.pop("pass_started", None) or _today()
+    state.extra.pop("refresh", None)
+    state.extra.pop("delta_since", None)
+    state.extra["complete"] = True
+
+
+def _today() -> str:
+    return now_iso()[:10]
+
+
+def _log_filters(logger, provider_name: str, residual: ResidualFilter) -> None:
+    if residual.pushed or residual.local:
+        logger.info("%s filters: %s", provider_name, residual.summary())
+
+
+def _reuse_library(conn: sqlite3.Connection, config: dict[str, str]) -> bool:
+    return config.get("PAPYR_LIBRARY_REUSE", "0") == "1" and db.has_library(conn)
+
+
+def _normalize_record(
+    provider,
+    raw: RawRecord,
+    query_hash: str,
+    conn: sqlite3.Connection,
+    reuse_library: bool,
+) -> PaperRecord:
+    """Normalize `raw`, reusing the shared library's normalization when allowed."""
+    record = repo.get_library_record(conn, provider.name, raw.record_id) if reuse_library else None
+    if record is None:
+        record = provider.normalize(raw)
+    record.query_hash = query_hash
+    record.retrieved_at = now_iso()
+    return record
+
+
+def _queue_download(
+    writer: StateWriter,
+    provider,
+    record: PaperRecord,
+    output_dir: Path,
+    downloaded_ids: set[str],
+) -> None:
+    """Queue the record's official PDF for the download workers."""
+    if record.id and record.id in downloaded_ids:
+        return
+    urls = provider.get_official_urls(record)
+    pdf_url = urls.get("pdf_url") if urls else None
+    if not pdf_url:
+        return
+    filename = safe_filename(record.title, record.id or record.url)
+    dest = output_dir / "files" / filename
+    writer.add_download(record.id or None, pdf_url, str(dest), "queued", 0, None)
 
 
 def _export_duplicates(
-    duplicates: list[tuple[PaperRecord, PaperRecord, str]],
+    duplicates: Iterable[tuple[PaperRecord, PaperRecord | None, str]],
     output_dir: Path,
 ) -> None:
-    if not duplicates:
+    iterator = iter(duplicates)
+    first = next(iterator, None)
+    if first is None:
         return
     logs_dir = output_dir / "logs"
     logs_dir.mkdir(parents=True, exist_ok=True)
@@ -560,8 +774,36 @@ def _export_duplicates(
     with path.open("w", encoding="latin1", newline="") as handle:
         writer = csv.writer(handle, quoting=csv.QUOTE_ALL)
         writer.writerow(["DuplicateTitle", "DuplicateID", "CanonicalTitle", "CanonicalID", "Reason"])
-        for duplicate, canonical, reason in duplicates:
-            writer.writerow([duplicate.title, duplicate.id, canonical.title, canonical.id, reason])
+        for duplicate, canonical, reason in itertools.chain([first], iterator):
+            writer.writerow(
+                [
+                    duplicate.title,
+                    duplicate.id,
+                    canonical.title if canonical else "",
+                    canonical.id if canonical else "",
+                    reason,
+                ]
+            )
+
+
+def _close_downloads(
+    downloads: DownloadQueue,
+    drain: bool,
+    conn: sqlite3.Connection,
+    run_id: int,
+    error_path: Path,
+    log_path: Path,
+) -> None:
+    """Close the download queue, logging a dispatcher failure to the run's error logs."""
+    try:
+        downloads.close(drain=drain)
+    except Exception as exc:  # noqa: BLE001 - log and continue per resilience requirements
+        message = str(exc) or "PDF downloads failed."
+        stack = traceback.format_exc()
+        repo.log_failure(conn, run_id, "downloads", "download", message, type(exc).__name__, stack, None)
+        _append_error_jsonl(error_path, "downloads", "download", message, type(exc).__name__, stack)
+        setup_file_logger(log_path).exception("PDF download queue failed")
+        print(f"An error occurred. Please check the log at: {log_path}")
 
 
 def _append_error_jsonl(
@@ -0,0 +1,235 @@
+"""Bounded read-ahead for paged provider APIs."""
+
+from __future__ import annotations
+
+import queue
+import threading
+from contextlib import closing
+from typing import Any, Callable, Generator, Iterator
+
+Page = tuple[list[Any], Any]
+# A page streamed item by item; the generator returns the next page's token.
+PageStream = Generator[Any, None, Any]
+
+# Marks the end of a streamed page, paired with the next page's token.
+PAGE_END = object()
+
+_DONE = object()
+
+
+def prefetch_pages(
+    fetch_page: Callable[[Any], Page],
+    token: Any,
+    depth: int = 1,
+) -> Iterator[Page]:
+    """Yield `(items, next_token)` pages, fetching up to `depth` pages ahead.
+
+    `fetch_page(token)` returns the items of one page and the token of the next
+    page (None when there is no next page). Fetches run on a background thread
+    as soon as the queue has room, so rate-limit waits and HTTP latency overlap
+    with the consumer's processing. With `depth <= 0` pages are fetched inline.
+    The consumer decides when a page counts as consumed; nothing here touches
+    provider state.
+    """
+    if depth <= 0:
+        while True:
+            items, next_token = fetch_page(token)
+            yield items, next_token
+            if not items or next_token is None:
+                return
+            token = next_token
+
+    pages: queue.Queue = queue.Queue(maxsize=depth)
+    stop = threading.Event()
+
+    def put(item: object) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def worker() -> None:
+        current = token
+        try:
+            while not stop.is_set():
+                items, next_token = fetch_page(current)
+                if not put((items, next_token)):
+                    return
+                if not items or next_token is None:
+                    break
+                current = next_token
+        except BaseException as exc:  # noqa: BLE001 - re-raised in the consumer
+            put(exc)
+            return
+        put(_DONE)
+
+    thread = threading.Thread(target=worker, name="papyr-prefetch", daemon=True)
+    thread.start()
+    try:
+        while True:
+            page = pages.get()
+            if page is _DONE:
+                return
+            if isinstance(page, BaseException):
+                raise page
+            yield page
+    finally:
+        stop.set()
+
+
+def merge_pages(
+    sources: dict[Any, tuple[Callable[[Any], Page], Any]],
+    depth: int = 1,
+) -> Iterator[tuple[Any, list[Any], Any]]:
+    """Page several sources concurrently and yield `(key, items, next_token)` as pages arrive.
+
+    `sources` maps a key to `(fetch_page, token)`. Each source is paged on its
+    own thread, stopping after a page with no items or no next token, and up
+    to `depth` pages per source are buffered. As with `prefetch_pages`, the
+    consumer decides when a page counts as consumed.
+    """
+    if not sources:
+        return
+    pages: queue.Queue = queue.Queue(maxsize=max(1, depth) * len(sources))
+    stop = threading.Event()
+
+    def put(item: object) -> bool:
+        while not stop.is_set():
+            try:
+                pages.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def worker(key: Any, fetch_page: Callable[[Any], Page], token: Any) -> None:
+        current = token
+        try:
+            while not stop.is_set():
+                items, next_token = fetch_page(current)
+                if not put((key, items, next_token)):
+                    return
+                if not items or next_token is None:
+                    break
+                current = next_token
+        except BaseException as exc:  # noqa: BLE001 - re-raised in the consumer
+            put((key, exc, None))
+            return
+        put((key, _DONE, None))
+
+    for key, (fetch_page, token) in sources.items():
+        threading.Thread(target=worker, args=(key, fetch_page, token), name="papyr-prefetch", daemon=True).start()
+    running = len(sources)
+    try:
+        while running:
+            key, items, next_token = pages.get()
+            if items is _DONE:
+                running -= 1
+                continue
+            if isinstance(items, BaseException):
+                raise items
+            yield key, items, next_token
+    finally:
+        stop.set()
+
+
+def stream_pages(
+    fetch_page: Callable[[Any], PageStream],
+    token: Any,
+    buffer: int = 0,
+) -> Iterator[tuple[Any, Any]]:
+    """Yield the items of successive pages as they arrive, reading up to `buffer` items ahead.
+
+    `fetch_page(token)` is a generator yielding the items of one page and
+    returning the token of the next page (None when there is no next page).
+    Every item is yielded as `(item, None)`, followed by `(PAGE_END,
+    next_token)` once its page is exhausted, so the consumer advances its
+    cursor only after the whole page was handed over. With `buffer <= 0`
+    pages are streamed inline; otherwise a background thread reads ahead.
+    """
+    if buffer > 0:
+        for _key, item, next_token in merge_streams({None: (fetch_page, token)}, buffer):
+            yield item, next_token
+        return
+    while True:
+        end: list[Any] = []
+        count = 0
+        with closing(_page_items(fetch_page(token), end)) as items:
+            for item in items:
+                count += 1
+                yield item, None
+        yield PAGE_END, end[0]
+        if not count or end[0] is None:
+            return
+        token = end[0]
+
+
+def merge_streams(
+    sources: dict[Any, tuple[Callable[[Any], PageStream], Any]],
+    buffer: int,
+) -> Iterator[tuple[Any, Any, Any]]:
+    """Stream several paged sources concurrently and yield `(key, item, None)` as items arrive.
+
+    `sources` maps a key to `(fetch_page, token)`, where `fetch_page` is a
+    page generator as in `stream_pages`. Each source is paged on its own
+    thread, stopping after a page with no items or no next token; the end of
+    every page is yielded as `(key, PAGE_END, next_token)`. At most `buffer`
+    items are read ahead across all sources.
+    """
+    if not sources:
+        return
+    pending: queue.Queue = queue.Queue(maxsize=max(1, buffer))
+    stop = threading.Event()
+
+    def put(item: object) -> bool:
+        while not stop.is_set():
+            try:
+                pending.put(item, timeout=0.2)
+                return True
+            except queue.Full:
+                continue
+        return False
+
+    def worker(key: Any, fetch_page: Callable[[Any], PageStream], token: Any) -> None:
+        current = token
+        try:
+            while not stop.is_set():
+                end: list[Any] = []
+                count = 0
+                with closing(_page_items(fetch_page(current), end)) as items:
+                    for item in items:
+                        count += 1
+                        if not put((key, item, None)):
+                            return
+                if not put((key, PAGE_END, end[0])):
+                    return
+                if not count or end[0] is None:
+                    break
+                current = end[0]
+        except BaseException as exc:  # noqa: BLE001 - re-raised in the consumer
+            put((key, exc, None))
+            return
+        put((key, _DONE, None))
+
+    for key, (fetch_page, token) in sources.items():
+        threading.Thread(target=worker, args=(key, fetch_page, token), name="papyr-prefetch", daemon=True).start()
+    running = len(sources)
+    try:
+        while running:
+            key, item, next_token = pending.get()
+            if item is _DONE:
+                running -= 1
+                continue
+            if isinstance(item, BaseException):
+                raise item
+            yield key, item, next_token
+    finally:
+        stop.set()
+
+
+def _page_items(page: PageStream, end: list[Any]) -> Iterator[Any]:
+    """Yield the items of `page`, appending the token it returns to `end`."""
+    end.append((yield from page))
@@ -0,0 +1,154 @@
+"""Query constraint pushdown and the local residual filter.
+
+Providers report which constraints of a `SearchQuery` they enforce
+server-side (`Provider.pushdown`); `ResidualFilter` applies the rest to
+normalized records and counts what it drops.
+"""
+
+from __future__ import annotations
+
+from papyr.core.models import PaperRecord, RawRecord, SearchQuery
+
+CONSTRAINTS = ("years", "types", "languages", "access", "fields")
+
+FIELD_ALIASES = {
+    "title": "title",
+    "titles": "title",
+    "abstract": "abstract",
+    "abstracts": "abstract",
+    "author": "authors",
+    "authors": "authors",
+    "keyword": "keywords",
+    "keywords": "keywords",
+    "subject": "keywords",
+    "subjects": "keywords",
+}
+
+TYPE_ALIASES = {"preprint": {"preprint", "posted-content"}}
+
+LANGUAGE_NAMES = {
+    "chinese": "zh",
+    "dutch": "nl",
+    "english": "en",
+    "french": "fr",
+    "german": "de",
+    "italian": "it",
+    "japanese": "ja",
+    "korean": "ko",
+    "portuguese": "pt",
+    "russian": "ru",
+    "spanish": "es",
+}
+
+
+def search_fields(query: SearchQuery) -> list[str]:
+    """Recognized `fields_to_search` values, normalized and de-duplicated."""
+    fields: list[str] = []
+    for value in query.fields_to_search:
+        field = FIELD_ALIASES.get(value.strip().lower())
+        if field and field not in fields:
+            fields.append(field)
+    return fields
+
+
+def accepted_types(query: SearchQuery) -> set[str]:
+    """Requested publication types, including provider spellings of the same type."""
+    types: set[str] = set()
+    for value in query.types:
+        value = value.strip().lower()
+        if value:
+            types |= TYPE_ALIASES.get(value, {value})
+    return types
+
+
+def language_codes(query: SearchQuery) -> set[str]:
+    """Requested languages as lower-case ISO 639-1 codes where the name is known."""
+    codes: set[str] = set()
+    for value in query.languages:
+        value = value.strip().lower()
+        if value:
+            codes.add(LANGUAGE_NAMES.get(value, value))
+    return codes
+
+
+def requested_constraints(query: SearchQuery) -> set[str]:
+    """Constraints the query actually sets."""
+    requested: set[str] = set()
+    if query.year_start or query.year_end:
+        requested.add("years")
+    if accepted_types(query):
+        requested.add("types")
+    if language_codes(query):
+        requested.add("languages")
+    if query.access_filter in ("open", "closed"):
+        requested.add("access")
+    if search_fields(query):
+        requested.add("fields")
+    return requested
+
+
+class ResidualFilter:
+    """Apply the constraints a provider did not push down and count the drops."""
+
+    def __init__(self, query: SearchQuery, pushed: set[str]) -> None:
+        self.pushed = requested_constraints(query) & pushed
+        self.local = requested_constraints(query) - pushed
+        self.checked = 0
+        self.dropped: dict[str, int] = {}
+        self._query = query
+        self._types = accepted_types(query)
+        self._languages = language_codes(query)
+        self._fields = search_fields(query)
+        self._terms = [term.lower() for term in query.keywords.split() if term]
+
+    def matches(self, raw: RawRecord, record: PaperRecord) -> bool:
+        """Return True if the record satisfies every locally applied constraint."""
+        if not self.local:
+            return True
+        self.checked += 1
+        for constraint in CONSTRAINTS:
+            if constraint in self.local and not getattr(self, f"_match_{constraint}")(raw, record):
+                self.dropped[constraint] = self.dropped.get(constraint, 0) + 1
+                return False
+        return True
+
+    def summary(self) -> str:
+        """One-line account of where each constraint was applied, for the run log."""
+        server = ", ".join(sorted(self.pushed)) or "none"
+        local = ", ".join(sorted(self.local)) or "none"
+        dropped = sum(self.dropped.values())
+        detail = ", ".join(f"{name}={count}" for name, count in sorted(self.dropped.items()))
+        text = f"server-side: {server}; local: {local}; filtered locally {dropped} of {self.checked}"
+        return f"{text} ({detail})" if detail else text
+
+    def _match_years(self, raw: RawRecord, record: PaperRecord) -> bool:
+        if not record.year.isdigit():
+            return True
+        year = int(record.year)
+        if self._query.year_start and year < self._query.year_start:
+            return False
+        return not (self._query.year_end and year > self._query.year_end)
+
+    def _match_types(self, raw: RawRecord, record: PaperRecord) -> bool:
+        return not record.type or record.type.lower() in self._types
+
+    def _match_languages(self, raw: RawRecord, record: PaperRecord) -> bool:
+        language = str(raw.data.get("language") or "").strip().lower()
+        if not language:
+            return True
+        return language in self._languages or language.split("-")[0] in self._languages
+
+    def _match_access(self, raw: RawRecord, record: PaperRecord) -> bool:
+        oa = record.oa.lower()
+        if self._query.access_filter == "open":
+            return oa != "closed"
+        return oa != "open"
+
+    def _match_fields(self, raw: RawRecord, record: PaperRecord) -> bool:
+        if not self._terms:
+            return True
+        for field in self._fields:
+            text = getattr(record, field, "").lower()
+            if all(term in text for term in self._terms):
+                return True
+        return False
@@ -2,10 +2,17 @@
 
 from __future__ import annotations
 
+import sqlite3
+import threading
 import time
+from email.utils import parsedate_to_datetime
+from pathlib import Path
+from typing import Any
 
 from papyr.core.models import RateLimitPolicy
 
+DEFAULT_STORE_PATH = Path.home() / ".papyr" / "rate_limits.sqlite"
+
 
 class RateLimiter:
     """Simple rate limiter using minimum delay between calls."""
@@ -23,3 +30,207 @@ class RateLimiter:
         if elapsed < self._policy.min_delay_seconds:
             time.sleep(self._policy.min_delay_seconds - elapsed)
         self._last_call = time.time()
+
+
+class _MemoryBuckets:
+    """Token buckets shared by threads of this process."""
+
+    def __init__(self) -> None:
+        self._lock = threading.Lock()
+        self._buckets: dict[str, tuple[float, float]] = {}
+
+    def reserve(self, key: str, rate: float, capacity: float, now: float) -> float:
+        with self._lock:
+            tokens, updated = self._buckets.get(key, (capacity, now))
+            tokens = min(capacity, tokens + max(0.0, now - updated) * rate) - 1.0
+            self._buckets[key] = (tokens, now)
+        return max(0.0, -tokens / rate)
+
+
+class _SqliteBuckets:
+    """Token buckets shared by every process using the same SQLite file."""
+
+    def __init__(self, path: Path) -> None:
+        self._path = path
+        self._local = threading.local()
+
+    def _conn(self) -> sqlite3.Connection:
+        conn = getattr(self._local, "conn", None)
+        if conn is None:
+            self._path.parent.mkdir(parents=True, exist_ok=True)
+            conn = sqlite3.connect(str(self._path), timeout=30, isolation_level=None)
+            conn.execute(
+                "CREATE TABLE IF NOT EXISTS buckets (key TEXT PRIMARY KEY, tokens REAL NOT NULL, updated_at REAL NOT NULL)"
+            )
+            self._local.conn = conn
+        return conn
+
+    def reserve(self, key: str, rate: float, capacity: float, now: float) -> float:
+        conn = self._conn()
+        conn.execute("BEGIN IMMEDIATE")
+        try:
+            row = conn.execute("SELECT tokens, updated_at FROM buckets WHERE key=?", (key,)).fetchone()
+            tokens, updated = row if row else (capacity, now)
+            tokens = min(capacity, tokens + max(0.0, now - updated) * rate) - 1.0
+            conn.execute(
+                "INSERT OR REPLACE INTO buckets (key, tokens, updated_at) VALUES (?, ?, ?)",
+                (key, tokens, now),
+            )
+            conn.execute("COMMIT")
+        except Exception:
+            conn.execute("ROLLBACK")
+            raise
+        return max(0.0, -tokens / rate)
+
+
+class TokenBucketLimiter:
+    """Token bucket keyed by provider name.
+
+    Refills at one token per `policy.min_delay_seconds` up to `policy.burst`
+    tokens. Each `wait()` reserves a token and sleeps until it is due, so
+    concurrent callers queue fairly. All limiters with the same key and store
+    share one bucket, across threads and (with a SQLite store) processes.
+    """
+
+    def __init__(self, key: str, policy: RateLimitPolicy, store: _MemoryBuckets | _SqliteBuckets) -> None:
+        self.key = key
+        self._policy = policy
+        self._store = store
+        self._fallback = _MEMORY
+        self._interval = policy.min_delay_seconds
+
+    @property
+    def interval(self) -> float:
+        return max(self._interval, 1e-3)
+
+    def set_interval(self, seconds: float) -> None:
+        """Change the refill interval used by this limiter's reservations."""
+        self._interval = seconds
+
+    def wait(self) -> None:
+        """Sleep until this caller's token is available."""
+        rate = 1.0 / self.interval
+        capacity = float(max(1, self._policy.burst))
+        try:
+            delay = self._store.reserve(self.key, rate, capacity, time.time())
+        except (sqlite3.Error, OSError):
+            delay = self._fallback.reserve(self.key, rate, capacity, time.time())
+        if delay > 0:
+            time.sleep(delay)
+
+
+class AdaptivePacer:
+    """AIMD pacing on top of a token-bucket limiter.
+
+    Successful responses raise the request rate additively up to the fastest
+    rate the provider allows; throttling (429/5xx/timeouts) halves it.
+    `Retry-After` is honored verbatim. Crossref's `X-Rate-Limit-Limit` and
+    `X-Rate-Limit-Interval` headers can raise the floor above the policy
+    delay, never lower it.
+    `snapshot()` is stored in `ProviderState.extra["pacing"]` so a resumed run
+    starts at the last rate that worked.
+    """
+
+    max_interval = 60.0
+
+    def __init__(
+        self,
+        limiter: TokenBucketLimiter,
+        policy: RateLimitPolicy,
+        saved: dict[str, Any] | None = None,
+    ) -> None:
+        self._limiter = limiter
+        self._lock = threading.Lock()
+        saved = saved or {}
+        self._policy_interval = policy.min_delay_seconds
+        self._min_interval = max(self._policy_interval, float(saved.get("min_interval") or 0.0))
+        interval = float(saved.get("interval") or policy.min_delay_seconds)
+        self._interval = min(self.max_interval, max(self._min_interval, interval))
+        self._limiter.set_interval(self._interval)
+
+    @property
+    def interval(self) -> float:
+        return self._interval
+
+    def wait(self) -> None:
+        """Wait for the next request slot."""
+        self._limiter.wait()
+
+    def succeeded(self, resp: Any) -> None:
+        """Record a successful response and speed up additively."""
+        with self._lock:
+            header_interval = _header_min_interval(resp)
+            if header_interval is not None:
+                self._min_interval = max(self._policy_interval, header_interval)
+            max_rate = 1.0 / max(self._min_interval, 1e-3)
+            rate = 1.0 / self._interval + max_rate * 0.1
+            self._set(1.0 / min(rate, max_rate))
+
+    def throttled(self, resp: Any | None = None) -> float:
+        """Record throttling, halve the rate and return seconds to back off."""
+        with self._lock:
+            self._set(self._interval * 2)
+            retry_after = _retry_after_seconds(resp)
+            return retry_after if retry_after is not None else self._interval
+
+    def snapshot(self) -> dict[str, float]:
+        return {"interval": round(self._interval, 4), "min_interval": round(self._min_interval, 4)}
+
+    def _set(self, interval: float) -> None:
+        self._interval = min(self.max_interval, max(self._min_interval, interval))
+        self._limiter.set_interval(self._interval)
+
+
+def _retry_after_seconds(resp: Any | None) -> float | None:
+    value = (getattr(resp, "headers", None) or {}).get("Retry-After")
+    if not value:
+        return None
+    value = value.strip()
+    if value.isdigit():
+        return float(value)
+    try:
+        when = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, when.timestamp() - time.time())
+
+
+def _header_min_interval(resp: Any) -> float | None:
+    headers = getattr(resp, "headers", None) or {}
+    limit = headers.get("X-Rate-Limit-Limit")
+    window = headers.get("X-Rate-Limit-Interval")
+    if not limit or not window:
+        return None
+    try:
+        count = int(limit)
+        seconds = float(window.strip().rstrip("s"))
+    except ValueError:
+        return None
+    if count <= 0 or seconds <= 0:
+        return None
+    return seconds / count
+
+
+_MEMORY = _MemoryBuckets()
+_STORES: dict[Path, _SqliteBuckets] = {}
+_STORES_LOCK = threading.Lock()
+
+
+def rate_limit_store_path(extra: dict[str, str]) -> Path | None:
+    """Resolve the shared bucket store from query extras (`rate_limit_db`).
+
+    Unset uses the per-user default; `off` keeps buckets in this process only.
+    """
+    value = str(extra.get("rate_limit_db", "")).strip()
+    if value.lower() in {"off", "none", "0"}:
+        return None
+    return Path(value).expanduser() if value else DEFAULT_STORE_PATH
+
+
+def shared_limiter(key: str, policy: RateLimitPolicy, store_path: Path | None = None) -> TokenBucketLimiter:
+    """Return a limiter whose bucket is shared by everyone using `key`."""
+    if store_path is None:
+        return TokenBucketLimiter(key, policy, _MEMORY)
+    with _STORES_LOCK:
+        store = _STORES.setdefault(store_path, _SqliteBuckets(store_path))
+    return TokenBucketLimiter(key, policy, store)
@@ -2,23 +2,278 @@
 
 from __future__ import annotations
 
+import logging
 import sqlite3
+import threading
 from pathlib import Path
 
+from papyr.core.dedup import dedup_keys
+from papyr.core.models import PaperRecord
+from papyr.util.config import config_int
 
-def connect(db_path: Path) -> sqlite3.Connection:
-    """Create a SQLite connection with row factory."""
+logger = logging.getLogger(__name__)
+
+# Bump when schema.sql or `_migrate_records` changes; stored in PRAGMA user_version.
+SCHEMA_VERSION = 3
+
+# PaperRecord fields stored as typed `records` columns. `id` is stored as
+# `paper_id`; `duplicate_of` is the existing dedup column.
+RECORD_FIELD_COLUMNS = {
+    name: "paper_id" if name == "id" else name
+    for name in PaperRecord.model_fields
+    if name != "duplicate_of"
+}
+
+# Columns added after the first release; `init_db` adds them to older databases.
+_RECORD_COLUMNS = {
+    **{column: "TEXT" for column in RECORD_FIELD_COLUMNS.values()},
+    "title_key": "TEXT",
+    "id_key": "TEXT",
+    "authors_key": "TEXT",
+    "is_preprint": "INTEGER NOT NULL DEFAULT 0",
+    "duplicate_reason": "TEXT",
+    "canonical_row_id": "INTEGER",
+    "library_id": "TEXT",
+    "raw_codec": "TEXT",
+}
+
+_RECORD_INDEXES = [
+    "CREATE INDEX IF NOT EXISTS idx_records_dedup ON records(run_id, title_key, id_key)",
+    "CREATE UNIQUE INDEX IF NOT EXISTS idx_records_unique ON records(run_id, provider, record_id)",
+]
+
+
+def pragmas_from_config(config: dict[str, str]) -> dict[str, int | str]:
+    """Return tuned connection pragmas from `PAPYR_SQLITE_*` settings."""
+    temp_store = str(config.get("PAPYR_SQLITE_TEMP_STORE", "MEMORY")).strip().upper()
+    return {
+        "cache_size": -1024 * config_int(config, "PAPYR_SQLITE_CACHE_MB", 64),
+        "mmap_size": 1024 * 1024 * config_int(config, "PAPYR_SQLITE_MMAP_MB", 256),
+        "temp_store": temp_store if temp_store in {"DEFAULT", "FILE", "MEMORY"} else "MEMORY",
+        "busy_timeout": config_int(config, "PAPYR_SQLITE_BUSY_TIMEOUT_MS", 5000),
+    }
+
+
+def connect(
+    db_path: Path,
+    pragmas: dict[str, int | str] | None = None,
+    check_same_thread: bool = True,
+) -> sqlite3.Connection:
+    """Create a SQLite connection with row factory and tuned pragmas."""
     db_path.parent.mkdir(parents=True, exist_ok=True)
-    conn = sqlite3.connect(str(db_path))
+    conn = sqlite3.connect(str(db_path), check_same_thread=check_same_thread)
     conn.row_factory = sqlite3.Row
     conn.execute("PRAGMA journal_mode=WAL;")
     conn.execute("PRAGMA synchronous=NORMAL;")
+    conn.execute("PRAGMA foreign_keys=ON;")
+    for name, value in (pragmas or pragmas_from_config({})).items():
+        conn.execute(f"PRAGMA {name}={value};")
+    return conn
+
+
+def connect_readonly(db_path: Path, busy_timeout_ms: int = 5000) -> sqlite3.Connection:
+    """Open a read-only connection to an existing database, for lookups from worker threads."""
+    conn = sqlite3.connect(f"{Path(db_path).resolve().as_uri()}?mode=ro", uri=True)
+    conn.row_factory = sqlite3.Row
+    conn.execute(f"PRAGMA busy_timeout={busy_timeout_ms};")
     return conn
 
 
+class ConnectionManager:
+    """Open each state database once per thread, migrated and tuned.
+
+    Connections are cached per thread and path, so repeated lookups on a
+    thread reuse the same connection and schema checks run only when a
+    connection is first opened.
+    """
+
+    def __init__(self) -> None:
+        self._local = threading.local()
+        self._lock = threading.Lock()
+        self._open: list[sqlite3.Connection] = []
+
+    def get(self, db_path: Path, config: dict[str, str] | None = None) -> sqlite3.Connection:
+        """Return this thread's connection to `db_path`, opening it on first use."""
+        key = Path(db_path).resolve()
+        conns = self._connections()
+        conn = conns.get(key)
+        if conn is None:
+            conn = connect(key, pragmas_from_config(config or {}), check_same_thread=False)
+            init_db(conn)
+            conns[key] = conn
+            with self._lock:
+                self._open.append(conn)
+        return conn
+
+    def release(self, db_path: Path) -> None:
+        """Close this thread's connection to `db_path`, if open."""
+        conn = self._connections().pop(Path(db_path).resolve(), None)
+        if conn is not None:
+            with self._lock:
+                self._open.remove(conn)
+            conn.close()
+
+    def close_all(self) -> None:
+        """Close every connection opened through this manager."""
+        with self._lock:
+            conns, self._open = self._open, []
+        for conn in conns:
+            conn.close()
+        self._local = threading.local()
+
+    def _connections(self) -> dict[Path, sqlite3.Connection]:
+        conns = getattr(self._local, "conns", None)
+        if conns is None:
+            conns = self._local.conns = {}
+        return conns
+
+
+_MANAGER = ConnectionManager()
+
+
+def open_state(db_path: Path, config: dict[str, str] | None = None) -> sqlite3.Connection:
+    """Return the calling thread's shared connection to a state database."""
+    return _MANAGER.get(db_path, config)
+
+
+def release_state(db_path: Path) -> None:
+    """Close the calling thread's shared connection to a state database."""
+    _MANAGER.release(db_path)
+
+
+def attach_library(conn: sqlite3.Connection, library_path: Path) -> None:
+    """Attach the shared record library as schema `library`, creating it if needed.
+
+    A connection that already has a different library attached is switched
+    to `library_path`.
+    """
+    attached = next((row[2] for row in conn.execute("PRAGMA database_list") if row[1] == "library"), None)
+    if attached is not None:
+        if attached and Path(attached).resolve() == Path(library_path).resolve():
+            return
+        conn.execute("DETACH DATABASE library")
+    library_path.parent.mkdir(parents=True, exist_ok=True)
+    conn.execute("ATTACH DATABASE ? AS library", (str(library_path),))
+    conn.execute("PRAGMA library.journal_mode=WAL;")
+    conn.execute(
+        """
+        CREATE TABLE IF NOT EXISTS library.papers (
+            canonical_id TEXT PRIMARY KEY,
+            provider TEXT NOT NULL,
+            record_id TEXT,
+            normalized_json TEXT NOT NULL,
+            raw_json TEXT NOT NULL,
+            raw_codec TEXT,
+            created_at TEXT NOT NULL,
+            updated_at TEXT NOT NULL
+        )
+        """
+    )
+    columns = {row["name"] for row in conn.execute("PRAGMA library.table_info(papers)")}
+    if "raw_codec" not in columns:
+        conn.execute("ALTER TABLE library.papers ADD COLUMN raw_codec TEXT")
+    conn.commit()
+
+
+def has_library(conn: sqlite3.Connection) -> bool:
+    """Return True when the shared record library is attached."""
+    return any(row[1] == "library" for row in conn.execute("PRAGMA database_list"))
+
+
 def init_db(conn: sqlite3.Connection) -> None:
-    """Initialize database schema."""
+    """Initialize or migrate the database schema; a no-op when it is current."""
+    version = conn.execute("PRAGMA user_version").fetchone()[0]
+    if version >= SCHEMA_VERSION:
+        return
     schema_path = Path(__file__).with_name("schema.sql")
     schema_sql = schema_path.read_text(encoding="utf-8")
     conn.executescript(schema_sql)
     conn.commit()
+    _migrate_records(conn)
+    conn.execute(f"PRAGMA user_version={SCHEMA_VERSION}")
+    conn.commit()
+
+
+def record_columns(record: PaperRecord) -> tuple[str, ...]:
+    """Return the typed column values of `record` in `RECORD_FIELD_COLUMNS` order."""
+    return tuple(str(getattr(record, name) or "") for name in RECORD_FIELD_COLUMNS)
+
+
+def _legacy_record(normalized_json: str) -> PaperRecord:
+    return PaperRecord.model_validate_json(normalized_json) if normalized_json else PaperRecord()
+
+
+def _merge_duplicate_records(conn: sqlite3.Connection) -> int:
+    """Fold repeated copies of a provider record into its first row so the unique index can be created.
+
+    The kept row takes a raw payload from a later copy when it has none and
+    stays canonical if any copy was; dedup references to the later copies are
+    pointed at it. Returns the number of rows folded away.
+    """
+    groups = conn.execute(
+        """
+        SELECT MIN(id) AS keep, GROUP_CONCAT(id) AS ids FROM records
+        WHERE record_id IS NOT NULL GROUP BY run_id, provider, record_id HAVING COUNT(*) > 1
+        """
+    ).fetchall()
+    merged = 0
+    for group in groups:
+        keep = int(group["keep"])
+        extra = [int(value) for value in group["ids"].split(",") if int(value) != keep]
+        marks = ", ".join("?" * len(extra))
+        rows = conn.execute(
+            f"SELECT id, raw_json, raw_codec, is_duplicate FROM records WHERE id IN ({marks}, ?) ORDER BY id",
+            (*extra, keep),
+        ).fetchall()
+        kept = rows[0]
+        if not kept["raw_json"]:
+            source = next((row for row in rows[1:] if row["raw_json"]), None)
+            if source is not None:
+                conn.execute(
+                    "UPDATE records SET raw_json=?, raw_codec=? WHERE id=?",
+                    (source["raw_json"], source["raw_codec"], keep),
+                )
+        if kept["is_duplicate"] and not all(row["is_duplicate"] for row in rows):
+            conn.execute(
+                "UPDATE records SET is_duplicate=0, duplicate_of=NULL, duplicate_reason=NULL WHERE id=?",
+                (keep,),
+            )
+        conn.execute(f"UPDATE records SET canonical_row_id=? WHERE canonical_row_id IN ({marks})", (keep, *extra))
+        conn.execute(f"DELETE FROM records WHERE id IN ({marks})", extra)
+        merged += len(extra)
+    return merged
+
+
+def _migrate_records(conn: sqlite3.Connection) -> None:
+    """Add missing record columns and backfill typed columns and dedup keys for older rows."""
+    existing = {row["name"] for row in conn.execute("PRAGMA table_info(records)")}
+    for name, decl in _RECORD_COLUMNS.items():
+        if name not in existing:
+            conn.execute(f"ALTER TABLE records ADD COLUMN {name} {decl}")
+    merged = _merge_duplicate_records(conn)
+    if merged:
+        logger.warning("Merged %d repeated provider record rows into their first copy", merged)
+    for statement in _RECORD_INDEXES:
+        conn.execute(statement)
+    assignments = ", ".join(f"{column}=?" for column in RECORD_FIELD_COLUMNS.values())
+    while True:
+        rows = conn.execute(
+            "SELECT id, normalized_json FROM records WHERE origin IS NULL LIMIT 1000"
+        ).fetchall()
+        if not rows:
+            break
+        conn.executemany(
+            f"UPDATE records SET {assignments} WHERE id=?",
+            [(*record_columns(_legacy_record(row["normalized_json"])), row["id"]) for row in rows],
+        )
+    while True:
+        rows = conn.execute(
+            "SELECT id, normalized_json FROM records WHERE title_key IS NULL LIMIT 1000"
+        ).fetchall()
+        if not rows:
+            break
+        conn.executemany(
+            "UPDATE records SET title_key=?, id_key=?, authors_key=?, is_preprint=? WHERE id=?",
+            [(*dedup_keys(_legacy_record(row["normalized_json"])), row["id"]) for row in rows],
+        )
+    conn.commit()
@@ -0,0 +1,86 @@
+"""Compression and retention of raw provider payloads."""
+
+from __future__ import annotations
+
+import zlib
+from dataclasses import dataclass
+from datetime import datetime, timedelta, timezone
+
+try:  # Optional faster codec (`pip install papyr[zstd]`).
+    import zstandard
+except ImportError:  # pragma: no cover - depends on the environment
+    zstandard = None
+
+CODECS = ("zlib", "zstd", "none")
+
+
+def resolve_codec(name: str) -> str:
+    """Return the codec actually used for `name` (zstd falls back to zlib when missing)."""
+    name = (name or "zlib").strip().lower()
+    if name not in CODECS:
+        return "zlib"
+    if name == "zstd" and zstandard is None:
+        return "zlib"
+    return name
+
+
+def encode_raw(text: str, codec: str) -> tuple[str | bytes, str | None]:
+    """Encode a raw JSON payload; returns the stored value and its codec (None for plain text)."""
+    codec = resolve_codec(codec)
+    data = text.encode("utf-8")
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=3).compress(data), "zstd"
+    if codec == "zlib":
+        return zlib.compress(data, 6), "zlib"
+    return text, None
+
+
+def decode_raw(value: str | bytes | None, codec: str | None) -> str:
+    """Decode a stored raw payload back to JSON text."""
+    if not value:
+        return ""
+    if codec == "zlib":
+        return zlib.decompress(value).decode("utf-8")
+    if codec == "zstd":
+        if zstandard is None:
+            raise RuntimeError("Payload is zstd-compressed; install the 'zstandard' package to read it.")
+        return zstandard.ZstdDecompressor().decompress(value).decode("utf-8")
+    return value.decode("utf-8") if isinstance(value, bytes) else value
+
+
+@dataclass
+class RawPolicy:
+    """How raw payloads are stored: codec plus retention (`all`, `days:N` or `none`)."""
+
+    codec: str = "zlib"
+    retention: str = "all"
+
+    @classmethod
+    def from_config(cls, config: dict[str, str]) -> RawPolicy:
+        return cls(
+            codec=resolve_codec(config.get("PAPYR_RAW_CODEC", "zlib")),
+            retention=str(config.get("PAPYR_RAW_RETENTION", "all")).strip().lower() or "all",
+        )
+
+    @property
+    def keep(self) -> bool:
+        """Whether raw payloads are stored at all."""
+        return self.retention != "none"
+
+    @property
+    def retention_days(self) -> int | None:
+        if not self.retention.startswith("days:"):
+            return None
+        try:
+            return max(0, int(self.retention.split(":", 1)[1]))
+        except ValueError:
+            return None
+
+    def expired_before(self) -> str | None:
+        """ISO timestamp before which stored payloads are expired, if any."""
+        if self.retention == "none":
+            return datetime.now(timezone.utc).isoformat(timespec="seconds")
+        days = self.retention_days
+        if days is None:
+            return None
+        return (datetime.now(timezone.utc) - timedelta(days=days)).isoformat(timespec="seconds")
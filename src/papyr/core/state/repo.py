@@ -3,10 +3,15 @@
 from __future__ import annotations
 
 import json
+import re
 import sqlite3
-from typing import Any
+from typing import Any, Iterable, Iterator
+from urllib.parse import urlparse
 
+from papyr.core.dedup import dedup_keys
 from papyr.core.models import PaperRecord, ProviderState, RawRecord
+from papyr.core.state import db
+from papyr.core.state.raw_codec import RawPolicy, decode_raw, encode_raw, resolve_codec
 from papyr.util.time import now_iso
 
 
@@ -53,6 +58,7 @@ def upsert_provider_state(
     run_id: int,
     provider: str,
     state: ProviderState,
+    commit: bool = True,
 ) -> None:
     """Insert or update provider state."""
     conn.execute(
@@ -72,7 +78,147 @@ def upsert_provider_state(
             json.dumps(state.extra, ensure_ascii=True),
         ),
     )
-    conn.commit()
+    if commit:
+        conn.commit()
+
+
+_TYPED_COLUMNS = tuple(db.RECORD_FIELD_COLUMNS.values())
+
+_INSERT_RECORD_SQL = f"""
+    INSERT INTO records (
+        run_id, provider, record_id, normalized_json, raw_json,
+        is_duplicate, duplicate_of, title_key, id_key, authors_key, is_preprint,
+        library_id, raw_codec, created_at, updated_at, {", ".join(_TYPED_COLUMNS)}
+    )
+    VALUES ({", ".join("?" * (15 + len(_TYPED_COLUMNS)))})
+    ON CONFLICT(run_id, provider, record_id) DO NOTHING
+"""
+
+# Re-fetched records (delta sync) replace their stored content in place; the
+# row id, creation time and duplicate status are kept.
+_UPSERT_RECORD_SQL = _INSERT_RECORD_SQL.replace(
+    "DO NOTHING",
+    "DO UPDATE SET "
+    + ", ".join(
+        f"{column}=excluded.{column}"
+        for column in (
+            "raw_json",
+            "raw_codec",
+            "library_id",
+            "title_key",
+            "id_key",
+            "authors_key",
+            "is_preprint",
+            "updated_at",
+            *_TYPED_COLUMNS,
+        )
+    ),
+)
+
+# Columns needed to rebuild a PaperRecord without decoding JSON.
+_PAPER_SELECT = ", ".join(("id", "duplicate_of", *_TYPED_COLUMNS))
+
+# A run that keeps no payloads does not wipe one another run stored.
+_UPSERT_LIBRARY_SQL = """
+    INSERT INTO library.papers
+    (canonical_id, provider, record_id, normalized_json, raw_json, raw_codec, created_at, updated_at)
+    VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+    ON CONFLICT(canonical_id) DO UPDATE SET
+        provider=excluded.provider,
+        record_id=excluded.record_id,
+        normalized_json=excluded.normalized_json,
+        raw_codec=CASE WHEN excluded.raw_json<>'' THEN excluded.raw_codec ELSE raw_codec END,
+        raw_json=CASE WHEN excluded.raw_json<>'' THEN excluded.raw_json ELSE raw_json END,
+        updated_at=excluded.updated_at
+"""
+
+_ARXIV_VERSION = re.compile(r"v\d+$")
+
+
+def library_key(provider: str, record_id: str | None) -> str | None:
+    """Return the canonical library key for a provider record ID.
+
+    DOIs are keyed case-insensitively and arXiv IDs without their version
+    suffix; other identifiers are not stored in the library.
+    """
+    value = (record_id or "").strip()
+    if not value:
+        return None
+    lowered = value.lower()
+    for prefix in ("https://doi.org/", "http://doi.org/", "doi:"):
+        if lowered.startswith(prefix):
+            lowered = lowered[len(prefix):]
+    if lowered.startswith("10."):
+        return f"doi:{lowered}"
+    if provider.strip().lower() == "arxiv":
+        return f"arxiv:{_ARXIV_VERSION.sub('', lowered)}"
+    return None
+
+
+def _record_params(
+    run_id: int,
+    provider: str,
+    raw: RawRecord,
+    normalized: PaperRecord,
+    is_duplicate: bool = False,
+    duplicate_of: str | None = None,
+    library_id: str | None = None,
+    raw_policy: RawPolicy | None = None,
+) -> tuple:
+    timestamp = now_iso()
+    raw_policy = raw_policy or RawPolicy()
+    raw_value: str | bytes = ""
+    raw_codec = None
+    if not library_id and raw_policy.keep:
+        raw_value, raw_codec = encode_raw(raw.model_dump_json(), raw_policy.codec)
+    return (
+        run_id,
+        provider,
+        raw.record_id,
+        "",
+        raw_value,
+        1 if is_duplicate else 0,
+        duplicate_of,
+        *dedup_keys(normalized),
+        library_id,
+        raw_codec,
+        timestamp,
+        timestamp,
+        *db.record_columns(normalized),
+    )
+
+
+def _insert_record_rows(
+    conn: sqlite3.Connection,
+    run_id: int,
+    items: list[tuple[str, RawRecord, PaperRecord]],
+    is_duplicate: bool = False,
+    duplicate_of: str | None = None,
+    raw_policy: RawPolicy | None = None,
+    update: bool = False,
+) -> int:
+    """Insert record rows and return how many were written.
+
+    Rows whose (run, provider, record_id) already exists are skipped, or
+    overwritten with `update`. With a library attached, raw payloads are
+    stored there once.
+    """
+    use_library = db.has_library(conn)
+    raw_policy = raw_policy or RawPolicy()
+    rows = []
+    papers = []
+    timestamp = now_iso()
+    for provider, raw, normalized in items:
+        key = library_key(provider, raw.record_id) if use_library else None
+        rows.append(_record_params(run_id, provider, raw, normalized, is_duplicate, duplicate_of, key, raw_policy))
+        if key:
+            raw_value, raw_codec = encode_raw(raw.model_dump_json(), raw_policy.codec) if raw_policy.keep else ("", None)
+            papers.append(
+                (key, provider, raw.record_id, normalized.model_dump_json(), raw_value, raw_codec, timestamp, timestamp)
+            )
+    if papers:
+        conn.executemany(_UPSERT_LIBRARY_SQL, papers)
+    return conn.executemany(_UPSERT_RECORD_SQL if update else _INSERT_RECORD_SQL, rows).rowcount
 
 
 def insert_record(
@@ -84,29 +230,261 @@ def insert_record(
     is_duplicate: bool = False,
     duplicate_of: str | None = None,
 ) -> int:
-    """Insert a record (no merge)."""
+    """Insert a record and return its row id (the existing row if already stored)."""
+    inserted = _insert_record_rows(conn, run_id, [(provider, raw, normalized)], is_duplicate, duplicate_of)
+    if not inserted and raw.record_id:
+        row = conn.execute(
+            "SELECT id FROM records WHERE run_id=? AND provider=? AND record_id=?",
+            (run_id, provider, raw.record_id),
+        ).fetchone()
+        conn.commit()
+        return int(row["id"])
+    row_id = last_record_row_id(conn, run_id)
+    if not is_duplicate:
+        resolve_duplicates(conn, run_id, row_id - 1)
+    conn.commit()
+    return row_id
+
+
+def insert_records(
+    conn: sqlite3.Connection,
+    run_id: int,
+    items: list[tuple[str, RawRecord, PaperRecord]],
+    raw_policy: RawPolicy | None = None,
+) -> int:
+    """Insert (provider, raw, normalized) records in one statement; caller commits.
+
+    Records already stored for the run and provider are skipped. Raw payloads
+    are encoded per `raw_policy` (zlib by default). Each new row is checked
+    against the run's dedup index in the same transaction. Returns the number
+    of new rows.
+    """
+    first_new_id = last_record_row_id(conn, run_id)
+    inserted = _insert_record_rows(conn, run_id, items, raw_policy=raw_policy)
+    if inserted:
+        resolve_duplicates(conn, run_id, first_new_id)
+    return inserted
+
+
+def upsert_records(
+    conn: sqlite3.Connection,
+    run_id: int,
+    items: list[tuple[str, RawRecord, PaperRecord]],
+    raw_policy: RawPolicy | None = None,
+) -> int:
+    """Insert records or update the stored ones in place; caller commits.
+
+    Updated rows keep their id and duplicate status; new rows are checked
+    against the dedup index as in `insert_records`. Returns the number of
+    rows written.
+    """
+    first_new_id = last_record_row_id(conn, run_id)
+    written = _insert_record_rows(conn, run_id, items, raw_policy=raw_policy, update=True)
+    if last_record_row_id(conn, run_id) > first_new_id:
+        resolve_duplicates(conn, run_id, first_new_id)
+    return written
+
+
+def get_raw_record(conn: sqlite3.Connection, record_row_id: int) -> RawRecord | None:
+    """Return the raw payload of a record, decompressed, or None if it was not retained."""
+    row = conn.execute(
+        "SELECT raw_json, raw_codec, library_id FROM records WHERE id=?", (record_row_id,)
+    ).fetchone()
+    if row is None:
+        return None
+    text = decode_raw(row["raw_json"], row["raw_codec"])
+    if not text and row["library_id"] and db.has_library(conn):
+        library_row = conn.execute(
+            "SELECT raw_json, raw_codec FROM library.papers WHERE canonical_id=?", (row["library_id"],)
+        ).fetchone()
+        text = decode_raw(library_row["raw_json"], library_row["raw_codec"]) if library_row else ""
+    return RawRecord.model_validate_json(text) if text else None
+
+
+def compact_raw(conn: sqlite3.Connection, policy: RawPolicy, batch_size: int = 1000) -> tuple[int, int]:
+    """Re-encode stored raw payloads with `policy.codec` and drop expired ones.
+
+    Covers every run in the database and, when attached, the shared library.
+    Returns (re-encoded, dropped) row counts. Commits per batch.
+    """
+    dropped = purge_raw(conn, policy)
+    conn.commit()
+    recoded = _recode_raw(conn, "records", "id", policy, batch_size)
+    if db.has_library(conn):
+        recoded += _recode_raw(conn, "library.papers", "canonical_id", policy, batch_size)
+    return recoded, dropped
+
+
+def _recode_raw(conn: sqlite3.Connection, table: str, key: str, policy: RawPolicy, batch_size: int) -> int:
+    codec = resolve_codec(policy.codec)
+    target = None if codec == "none" else codec
+    recoded = 0
+    last_key: int | str = 0 if key == "id" else ""
+    while True:
+        rows = conn.execute(
+            f"""
+            SELECT {key}, raw_json, raw_codec FROM {table}
+            WHERE {key}>? AND raw_json<>'' AND raw_codec IS NOT ?
+            ORDER BY {key} LIMIT ?
+            """,
+            (last_key, target, batch_size),
+        ).fetchall()
+        if not rows:
+            return recoded
+        with conn:
+            conn.executemany(
+                f"UPDATE {table} SET raw_json=?, raw_codec=? WHERE {key}=?",
+                [(*encode_raw(decode_raw(row["raw_json"], row["raw_codec"]), codec), row[key]) for row in rows],
+            )
+        recoded += len(rows)
+        last_key = rows[-1][key]
+
+
+def purge_raw(conn: sqlite3.Connection, policy: RawPolicy, run_id: int | None = None) -> int:
+    """Drop raw payloads older than the retention policy allows; caller commits.
+
+    With `run_id` only that run's rows and the library entries they reference
+    are purged; without it every run and, when attached, the whole library.
+    """
+    cutoff = policy.expired_before()
+    if cutoff is None:
+        return 0
+    run_clause = "" if run_id is None else " AND run_id=?"
+    run_params = () if run_id is None else (run_id,)
+    dropped = conn.execute(
+        f"UPDATE records SET raw_json='', raw_codec=NULL WHERE raw_json<>'' AND created_at<=?{run_clause}",
+        (cutoff, *run_params),
+    ).rowcount
+    if db.has_library(conn):
+        library_clause = (
+            "" if run_id is None else " AND canonical_id IN (SELECT library_id FROM main.records WHERE run_id=?)"
+        )
+        dropped += conn.execute(
+            f"UPDATE library.papers SET raw_json='', raw_codec=NULL WHERE raw_json<>'' AND updated_at<=?{library_clause}",
+            (cutoff, *run_params),
+        ).rowcount
+    return dropped
+
+
+def get_library_record(conn: sqlite3.Connection, provider: str, record_id: str | None) -> PaperRecord | None:
+    """Return the normalized record stored in the shared library, if any."""
+    key = library_key(provider, record_id)
+    if key is None or not db.has_library(conn):
+        return None
+    row = conn.execute(
+        "SELECT normalized_json FROM library.papers WHERE canonical_id=?", (key,)
+    ).fetchone()
+    return PaperRecord.model_validate_json(row["normalized_json"]) if row else None
+
+
+def resolve_duplicates(conn: sqlite3.Connection, run_id: int, after_id: int) -> int:
+    """Check records with id > `after_id` against the dedup index; caller commits.
+
+    Applies the same rules as `dedup.find_duplicates` with index lookups
+    instead of a full rescan: title+id matches (Crossref canonical), and
+    preprints whose title and authors match a published record. Returns the
+    number of records marked as duplicates.
+    """
+    marked = 0
+    new_rows = conn.execute(
+        """
+        SELECT id, provider, title_key, id_key, authors_key, is_preprint FROM records
+        WHERE run_id=? AND id>? AND is_duplicate=0 ORDER BY id
+        """,
+        (run_id, after_id),
+    ).fetchall()
+    for row in new_rows:
+        title_key = row["title_key"]
+        if not title_key:
+            continue
+        current = conn.execute("SELECT is_duplicate FROM records WHERE id=?", (row["id"],)).fetchone()
+        if current["is_duplicate"]:
+            continue
+        is_crossref = row["provider"].strip().lower() == "crossref"
+        if row["id_key"]:
+            match = conn.execute(
+                """
+                SELECT id, provider FROM records
+                WHERE run_id=? AND title_key=? AND id_key=? AND is_duplicate=0 AND id<>?
+                ORDER BY id LIMIT 1
+                """,
+                (run_id, title_key, row["id_key"], row["id"]),
+            ).fetchone()
+            if match:
+                marked += 1
+                if match["provider"].strip().lower() != "crossref" and is_crossref:
+                    _mark_indexed_duplicate(conn, match["id"], row["id"], "title+id match (crossref canonical)")
+                else:
+                    _mark_indexed_duplicate(conn, row["id"], match["id"], "title+id match")
+                    continue
+        if not row["authors_key"]:
+            continue
+        if row["is_preprint"]:
+            match = conn.execute(
+                """
+                SELECT id FROM records
+                WHERE run_id=? AND title_key=? AND authors_key=? AND is_preprint=0 AND is_duplicate=0
+                ORDER BY LOWER(provider)='crossref' DESC, id LIMIT 1
+                """,
+                (run_id, title_key, row["authors_key"]),
+            ).fetchone()
+            if match:
+                _mark_indexed_duplicate(conn, row["id"], match["id"], "title+authors match (drop preprint)")
+                marked += 1
+        else:
+            preprints = conn.execute(
+                """
+                SELECT id FROM records
+                WHERE run_id=? AND title_key=? AND authors_key=? AND is_preprint=1 AND is_duplicate=0
+                """,
+                (run_id, title_key, row["authors_key"]),
+            ).fetchall()
+            for preprint in preprints:
+                _mark_indexed_duplicate(conn, preprint["id"], row["id"], "title+authors match (drop preprint)")
+                marked += 1
+    return marked
+
+
+def _mark_indexed_duplicate(
+    conn: sqlite3.Connection, duplicate_row_id: int, canonical_row_id: int, reason: str
+) -> None:
+    canonical = conn.execute(
+        "SELECT paper_id, url FROM records WHERE id=?", (canonical_row_id,)
+    ).fetchone()
+    conn.execute(
+        """
+        UPDATE records
+        SET is_duplicate=1, duplicate_of=?, duplicate_reason=?, canonical_row_id=?, updated_at=?
+        WHERE id=?
+        """,
+        (canonical["paper_id"] or canonical["url"], reason, canonical_row_id, now_iso(), duplicate_row_id),
+    )
+
+
+def iter_duplicates(conn: sqlite3.Connection, run_id: int) -> Iterator[tuple[PaperRecord, PaperRecord | None, str]]:
+    """Yield (duplicate, canonical, reason) for records marked as duplicates.
+
+    Only titles and IDs are populated.
+    """
     cur = conn.execute(
         """
-        INSERT INTO records (
-            run_id, provider, record_id, normalized_json, raw_json,
-            is_duplicate, duplicate_of, created_at, updated_at
-        )
-        VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)
+        SELECT d.title AS duplicate_title, d.paper_id AS duplicate_id,
+               c.id AS canonical_row, c.title AS canonical_title, c.paper_id AS canonical_id,
+               d.duplicate_reason AS reason
+        FROM records d LEFT JOIN records c ON c.id = d.canonical_row_id
+        WHERE d.run_id=? AND d.is_duplicate=1
+        ORDER BY d.id
         """,
-        (
-            run_id,
-            provider,
-            raw.record_id,
-            normalized.model_dump_json(),
-            raw.model_dump_json(),
-            1 if is_duplicate else 0,
-            duplicate_of,
-            now_iso(),
-            now_iso(),
-        ),
+        (run_id,),
     )
-    conn.commit()
-    return int(cur.lastrowid)
+    for row in cur:
+        duplicate = PaperRecord.model_construct(title=row["duplicate_title"] or "", id=row["duplicate_id"] or "")
+        canonical = (
+            PaperRecord.model_construct(title=row["canonical_title"] or "", id=row["canonical_id"] or "")
+            if row["canonical_row"] is not None
+            else None
+        )
+        yield duplicate, canonical, row["reason"] or ""
 
 
 def list_records(conn: sqlite3.Connection, run_id: int) -> list[sqlite3.Row]:
@@ -118,6 +496,89 @@ def list_records(conn: sqlite3.Connection, run_id: int) -> list[sqlite3.Row]:
     return list(cur.fetchall())
 
 
+def iter_records(
+    conn: sqlite3.Connection,
+    run_id: int,
+    after_id: int = 0,
+    canonical_only: bool = False,
+    batch_size: int = 1000,
+) -> Iterator[sqlite3.Row]:
+    """Yield records for a run in id order using keyset pagination.
+
+    Only `batch_size` rows are held at a time. With `canonical_only`, rows
+    marked as duplicates are skipped.
+    """
+    duplicate_clause = " AND is_duplicate=0" if canonical_only else ""
+    last_id = after_id
+    while True:
+        cur = conn.execute(
+            f"SELECT * FROM records WHERE run_id=? AND id>?{duplicate_clause} ORDER BY id LIMIT ?",
+            (run_id, last_id, batch_size),
+        )
+        rows = cur.fetchall()
+        if not rows:
+            return
+        yield from rows
+        last_id = int(rows[-1]["id"])
+
+
+def iter_paper_records(
+    conn: sqlite3.Connection,
+    run_id: int,
+    after_id: int = 0,
+    canonical_only: bool = False,
+    batch_size: int = 1000,
+) -> Iterator[PaperRecord]:
+    """Yield records for a run as `PaperRecord`s built from the typed columns.
+
+    Uses the same keyset pagination as `iter_records` but reads plain column
+    tuples, so no JSON is decoded or validated.
+    """
+    duplicate_clause = " AND is_duplicate=0" if canonical_only else ""
+    fields = list(db.RECORD_FIELD_COLUMNS)
+    last_id = after_id
+    while True:
+        rows = conn.execute(
+            f"SELECT {_PAPER_SELECT} FROM records WHERE run_id=? AND id>?{duplicate_clause} ORDER BY id LIMIT ?",
+            (run_id, last_id, batch_size),
+        ).fetchall()
+        if not rows:
+            return
+        for row in rows:
+            values = tuple(row)
+            record = PaperRecord.model_construct(**dict(zip(fields, (value or "" for value in values[2:]))))
+            record.duplicate_of = values[1] or ""
+            yield record
+        last_id = int(rows[-1][0])
+
+
+def has_record(conn: sqlite3.Connection, run_id: int, provider: str, record_id: str) -> bool:
+    """Return True if the provider record is already stored for the run (unique index lookup)."""
+    row = conn.execute(
+        "SELECT 1 FROM records WHERE run_id=? AND provider=? AND record_id=? LIMIT 1",
+        (run_id, provider, record_id),
+    ).fetchone()
+    return row is not None
+
+
+def iter_record_keys(conn: sqlite3.Connection, run_id: int, batch_size: int = 10000) -> Iterator[tuple[str, str]]:
+    """Yield (provider, record_id) for stored records in batches."""
+    last_id = 0
+    while True:
+        rows = conn.execute(
+            """
+            SELECT id, provider, record_id FROM records
+            WHERE run_id=? AND id>? AND record_id IS NOT NULL ORDER BY id LIMIT ?
+            """,
+            (run_id, last_id, batch_size),
+        ).fetchall()
+        if not rows:
+            return
+        for row in rows:
+            yield row["provider"], row["record_id"]
+        last_id = int(rows[-1]["id"])
+
+
 def list_record_ids(conn: sqlite3.Connection, run_id: int) -> set[str]:
     """Return record IDs already stored for a run."""
     cur = conn.execute(
@@ -127,9 +588,20 @@ def list_record_ids(conn: sqlite3.Connection, run_id: int) -> set[str]:
     return {row["record_id"] for row in cur.fetchall() if row["record_id"]}
 
 
-def count_records(conn: sqlite3.Connection, run_id: int) -> int:
+def last_record_row_id(conn: sqlite3.Connection, run_id: int) -> int:
+    """Return the highest record row id stored for a run (0 if none)."""
+    cur = conn.execute("SELECT MAX(id) AS max_id FROM records WHERE run_id=?", (run_id,))
+    row = cur.fetchone()
+    return int(row["max_id"]) if row and row["max_id"] is not None else 0
+
+
+def count_records(conn: sqlite3.Connection, run_id: int, canonical_only: bool = False) -> int:
     """Return number of records stored for a run."""
-    cur = conn.execute("SELECT COUNT(1) AS count FROM records WHERE run_id=?", (run_id,))
+    duplicate_clause = " AND is_duplicate=0" if canonical_only else ""
+    cur = conn.execute(
+        f"SELECT COUNT(1) AS count FROM records WHERE run_id=?{duplicate_clause}",
+        (run_id,),
+    )
     row = cur.fetchone()
     return int(row["count"]) if row else 0
 
@@ -156,6 +628,15 @@ def mark_duplicate(
     conn.commit()
 
 
+def mark_duplicates(conn: sqlite3.Connection, marks: list[tuple[int, str]]) -> None:
+    """Mark (record_row_id, duplicate_of) pairs as duplicates; caller commits."""
+    timestamp = now_iso()
+    conn.executemany(
+        "UPDATE records SET is_duplicate=1, duplicate_of=?, updated_at=? WHERE id=?",
+        [(duplicate_of, timestamp, row_id) for row_id, duplicate_of in marks],
+    )
+
+
 def upsert_download(
     conn: sqlite3.Connection,
     run_id: int,
@@ -177,6 +658,112 @@ def upsert_download(
     conn.commit()
 
 
+def insert_downloads(
+    conn: sqlite3.Connection,
+    run_id: int,
+    rows: list[tuple[str | None, str, str | None, str, int, str | None]],
+) -> None:
+    """Insert (record_id, pdf_url, file_path, status, attempts, last_error) rows; caller commits."""
+    timestamp = now_iso()
+    conn.executemany(
+        """
+        INSERT INTO downloads (run_id, record_id, pdf_url, file_path, status, attempts, last_error, updated_at)
+        VALUES (?, ?, ?, ?, ?, ?, ?, ?)
+        """,
+        [(run_id, *row, timestamp) for row in rows],
+    )
+
+
+def download_host(url: str | None) -> str:
+    """Host a download URL is fetched from, as used for per-host limits."""
+    return urlparse(url or "").netloc.lower()
+
+
+def list_queued_downloads(
+    conn: sqlite3.Connection,
+    run_id: int,
+    limit: int,
+    per_host: int | None = None,
+    skip_hosts: Iterable[str] = (),
+) -> list[sqlite3.Row]:
+    """Return the oldest queued download rows for a run.
+
+    With `per_host`, at most that many rows are returned per host, and hosts
+    in `skip_hosts` are left out, so a backlog for a few busy hosts cannot
+    hide rows for other hosts further back in the queue.
+    """
+    skip_hosts = sorted(set(skip_hosts))
+    conn.create_function("papyr_download_host", 1, download_host, deterministic=True)
+    skip_sql = ""
+    if skip_hosts:
+        marks = ", ".join("?" * len(skip_hosts))
+        skip_sql = f"AND papyr_download_host(pdf_url) NOT IN ({marks})"
+    cur = conn.execute(
+        f"""
+        SELECT * FROM (
+            SELECT *, ROW_NUMBER() OVER (PARTITION BY papyr_download_host(pdf_url) ORDER BY id) AS host_rank
+            FROM downloads
+            WHERE run_id=? AND status='queued' {skip_sql}
+        )
+        WHERE host_rank <= ?
+        ORDER BY id
+        LIMIT ?
+        """,
+        (run_id, *skip_hosts, per_host if per_host is not None else limit, limit),
+    )
+    return list(cur.fetchall())
+
+
+def count_queued_downloads(conn: sqlite3.Connection, run_id: int) -> int:
+    """Return number of queued or running downloads for a run."""
+    cur = conn.execute(
+        "SELECT COUNT(1) AS count FROM downloads WHERE run_id=? AND status IN ('queued', 'running')",
+        (run_id,),
+    )
+    row = cur.fetchone()
+    return int(row["count"]) if row else 0
+
+
+def list_pending_download_ids(conn: sqlite3.Connection, run_id: int) -> set[str]:
+    """Return record IDs with a queued or running download."""
+    cur = conn.execute(
+        """
+        SELECT record_id FROM downloads
+        WHERE run_id=? AND status IN ('queued', 'running') AND record_id IS NOT NULL
+        """,
+        (run_id,),
+    )
+    return {row["record_id"] for row in cur.fetchall() if row["record_id"]}
+
+
+def update_download(
+    conn: sqlite3.Connection,
+    download_id: int,
+    status: str,
+    file_path: str | None,
+    attempts: int,
+    last_error: str | None = None,
+) -> None:
+    """Update the status of a download row."""
+    conn.execute(
+        """
+        UPDATE downloads SET status=?, file_path=?, attempts=?, last_error=?, updated_at=?
+        WHERE id=?
+        """,
+        (status, file_path, attempts, last_error, now_iso(), download_id),
+    )
+    conn.commit()
+
+
+def requeue_stale_downloads(conn: sqlite3.Connection, run_id: int) -> None:
+    """Return downloads left running by an interrupted process to the queue."""
+    conn.execute(
+        "UPDATE downloads SET status='queued', updated_at=? WHERE run_id=? AND status='running'",
+        (now_iso(), run_id),
+    )
+    conn.commit()
+
+
 def log_failure(
     conn: sqlite3.Connection,
     run_id: int,
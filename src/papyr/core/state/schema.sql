@@ -25,8 +25,36 @@ CREATE TABLE IF NOT EXISTS records (
     record_id TEXT,
     normalized_json TEXT NOT NULL,
     raw_json TEXT NOT NULL,
+    authors TEXT,
+    title TEXT,
+    abstract TEXT,
+    origin TEXT,
+    volume TEXT,
+    issue TEXT,
+    pages TEXT,
+    publisher TEXT,
+    month TEXT,
+    year TEXT,
+    type TEXT,
+    keywords TEXT,
+    citations TEXT,
+    score TEXT,
+    oa TEXT,
+    paper_id TEXT,
+    url TEXT,
+    license TEXT,
+    retrieved_at TEXT,
+    query_hash TEXT,
     is_duplicate INTEGER NOT NULL DEFAULT 0,
     duplicate_of TEXT,
+    title_key TEXT,
+    id_key TEXT,
+    authors_key TEXT,
+    is_preprint INTEGER NOT NULL DEFAULT 0,
+    duplicate_reason TEXT,
+    canonical_row_id INTEGER,
+    library_id TEXT,
+    raw_codec TEXT,
     created_at TEXT NOT NULL,
     updated_at TEXT NOT NULL,
     FOREIGN KEY (run_id) REFERENCES runs(id) ON DELETE CASCADE
@@ -0,0 +1,81 @@
+"""Seen-record checks backed by the records unique index."""
+
+from __future__ import annotations
+
+import sqlite3
+import threading
+from pathlib import Path
+
+from papyr.core.state import db, repo
+from papyr.core.state.writer import StateWriter
+from papyr.util.bloom import BloomFilter
+
+
+class SeenRecords:
+    """Answer "was this provider record already stored for the run?".
+
+    Stored records are checked through the `(run_id, provider, record_id)`
+    unique index, and records still buffered in the writer through its pending
+    keys. An optional Bloom filter of `bloom_capacity` keys answers most
+    unseen records without a query. Memory stays bounded by the filter size
+    and the writer's batch, whatever the size of the run.
+
+    `seen` and `add` belong to the thread that owns `conn`. Adapters check
+    records from their paging threads through `all_stored`.
+    """
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        run_id: int,
+        writer: StateWriter,
+        bloom_capacity: int = 0,
+    ) -> None:
+        self._conn = conn
+        self._run_id = run_id
+        self._writer = writer
+        self._owner = threading.get_ident()
+        self._readers = threading.local()
+        self._path = next((row[2] for row in conn.execute("PRAGMA database_list") if row[1] == "main"), "")
+        self._bloom: BloomFilter | None = None
+        if bloom_capacity > 0:
+            self._bloom = BloomFilter(bloom_capacity)
+            for provider, record_id in repo.iter_record_keys(conn, run_id):
+                self._bloom.add(_key(provider, record_id))
+
+    def seen(self, provider: str, record_id: str) -> bool:
+        if self._bloom is not None and _key(provider, record_id) not in self._bloom:
+            return False
+        if self._writer.is_pending(provider, record_id):
+            return True
+        return repo.has_record(self._conn, self._run_id, provider, record_id)
+
+    def add(self, provider: str, record_id: str) -> None:
+        if self._bloom is not None:
+            self._bloom.add(_key(provider, record_id))
+
+    def all_stored(self, provider: str, record_ids: list[str]) -> bool:
+        """Return True if every record is already stored; safe to call from any thread.
+
+        Other threads never touch the owner's connection: they query committed
+        records through their own read-only connection, so records still
+        buffered in the writer count as unseen there.
+        """
+        if threading.get_ident() == self._owner:
+            return all(self.seen(provider, record_id) for record_id in record_ids)
+        conn = self._reader()
+        if conn is None:
+            return False
+        return all(repo.has_record(conn, self._run_id, provider, record_id) for record_id in record_ids)
+
+    def _reader(self) -> sqlite3.Connection | None:
+        conn = getattr(self._readers, "conn", None)
+        if conn is None:
+            if not self._path:
+                return None
+            conn = self._readers.conn = db.connect_readonly(Path(self._path))
+        return conn
+
+
+def _key(provider: str, record_id: str) -> str:
+    return f"{provider}\x1f{record_id}"
@@ -0,0 +1,136 @@
+"""Group-commit writer for run state."""
+
+from __future__ import annotations
+
+import sqlite3
+import time
+from typing import Callable
+
+from papyr.core.models import PaperRecord, ProviderState, RawRecord
+from papyr.core.state import repo
+from papyr.core.state.raw_codec import RawPolicy
+
+
+class StateWriter:
+    """Buffer record, download and duplicate writes and commit them as one transaction.
+
+    A flush happens when a tracked provider cursor moves to a new page, when
+    `max_rows` writes are pending, or when the oldest pending write is older
+    than `max_delay_ms`. Provider cursors are written in the same transaction
+    as the records, so a committed cursor never points past committed records.
+    """
+
+    def __init__(
+        self,
+        conn: sqlite3.Connection,
+        run_id: int,
+        max_rows: int = 500,
+        max_delay_ms: int = 1000,
+        on_commit: Callable[[], None] | None = None,
+        raw_policy: RawPolicy | None = None,
+    ) -> None:
+        self._conn = conn
+        self._run_id = run_id
+        self._max_rows = max(1, max_rows)
+        self._max_delay = max(0, max_delay_ms) / 1000.0
+        self._records: list[tuple[str, RawRecord, PaperRecord]] = []
+        self._updates: list[tuple[str, RawRecord, PaperRecord]] = []
+        self.updated = 0
+        self._pending_keys: set[tuple[str, str]] = set()
+        self._downloads: list[tuple[str | None, str, str | None, str, int, str | None]] = []
+        self._duplicates: list[tuple[int, str]] = []
+        self._states: dict[str, ProviderState] = {}
+        self._committed_cursors: dict[str, str | None] = {}
+        self._first_pending: float | None = None
+        self._on_commit = on_commit
+        self._raw_policy = raw_policy
+
+    @property
+    def pending(self) -> int:
+        """Number of buffered writes."""
+        return len(self._records) + len(self._updates) + len(self._downloads) + len(self._duplicates)
+
+    def track_state(self, provider: str, state: ProviderState) -> None:
+        """Persist `state` with every flush until the provider is released."""
+        self._states[provider] = state
+        self._committed_cursors.setdefault(provider, state.cursor)
+
+    def release_state(self, provider: str) -> None:
+        """Flush and stop tracking a provider's state."""
+        self.flush()
+        self._states.pop(provider, None)
+        self._committed_cursors.pop(provider, None)
+
+    def add_record(self, provider: str, raw: RawRecord, normalized: PaperRecord, update: bool = False) -> None:
+        """Buffer a record; with `update` an already stored record is overwritten in place."""
+        (self._updates if update else self._records).append((provider, raw, normalized))
+        self.updated += 1 if update else 0
+        if raw.record_id:
+            self._pending_keys.add((provider, raw.record_id))
+        self._touch()
+
+    def is_pending(self, provider: str, record_id: str) -> bool:
+        """Return True if the record is buffered but not yet committed."""
+        return (provider, record_id) in self._pending_keys
+
+    def add_download(
+        self,
+        record_id: str | None,
+        pdf_url: str,
+        file_path: str | None,
+        status: str,
+        attempts: int,
+        last_error: str | None = None,
+    ) -> None:
+        self._downloads.append((record_id, pdf_url, file_path, status, attempts, last_error))
+        self._touch()
+
+    def mark_duplicate(self, record_row_id: int, duplicate_of: str) -> None:
+        self._duplicates.append((record_row_id, duplicate_of))
+        self._touch()
+
+    def maybe_flush(self) -> bool:
+        """Flush if a page boundary or a batch threshold was reached."""
+        if self._page_completed() or self.pending >= self._max_rows:
+            self.flush()
+            return True
+        if self._first_pending is not None and time.monotonic() - self._first_pending >= self._max_delay:
+            self.flush()
+            return True
+        return False
+
+    def flush(self) -> None:
+        """Commit all buffered writes and tracked provider cursors."""
+        if not self.pending and not self._states:
+            return
+        cursors = {provider: state.cursor for provider, state in self._states.items()}
+        with self._conn:
+            if self._records:
+                repo.insert_records(self._conn, self._run_id, self._records, raw_policy=self._raw_policy)
+            if self._updates:
+                repo.upsert_records(self._conn, self._run_id, self._updates, raw_policy=self._raw_policy)
+            if self._downloads:
+                repo.insert_downloads(self._conn, self._run_id, self._downloads)
+            if self._duplicates:
+                repo.mark_duplicates(self._conn, self._duplicates)
+            for provider, state in self._states.items():
+                repo.upsert_provider_state(self._conn, self._run_id, provider, state, commit=False)
+        self._committed_cursors.update(cursors)
+        self._records.clear()
+        self._updates.clear()
+        self._pending_keys.clear()
+        self._downloads.clear()
+        self._duplicates.clear()
+        self._first_pending = None
+        if self._on_commit is not None:
+            self._on_commit()
+
+    def _touch(self) -> None:
+        if self._first_pending is None:
+            self._first_pending = time.monotonic()
+
+    def _page_completed(self) -> bool:
+        return any(
+            state.cursor != self._committed_cursors.get(provider)
+            for provider, state in self._states.items()
+        )
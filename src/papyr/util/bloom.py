@@ -0,0 +1,34 @@
+"""Fixed-size Bloom filter."""
+
+from __future__ import annotations
+
+import hashlib
+import math
+
+
+class BloomFilter:
+    """Set membership with no false negatives in a fixed amount of memory.
+
+    Sized for `capacity` items at `error_rate` false positives; adding more
+    items only raises the false-positive rate.
+    """
+
+    def __init__(self, capacity: int, error_rate: float = 0.01) -> None:
+        capacity = max(1, capacity)
+        error_rate = min(max(error_rate, 1e-6), 0.5)
+        self.size = max(8, int(-capacity * math.log(error_rate) / (math.log(2) ** 2)))
+        self.hashes = max(1, round(self.size / capacity * math.log(2)))
+        self._bits = bytearray((self.size + 7) // 8)
+
+    def add(self, key: str) -> None:
+        for position in self._positions(key):
+            self._bits[position >> 3] |= 1 << (position & 7)
+
+    def __contains__(self, key: str) -> bool:
+        return all(self._bits[position >> 3] & (1 << (position & 7)) for position in self._positions(key))
+
+    def _positions(self, key: str) -> list[int]:
+        digest = hashlib.blake2b(key.encode("utf-8"), digest_size=16).digest()
+        first = int.from_bytes(digest[:8], "little")
+        second = int.from_bytes(digest[8:], "little") | 1
+        return [(first + idx * second) % self.size for idx in range(self.hashes)]
@@ -36,3 +36,25 @@ def set_env_value(path: Path, key: str, value: str) -> None:
     data = load_env_file(path)
     data[key] = value
     write_env_file(path, data)
+
+
+def config_int(config: dict[str, str], key: str, default: int) -> int:
+    """Read an integer setting, falling back to `default` when missing or invalid."""
+    value = str(config.get(key, "")).strip()
+    if not value:
+        return default
+    try:
+        return int(value)
+    except ValueError:
+        return default
+
+
+def config_float(config: dict[str, str], key: str, default: float) -> float:
+    """Read a float setting, falling back to `default` when missing or invalid."""
+    value = str(config.get(key, "")).strip()
+    if not value:
+        return default
+    try:
+        return float(value)
+    except ValueError:
+        return default
@@ -0,0 +1,82 @@
+import io
+import threading
+
+import requests
+
+from papyr.adapters.arxiv import ArxivProvider, iter_entries, total_results
+from papyr.core.models import ProviderState, SearchQuery
+
+FEED = (
+    b'<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">'
+    b"<opensearch:totalResults>2</opensearch:totalResults>"
+    b"<entry><id>http://arxiv.org/abs/2101.00001v2</id><title> First\n title </title><summary>S1</summary>"
+    b"<published>2021-01-02T00:00:00Z</published><author><name>Ada Lovelace</name></author>"
+    b"<author><name>Alan Turing</name></author></entry>"
+    b"<entry><id>http://arxiv.org/abs/2101.00002v1</id><title>Second</title></entry>"
+    b"</feed>"
+)
+
+
+def test_iter_entries_yields_each_entry_before_the_feed_ends():
+    split = FEED.index(b"<entry><id>http://arxiv.org/abs/2101.00002")
+    delivered = []
+
+    def chunks():
+        delivered.append(1)
+        yield FEED[:split]
+        delivered.append(2)
+        yield FEED[split:]
+
+    entries = iter_entries(chunks())
+    first = next(entries)
+    assert delivered == [1]
+    assert first == {
+        "title": "First\n title",
+        "summary": "S1",
+        "authors": ["Ada Lovelace", "Alan Turing"],
+        "published": "2021-01-02T00:00:00Z",
+        "arxiv_id": "2101.00001v2",
+        "url": "http://arxiv.org/abs/2101.00001v2",
+    }
+    assert [entry["arxiv_id"] for entry in entries] == ["2101.00002v1"]
+
+
+def test_total_results_reads_the_feed_header():
+    assert total_results([FEED[:120], FEED[120:]]) == 2
+
+
+class _HeldBody:
+    """Response body that holds back everything after the first entry until released."""
+
+    def __init__(self, body, split):
+        self.parts = [body[:split], body[split:]]
+        self.release = threading.Event()
+        self.held = False
+
+    def read(self, size=-1, **kwargs):
+        if len(self.parts) == 1:
+            self.held = not self.release.wait(timeout=2.0)
+        return self.parts.pop(0) if self.parts else b""
+
+
+def test_search_yields_records_while_the_page_is_still_arriving(monkeypatch, tmp_path):
+    monkeypatch.setattr("papyr.core.rate_limit.time.sleep", lambda seconds: None)
+    body = _HeldBody(FEED, FEED.index(b"<entry><id>http://arxiv.org/abs/2101.00002"))
+    pages = [body]
+
+    def fake_get(self, url, params=None, **kwargs):
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.raw = pages.pop(0) if pages else io.BytesIO(b'<feed xmlns="http://www.w3.org/2005/Atom"/>')
+        return resp
+
+    monkeypatch.setattr("requests.Session.get", fake_get)
+    state = ProviderState()
+    query = SearchQuery(keywords="x", output_dir=str(tmp_path), extra={"rate_limit_db": "off"})
+    records = ArxivProvider().search(query, state)
+
+    assert next(records).record_id == "2101.00001v2"
+    assert body.parts and state.cursor is None
+    body.release.set()
+    assert [raw.record_id for raw in records] == ["2101.00002v1"]
+    assert not body.held and state.cursor == "2"
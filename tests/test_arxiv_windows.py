@@ -0,0 +1,123 @@
+import io
+import re
+from datetime import date, timedelta
+
+import requests
+
+from papyr.adapters.arxiv import ArxivProvider
+from papyr.core.models import ProviderState, SearchQuery
+
+PAPERS = [(f"2101.{idx:05d}", date(2021, 1, 1) + timedelta(days=idx * 3)) for idx in range(100)]
+
+
+def _feed(entries, total):
+    body = "".join(
+        f"<entry><id>http://arxiv.org/abs/{arxiv_id}v1</id><title>T</title><summary>S</summary>"
+        f"<published>{submitted.isoformat()}T00:00:00Z</published></entry>"
+        for arxiv_id, submitted in entries
+    )
+    return (
+        '<feed xmlns="http://www.w3.org/2005/Atom" xmlns:opensearch="http://a9.com/-/spec/opensearch/1.1/">'
+        f"<opensearch:totalResults>{total}</opensearch:totalResults>{body}</feed>"
+    )
+
+
+def _fake_arxiv(calls, fail_after=None):
+    def fake_get(self, url, params=None, headers=None, timeout=None, **kwargs):
+        calls.append(dict(params))
+        if fail_after is not None and len(calls) > fail_after:
+            raise RuntimeError("network down")
+        window = re.search(r"submittedDate:\[(\d{8})0000 TO (\d{8})2359\]", params["search_query"])
+        low, high = window.groups() if window else ("00000000", "99999999")
+        matches = [paper for paper in PAPERS if low <= f"{paper[1]:%Y%m%d}" <= high]
+        page = matches[params["start"] : params["start"] + params["max_results"]]
+        resp = requests.Response()
+        resp.status_code = 200
+        resp.raw = io.BytesIO(_feed(page, len(matches)).encode("utf-8"))
+        return resp
+
+    return fake_get
+
+
+def _query(tmp_path, **extra):
+    return SearchQuery(
+        keywords="x",
+        year_start=2021,
+        year_end=2021,
+        output_dir=str(tmp_path),
+        extra={"rate_limit_db": "off", **extra},
+    )
+
+
+def test_windows_are_sized_from_counts_and_paged_independently(monkeypatch, tmp_path):
+    monkeypatch.setattr("papyr.core.rate_limit.time.sleep", lambda seconds: None)
+    calls = []
+    monkeypatch.setattr("requests.Session.get", _fake_arxiv(calls))
+    state = ProviderState()
+    query = _query(tmp_path, arxiv_window_results="30", arxiv_page_size="20")
+    ids = [raw.record_id for raw in ArxivProvider().search(query, state)]
+
+    assert sorted(ids) == sorted(f"{arxiv_id}v1" for arxiv_id, _ in PAPERS)
+    windows = state.extra["windows"]
+    assert len(windows) > 1 and all(window["done"] for window in windows)
+    assert max(call["start"] for call in calls) < 30
+    assert all(call["max_results"] <= 20 for call in calls)
+
+
+def test_windows_resume_from_their_offsets(monkeypatch, tmp_path):
+    monkeypatch.setattr("papyr.core.rate_limit.time.sleep", lambda seconds: None)
+    calls = []
+    monkeypatch.setattr("requests.Session.get", _fake_arxiv(calls, fail_after=12))
+    state = ProviderState()
+    query = _query(tmp_path, arxiv_window_results="30", arxiv_page_size="20", arxiv_window_workers="1")
+    ids = []
+    try:
+        for raw in ArxivProvider().search(query, state):
+            ids.append(raw.record_id)
+    except RuntimeError:
+        pass
+    assert any(window["offset"] for window in state.extra["windows"])
+
+    calls.clear()
+    monkeypatch.setattr("requests.Session.get", _fake_arxiv(calls))
+    ids.extend(raw.record_id for raw in ArxivProvider().search(query, state))
+    assert all(call["max_results"] > 0 for call in calls)
+    assert len(ids) == len(set(ids)) == len(PAPERS)
+
+
+def test_windows_are_off_by_default(monkeypatch, tmp_path):
+    monkeypatch.setattr("papyr.core.rate_limit.time.sleep", lambda seconds: None)
+    calls = []
+    monkeypatch.setattr("requests.Session.get", _fake_arxiv(calls))
+    query = _query(tmp_path)
+    query.limit = 5
+    state = ProviderState()
+
+    assert len(list(ArxivProvider().search(query, state))) == 5
+    assert "windows" not in state.extra
+    assert all(call["max_results"] > 0 for call in calls)
+
+
+def test_offset_runs_scope_dates_and_resume_the_same_query(monkeypatch, tmp_path):
+    monkeypatch.setattr("papyr.core.rate_limit.time.sleep", lambda seconds: None)
+    calls = []
+    monkeypatch.setattr("requests.Session.get", _fake_arxiv(calls, fail_after=2))
+    query = _query(tmp_path, arxiv_page_size="20")
+    query.fields_to_search = ["title"]
+    state = ProviderState()
+    ids = []
+    try:
+        for raw in ArxivProvider().search(query, state):
+            ids.append(raw.record_id)
+    except RuntimeError:
+        pass
+    expected = "ti:x AND submittedDate:[202101010000 TO 202112312359]"
+    assert calls[0]["search_query"] == expected
+    assert state.extra["search_query"] == expected and state.cursor == "40"
+
+    calls.clear()
+    monkeypatch.setattr("requests.Session.get", _fake_arxiv(calls))
+    query.year_end = 2022
+    ids.extend(raw.record_id for raw in ArxivProvider().search(query, state))
+    assert {call["search_query"] for call in calls} == {expected}
+    assert len(ids) == len(set(ids)) == len(PAPERS)
@@ -0,0 +1,64 @@
+import asyncio
+
+from papyr.adapters.base import Provider
+from papyr.core.models import PaperRecord, ProviderState, RateLimitPolicy, RawRecord, SearchQuery
+
+
+class _ListProvider(Provider):
+    name = "List"
+    requires_credentials = False
+    credential_fields: list[str] = []
+
+    def __init__(self, ids):
+        self.ids = ids
+        self.closed = False
+
+    def is_configured(self, config):
+        return True
+
+    def setup_instructions(self):
+        return []
+
+    def search(self, query, state):
+        try:
+            for record_id in self.ids:
+                yield RawRecord(provider=self.name, data={}, record_id=record_id)
+                state.cursor = record_id
+        finally:
+            self.closed = True
+
+    def normalize(self, raw):
+        return PaperRecord(id=raw.record_id or "", origin=self.name)
+
+    def get_official_urls(self, record):
+        return {"landing_url": record.url, "pdf_url": None}
+
+    def rate_limit_policy(self):
+        return RateLimitPolicy()
+
+
+def test_asearch_wraps_sync_search(tmp_path):
+    provider = _ListProvider(["a", "b", "c"])
+    state = ProviderState()
+    query = SearchQuery(keywords="x", output_dir=str(tmp_path))
+
+    async def collect():
+        return [raw.record_id async for raw in provider.asearch(query, state)]
+
+    assert asyncio.run(collect()) == ["a", "b", "c"]
+    assert state.cursor == "c"
+    assert provider.closed
+
+
+def test_asearch_closes_sync_generator_on_early_exit(tmp_path):
+    provider = _ListProvider(["a", "b", "c"])
+    query = SearchQuery(keywords="x", output_dir=str(tmp_path))
+
+    async def first():
+        stream = provider.asearch(query, ProviderState())
+        async for raw in stream:
+            await stream.aclose()
+            return raw.record_id
+
+    assert asyncio.run(first()) == "a"
+    assert provider.closed
@@ -0,0 +1,58 @@
+import sqlite3
+
+import pytest
+from rich.console import Console
+
+from papyr.adapters.base import Provider
+from papyr.core.models import PaperRecord, RateLimitPolicy, RawRecord, SearchQuery
+from papyr.core.pipeline import run_metasearch
+
+
+class _PagedProvider(Provider):
+    name = "Paged"
+    requires_credentials = False
+    credential_fields: list[str] = []
+
+    def __init__(self, db_path):
+        self.db_path = db_path
+        self.committed_before_fetch: list[tuple[str | None, int]] = []
+
+    def is_configured(self, config):
+        return True
+
+    def setup_instructions(self):
+        return []
+
+    def search(self, query, state):
+        for page in range(3):
+            if page:
+                # A hard kill here must not lose the pages already consumed.
+                conn = sqlite3.connect(self.db_path)
+                cursor = conn.execute("SELECT cursor FROM provider_state").fetchone()
+                count = conn.execute("SELECT COUNT(1) FROM records").fetchone()[0]
+                conn.close()
+                self.committed_before_fetch.append((cursor[0] if cursor else None, count))
+            for idx in range(2):
+                yield RawRecord(provider=self.name, data={}, record_id=f"p{page}-{idx}")
+            state.cursor = f"page-{page + 1}"
+            state.checkpoint()
+
+    def normalize(self, raw):
+        return PaperRecord(id=raw.record_id or "", origin=self.name)
+
+    def get_official_urls(self, record):
+        return {"landing_url": record.url, "pdf_url": None}
+
+    def rate_limit_policy(self):
+        return RateLimitPolicy()
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_each_page_is_checkpointed_before_the_next_fetch(tmp_path, parallel):
+    provider = _PagedProvider(tmp_path / "state.sqlite")
+    query = SearchQuery(keywords="x", output_dir=str(tmp_path), parallel_providers=parallel)
+    config = {"PAPYR_WRITE_BATCH_ROWS": "1000", "PAPYR_WRITE_BATCH_MS": "600000"}
+
+    run_metasearch(query, [provider], config, console=Console(quiet=True))
+
+    assert provider.committed_before_fetch == [("page-1", 2), ("page-2", 4)]
@@ -0,0 +1,27 @@
+import threading
+
+from papyr.core.state import db
+
+
+def test_manager_reuses_connection_per_thread_and_applies_pragmas(tmp_path):
+    manager = db.ConnectionManager()
+    path = tmp_path / "state.sqlite"
+    conn = manager.get(path, {"PAPYR_SQLITE_BUSY_TIMEOUT_MS": "1234"})
+    assert manager.get(path) is conn
+    assert conn.execute("PRAGMA busy_timeout").fetchone()[0] == 1234
+    assert conn.execute("PRAGMA user_version").fetchone()[0] == db.SCHEMA_VERSION
+
+    other = []
+    thread = threading.Thread(target=lambda: other.append(manager.get(path)))
+    thread.start()
+    thread.join()
+    assert other[0] is not conn
+    manager.close_all()
+
+
+def test_init_db_skips_current_schema(tmp_path):
+    conn = db.connect(tmp_path / "state.sqlite")
+    db.init_db(conn)
+    conn.execute("DROP INDEX idx_records_dedup")
+    db.init_db(conn)
+    assert conn.execute("SELECT name FROM sqlite_master WHERE name='idx_records_dedup'").fetchone() is None
@@ -0,0 +1,47 @@
+from papyr.adapters.crossref import SELECT_FIELDS, CrossrefProvider
+from papyr.core.models import ProviderState, RawRecord, SearchQuery
+
+ITEM = {
+    "DOI": "10.1/abc",
+    "author": [{"given": "Ada", "family": "Lovelace"}],
+    "title": ["Notes"],
+    "abstract": "<jats:p>Engines</jats:p>",
+    "volume": "3",
+    "issue": "2",
+    "page": "10-20",
+    "publisher": "Royal Society",
+    "issued": {"date-parts": [[1843, 9]]},
+    "type": "journal-article",
+    "subject": ["Mathematics", "History"],
+    "is-referenced-by-count": 42,
+    "license": [{"URL": "https://creativecommons.org/licenses/by/4.0/"}],
+    "reference": [{"key": "ref1"}],
+    "funder": [{"name": "Crown"}],
+    "link": [{"URL": "https://example.org/pdf"}],
+}
+
+
+def test_normalize_only_reads_selected_fields():
+    provider = CrossrefProvider()
+    selected = {key: value for key, value in ITEM.items() if key in SELECT_FIELDS.split(",")}
+    full = provider.normalize(RawRecord(provider="Crossref", data=ITEM, record_id="10.1/abc"))
+    projected = provider.normalize(RawRecord(provider="Crossref", data=selected, record_id="10.1/abc"))
+    assert full.model_dump(exclude={"retrieved_at"}) == projected.model_dump(exclude={"retrieved_at"})
+    assert (full.month, full.pages, full.citations, full.keywords) == ("9", "10-20", "42", "Mathematics; History")
+
+
+def test_select_is_sent_unless_full_raw_is_requested(monkeypatch, tmp_path):
+    monkeypatch.setattr("papyr.core.rate_limit.time.sleep", lambda seconds: None)
+    sent = []
+
+    def fake_get(self, url, params=None, **kwargs):
+        sent.append(params)
+        resp = type("Resp", (), {"status_code": 200, "headers": {}, "raise_for_status": lambda self: None})()
+        resp.json = lambda: {"message": {"items": [], "next-cursor": "x"}}
+        return resp
+
+    monkeypatch.setattr("requests.Session.get", fake_get)
+    for extra, expected in (({}, SELECT_FIELDS), ({"crossref_full_raw": "1"}, None)):
+        query = SearchQuery(keywords="x", output_dir=str(tmp_path), extra={"rate_limit_db": "off", **extra})
+        list(CrossrefProvider().search(query, ProviderState()))
+        assert sent[-1].get("select") == expected
@@ -0,0 +1,64 @@
+from unittest import mock
+
+from papyr.adapters.crossref import CrossrefProvider, balanced_year_ranges
+from papyr.core.models import ProviderState, SearchQuery
+
+YEAR_COUNTS = {"2018": 10, "2019": 10, "2020": 40, "2021": 20, "2022": 20}
+
+
+def test_balanced_year_ranges_split_by_volume():
+    counts = {int(year): total for year, total in YEAR_COUNTS.items()}
+    assert balanced_year_ranges(counts, 2018, 2022, 2) == [(2018, 2020), (2021, 2022)]
+    assert balanced_year_ranges(counts, 2018, 2022, 1) == [(2018, 2022)]
+    assert balanced_year_ranges({}, 2018, 2022, 4) == [(2018, 2022)]
+
+
+def _fake_crossref(calls, fail_on=None):
+    def fake_get(self, url, params=None, headers=None, timeout=None, **kwargs):
+        calls.append(dict(params))
+        resp = mock.Mock(status_code=200, headers={})
+        resp.raise_for_status = lambda: None
+        if params.get("rows") == 0:
+            resp.json = lambda: {"message": {"facets": {"published": {"values": YEAR_COUNTS}}}}
+            return resp
+        shard = params["filter"].split(",")[0]
+        page = 0 if params["cursor"] == "*" else int(params["cursor"].rsplit(":", 1)[1])
+        if fail_on == (shard, page):
+            raise RuntimeError("network down")
+        items = [{"DOI": f"10.1/{shard}-{page}-{i}"} for i in range(2)] if page < 2 else []
+        resp.json = lambda: {"message": {"items": items, "next-cursor": f"{shard}:{page + 1}"}}
+        return resp
+
+    return fake_get
+
+
+def test_sharded_search_pages_each_shard_and_resumes(monkeypatch, tmp_path):
+    monkeypatch.setattr("papyr.core.rate_limit.time.sleep", lambda seconds: None)
+    query = SearchQuery(
+        keywords="x",
+        year_start=2018,
+        year_end=2022,
+        output_dir=str(tmp_path),
+        extra={"crossref_shards": "2", "rate_limit_db": "off"},
+    )
+    state = ProviderState()
+    calls = []
+    monkeypatch.setattr("requests.Session.get", _fake_crossref(calls, fail_on=("from-pub-date:2021-01-01", 1)))
+    seen = []
+    try:
+        for raw in CrossrefProvider().search(query, state):
+            seen.append(raw.record_id)
+    except RuntimeError:
+        pass
+    assert calls[0]["rows"] == 0 and calls[0]["facet"] == "published:*"
+    shards = state.extra["shards"]
+    assert [(shard["from"], shard["until"]) for shard in shards] == [(2018, 2020), (2021, 2022)]
+    assert shards[1]["cursor"] == "from-pub-date:2021-01-01:1"
+
+    calls.clear()
+    monkeypatch.setattr("requests.Session.get", _fake_crossref(calls))
+    for raw in CrossrefProvider().search(query, state):
+        seen.append(raw.record_id)
+    assert all(call.get("rows") != 0 for call in calls)
+    assert len(seen) == len(set(seen)) == 8
+    assert all(shard["done"] for shard in state.extra["shards"])
@@ -0,0 +1,127 @@
+import json
+
+import requests
+
+from papyr.adapters.crossref import CrossrefProvider
+from papyr.core.models import PaperRecord, ProviderState, RawRecord, SearchQuery
+from papyr.core.state import db, repo
+from papyr.core.state.seen import SeenRecords
+from papyr.core.state.writer import StateWriter
+
+DOIS = [f"10.1/{idx}" for idx in range(2500)]
+
+
+def _response(status, payload):
+    resp = requests.Response()
+    resp.status_code = status
+    resp.url = "https://api.crossref.org/works"
+    resp._content = json.dumps(payload).encode("utf-8")
+    return resp
+
+
+def test_expired_cursor_fast_forwards_past_stored_works(monkeypatch, tmp_path):
+    monkeypatch.setattr("papyr.core.rate_limit.time.sleep", lambda seconds: None)
+    calls = []
+
+    def fake_get(self, url, params=None, **kwargs):
+        calls.append(dict(params))
+        if params["cursor"] == "stale":
+            return _response(400, {"status": "failed", "message": "cursor expired"})
+        offset = 0 if params["cursor"] == "*" else int(params["cursor"].split(":")[1])
+        page = DOIS[offset : offset + params["rows"]]
+        return _response(200, {"message": {"items": [{"DOI": doi} for doi in page], "next-cursor": f"c:{offset + len(page)}"}})
+
+    monkeypatch.setattr("requests.Session.get", fake_get)
+    stored = set(DOIS[:1500])
+    state = ProviderState(cursor="stale")
+    state.bind_seen(lambda record_ids: all(record_id in stored for record_id in record_ids))
+    query = SearchQuery(keywords="x", output_dir=str(tmp_path), extra={"rate_limit_db": "off", "prefetch_pages": "0"})
+
+    ids = [raw.record_id for raw in CrossrefProvider().search(query, state)]
+
+    fast_forward = [call for call in calls if call.get("select") == "DOI"]
+    assert [call["cursor"] for call in fast_forward] == ["*", "c:1000"]
+    assert ids == DOIS[1000:]
+    assert state.cursor == "c:2500"
+
+
+def test_unbound_state_restarts_from_the_beginning(monkeypatch, tmp_path):
+    monkeypatch.setattr("papyr.core.rate_limit.time.sleep", lambda seconds: None)
+
+    def fake_get(self, url, params=None, **kwargs):
+        if params["cursor"] == "stale":
+            return _response(404, {})
+        done = params["cursor"] != "*"
+        items = [] if done else [{"DOI": "10.1/a"}]
+        return _response(200, {"message": {"items": items, "next-cursor": "end"}})
+
+    monkeypatch.setattr("requests.Session.get", fake_get)
+    query = SearchQuery(keywords="x", output_dir=str(tmp_path), extra={"rate_limit_db": "off"})
+    ids = [raw.record_id for raw in CrossrefProvider().search(query, ProviderState(cursor="stale"))]
+    assert ids == ["10.1/a"]
+
+
+def _stored_seen(tmp_path, dois):
+    # `db.connect` keeps check_same_thread on, so a paging thread touching this
+    # connection would fail the test.
+    conn = db.connect(tmp_path / "state.sqlite")
+    db.init_db(conn)
+    run_id = repo.create_run(conn, "hash", {})
+    writer = StateWriter(conn, run_id)
+    for doi in dois:
+        writer.add_record("Crossref", RawRecord(provider="Crossref", data={}, record_id=doi), PaperRecord(id=doi))
+    writer.flush()
+    return SeenRecords(conn, run_id, writer)
+
+
+def _paging_get(calls):
+    def fake_get(self, url, params=None, **kwargs):
+        calls.append(dict(params))
+        if params.get("facet"):
+            values = {"2020": 1250, "2021": 1250}
+            return _response(200, {"message": {"facets": {"published": {"values": values}}}})
+        if params["cursor"] == "stale":
+            return _response(400, {"status": "failed", "message": "cursor expired"})
+        offset = 0 if params["cursor"] == "*" else int(params["cursor"].split(":")[1])
+        page = DOIS[offset : offset + params["rows"]]
+        return _response(200, {"message": {"items": [{"DOI": doi} for doi in page], "next-cursor": f"c:{offset + len(page)}"}})
+
+    return fake_get
+
+
+def test_recovery_checks_seen_records_from_the_prefetch_thread(monkeypatch, tmp_path):
+    monkeypatch.setattr("papyr.core.rate_limit.time.sleep", lambda seconds: None)
+    calls = []
+    monkeypatch.setattr("requests.Session.get", _paging_get(calls))
+    seen = _stored_seen(tmp_path, DOIS[:1500])
+    state = ProviderState(cursor="stale")
+    state.bind_seen(lambda record_ids: seen.all_stored("Crossref", record_ids))
+    query = SearchQuery(keywords="x", output_dir=str(tmp_path), extra={"rate_limit_db": "off"})
+
+    ids = [raw.record_id for raw in CrossrefProvider().search(query, state)]
+
+    assert [call["cursor"] for call in calls if call.get("select") == "DOI"] == ["*", "c:1000"]
+    assert ids == DOIS[1000:]
+
+
+def test_shards_recover_expired_cursors_from_their_threads(monkeypatch, tmp_path):
+    monkeypatch.setattr("papyr.core.rate_limit.time.sleep", lambda seconds: None)
+    calls = []
+    monkeypatch.setattr("requests.Session.get", _paging_get(calls))
+    seen = _stored_seen(tmp_path, DOIS[:1500])
+    shards = [{"from": 2020, "until": 2020, "cursor": "stale", "done": False}]
+    state = ProviderState(extra={"shards": shards})
+    state.bind_seen(lambda record_ids: seen.all_stored("Crossref", record_ids))
+    query = SearchQuery(
+        keywords="x",
+        year_start=2020,
+        year_end=2020,
+        output_dir=str(tmp_path),
+        extra={"rate_limit_db": "off", "crossref_shards": "2"},
+    )
+
+    ids = [raw.record_id for raw in CrossrefProvider().search(query, state)]
+
+    assert [call["cursor"] for call in calls if call.get("select") == "DOI"] == ["*", "c:1000"]
+    assert ids == DOIS[1000:]
+    assert state.extra["shards"][0]["done"]
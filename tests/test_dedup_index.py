@@ -0,0 +1,76 @@
+import sqlite3
+
+from papyr.core.models import PaperRecord, RawRecord
+from papyr.core.state import db, repo
+from papyr.core.state.writer import StateWriter
+
+
+def _add(writer, provider, **fields):
+    record = PaperRecord(origin=provider, **fields)
+    writer.add_record(provider, RawRecord(provider=provider, data={}, record_id=record.id), record)
+
+
+def _duplicates(conn, run_id):
+    return {(dup.id, canonical.id, reason) for dup, canonical, reason in repo.iter_duplicates(conn, run_id)}
+
+
+def test_index_marks_title_and_id_match_with_crossref_canonical(tmp_path):
+    conn = db.connect(tmp_path / "state.sqlite")
+    db.init_db(conn)
+    run_id = repo.create_run(conn, "hash1", {"keywords": "test"})
+    writer = StateWriter(conn, run_id)
+    _add(writer, "arXiv", title="Hello, World!", id="10.1/abc")
+    writer.flush()
+    _add(writer, "Crossref", title="Hello World", id="10.1/abc")
+    writer.flush()
+
+    assert _duplicates(conn, run_id) == {("10.1/abc", "10.1/abc", "title+id match (crossref canonical)")}
+    canonical = [row["provider"] for row in repo.iter_records(conn, run_id, canonical_only=True)]
+    assert canonical == ["Crossref"]
+
+
+def test_index_drops_preprint_in_same_batch(tmp_path):
+    conn = db.connect(tmp_path / "state.sqlite")
+    db.init_db(conn)
+    run_id = repo.create_run(conn, "hash1", {"keywords": "test"})
+    writer = StateWriter(conn, run_id)
+    _add(writer, "arXiv", title="Deep Learning for Trading", authors="Smith, J.; Doe, A.", type="preprint", id="2201.12345")
+    _add(writer, "Crossref", title="Deep Learning for Trading", authors="Smith, J.; Doe, A.", type="paper", id="10.1/xyz")
+    writer.flush()
+
+    assert _duplicates(conn, run_id) == {("2201.12345", "10.1/xyz", "title+authors match (drop preprint)")}
+
+
+def test_init_db_backfills_dedup_keys_for_old_databases(tmp_path, caplog):
+    db_path = tmp_path / "state.sqlite"
+    legacy = sqlite3.connect(db_path)
+    legacy.executescript(
+        """
+        CREATE TABLE runs (id INTEGER PRIMARY KEY AUTOINCREMENT, query_hash TEXT NOT NULL,
+            params_json TEXT NOT NULL, created_at TEXT NOT NULL);
+        CREATE TABLE records (id INTEGER PRIMARY KEY AUTOINCREMENT, run_id INTEGER NOT NULL,
+            provider TEXT NOT NULL, record_id TEXT, normalized_json TEXT NOT NULL, raw_json TEXT NOT NULL,
+            is_duplicate INTEGER NOT NULL DEFAULT 0, duplicate_of TEXT,
+            created_at TEXT NOT NULL, updated_at TEXT NOT NULL);
+        INSERT INTO runs (query_hash, params_json, created_at) VALUES ('h', '{}', 'now');
+        """
+    )
+    for raw_json in ("", '{"provider": "Crossref", "data": {"DOI": "10.1/A"}}'):
+        legacy.execute(
+            "INSERT INTO records (run_id, provider, record_id, normalized_json, raw_json, created_at, updated_at)"
+            " VALUES (1, 'Crossref', '10.1/A', ?, ?, 'now', 'now')",
+            (PaperRecord(title="A Title!", id="10.1/A").model_dump_json(), raw_json),
+        )
+    legacy.commit()
+    legacy.close()
+
+    conn = db.connect(db_path)
+    with caplog.at_level("WARNING", logger="papyr.core.state.db"):
+        db.init_db(conn)
+    # The repeated copy is folded into the first row, which keeps its payload.
+    assert repo.count_records(conn, 1) == 1
+    assert "Merged 1 repeated provider record rows" in caplog.text
+    assert "10.1/A" in conn.execute("SELECT raw_json FROM records").fetchone()["raw_json"]
+    row = conn.execute("SELECT title_key, id_key, title, paper_id FROM records").fetchone()
+    assert (row["title_key"], row["id_key"]) == ("a title", "10.1/a")
+    assert (row["title"], row["paper_id"]) == ("A Title!", "10.1/A")
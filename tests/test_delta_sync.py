@@ -0,0 +1,79 @@
+import sqlite3
+
+import pytest
+from rich.console import Console
+
+from papyr.adapters.base import Provider
+from papyr.adapters.crossref import CrossrefProvider
+from papyr.core.models import PaperRecord, RateLimitPolicy, RawRecord, SearchQuery
+from papyr.core.pipeline import run_metasearch
+from papyr.core.state import db, repo
+from papyr.util.time import now_iso
+
+
+class _DeltaProvider(Provider):
+    name = "Delta"
+    requires_credentials = False
+    credential_fields: list[str] = []
+    delta_sync = True
+
+    def __init__(self, works):
+        self.works = works
+        self.since = []
+
+    def is_configured(self, config):
+        return True
+
+    def setup_instructions(self):
+        return []
+
+    def search(self, query, state):
+        self.since.append(state.extra.get("delta_since"))
+        for record_id, title in self.works:
+            yield RawRecord(provider=self.name, data={"title": title}, record_id=record_id)
+
+    def normalize(self, raw):
+        return PaperRecord(id=raw.record_id or "", title=raw.data["title"], origin=self.name)
+
+    def get_official_urls(self, record):
+        return {"landing_url": record.url, "pdf_url": None}
+
+    def rate_limit_policy(self):
+        return RateLimitPolicy()
+
+
+def _rows(path):
+    conn = sqlite3.connect(path)
+    rows = dict(conn.execute("SELECT record_id, id || ':' || title FROM records"))
+    conn.close()
+    return rows
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_sync_fetches_the_delta_and_updates_changed_records(tmp_path, parallel):
+    query = SearchQuery(keywords="x", output_dir=str(tmp_path), parallel_providers=parallel)
+    config = {"PAPYR_SYNC": "1"}
+    first = _DeltaProvider([("a", "Old title"), ("b", "Second"), ("c", "Third")])
+    run_metasearch(query, [first], config, console=Console(quiet=True))
+    before = _rows(tmp_path / "state.sqlite")
+
+    delta = _DeltaProvider([("a", "New title"), ("d", "Fourth")])
+    count, _reason = run_metasearch(
+        query, [delta], config, console=Console(quiet=True), resume_run_id=1, append_new_only=True
+    )
+
+    today = now_iso()[:10]
+    assert first.since == [None] and delta.since == [today]
+    after = _rows(tmp_path / "state.sqlite")
+    assert count == 4
+    assert after["a"] == before["a"].replace("Old title", "New title")
+    assert after["b"] == before["b"] and "d" in after
+    results = (tmp_path / "results.csv").read_text(encoding="utf-8-sig")
+    assert "New title" in results and "Old title" not in results
+    state = repo.get_provider_state(db.open_state(tmp_path / "state.sqlite"), 1, "Delta")
+    assert state.extra["complete"] and state.extra["high_water"] == today and "delta_since" not in state.extra
+
+
+def test_crossref_delta_filters_on_index_date(tmp_path):
+    query = SearchQuery(keywords="x", output_dir=str(tmp_path))
+    assert "from-index-date:2026-01-31" in CrossrefProvider()._filters(query, None, None, "2026-01-31")
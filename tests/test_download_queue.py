@@ -0,0 +1,124 @@
+import json
+import sqlite3
+import threading
+import time
+
+import pytest
+
+from papyr.core import download_queue, pipeline
+from papyr.core.downloader import DownloadResult
+from papyr.core.state import db, repo
+
+
+def test_download_queue_drains_with_per_host_cap(tmp_path, monkeypatch):
+    db_path = tmp_path / "state.sqlite"
+    conn = db.connect(db_path)
+    db.init_db(conn)
+    run_id = repo.create_run(conn, "hash1", {"keywords": "test"})
+    rows = []
+    for idx in range(6):
+        host = "a.example" if idx % 2 else "b.example"
+        dest = tmp_path / "files" / f"{idx}.pdf"
+        rows.append((f"id-{idx}", f"https://{host}/{idx}.pdf", str(dest), "queued", 0, None))
+    with conn:
+        repo.insert_downloads(conn, run_id, rows)
+
+    lock = threading.Lock()
+    active: dict[str, int] = {}
+    peak: dict[str, int] = {}
+
+    def fake_download(url, dest, session=None):
+        host = url.split("/")[2]
+        with lock:
+            active[host] = active.get(host, 0) + 1
+            peak[host] = max(peak.get(host, 0), active[host])
+        time.sleep(0.05)
+        with lock:
+            active[host] -= 1
+        return DownloadResult(True, 1, "ok")
+
+    monkeypatch.setattr(download_queue, "download_pdf", fake_download)
+    queue = download_queue.DownloadQueue(db_path, run_id, workers=4, per_host=1, poll_interval=0.01)
+    queue.start()
+    queue.close(drain=True)
+
+    assert queue.ok == 6
+    assert max(peak.values()) == 1
+    assert repo.list_downloaded_ids(conn, run_id) == {f"id-{idx}" for idx in range(6)}
+    assert repo.count_queued_downloads(conn, run_id) == 0
+
+
+def test_busy_host_backlog_does_not_starve_other_hosts(tmp_path, monkeypatch):
+    db_path = tmp_path / "state.sqlite"
+    conn = db.connect(db_path)
+    db.init_db(conn)
+    run_id = repo.create_run(conn, "hash1", {"keywords": "test"})
+    # The slow host's backlog is longer than the dispatcher's listing window.
+    rows = [(f"a-{idx}", f"https://a.example/{idx}.pdf", str(tmp_path / f"a-{idx}.pdf"), "queued", 0, None) for idx in range(40)]
+    rows += [(f"b-{idx}", f"https://b.example/{idx}.pdf", str(tmp_path / f"b-{idx}.pdf"), "queued", 0, None) for idx in range(3)]
+    with conn:
+        repo.insert_downloads(conn, run_id, rows)
+
+    b_done = threading.Event()
+    waited = []
+    lock = threading.Lock()
+    b_urls = []
+
+    def fake_download(url, dest, session=None):
+        if "a.example" in url:
+            if not waited:
+                waited.append(b_done.wait(timeout=2.0))
+        else:
+            with lock:
+                b_urls.append(url)
+                if len(b_urls) == 3:
+                    b_done.set()
+        return DownloadResult(True, 1, "ok")
+
+    monkeypatch.setattr(download_queue, "download_pdf", fake_download)
+    queue = download_queue.DownloadQueue(db_path, run_id, workers=4, per_host=1, poll_interval=0.01)
+    queue.start()
+    queue.close(drain=True)
+
+    assert waited == [True]
+    assert queue.ok == 43
+    assert repo.count_queued_downloads(conn, run_id) == 0
+
+
+def test_queued_listing_caps_rows_per_host(tmp_path):
+    conn = db.connect(tmp_path / "state.sqlite")
+    db.init_db(conn)
+    run_id = repo.create_run(conn, "hash1", {"keywords": "test"})
+    hosts = ["a.example"] * 5 + ["B.example"] * 2 + ["c.example"]
+    rows = [(f"id-{idx}", f"https://{host}/{idx}.pdf", f"{idx}.pdf", "queued", 0, None) for idx, host in enumerate(hosts)]
+    with conn:
+        repo.insert_downloads(conn, run_id, rows)
+
+    listed = repo.list_queued_downloads(conn, run_id, limit=10, per_host=2, skip_hosts=["c.example"])
+    assert [row["record_id"] for row in listed] == ["id-0", "id-1", "id-5", "id-6"]
+    assert len(repo.list_queued_downloads(conn, run_id, limit=10)) == 8
+
+
+def test_dispatcher_failure_is_raised_from_close_and_logged(tmp_path, monkeypatch):
+    db_path = tmp_path / "state.sqlite"
+    conn = db.connect(db_path)
+    db.init_db(conn)
+    run_id = repo.create_run(conn, "hash1", {"keywords": "test"})
+    with conn:
+        repo.insert_downloads(conn, run_id, [("id-0", "https://a.example/0.pdf", str(tmp_path / "0.pdf"), "queued", 0, None)])
+
+    def locked(*args, **kwargs):
+        raise sqlite3.OperationalError("database is locked")
+
+    monkeypatch.setattr(download_queue.repo, "list_queued_downloads", locked)
+    queue = download_queue.DownloadQueue(db_path, run_id, poll_interval=0.01)
+    queue.start()
+    with pytest.raises(RuntimeError, match="database is locked"):
+        queue.close(drain=True)
+    assert repo.count_queued_downloads(conn, run_id) == 1
+
+    error_path = tmp_path / "errors.jsonl"
+    pipeline._close_downloads(queue, True, conn, run_id, error_path, tmp_path / "run.log")
+    logged = json.loads(error_path.read_text(encoding="utf-8"))
+    assert (logged["provider"], logged["exception_type"]) == ("downloads", "RuntimeError")
+    assert conn.execute("SELECT COUNT(*) FROM failures WHERE stage='download'").fetchone()[0] == 1
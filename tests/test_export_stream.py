@@ -0,0 +1,44 @@
+import csv
+
+from papyr.core.export_csv import export_csv
+from papyr.core.models import PaperRecord, RawRecord
+from papyr.core.state import db, repo
+
+
+def test_iter_records_pages_and_skips_duplicates(tmp_path):
+    conn = db.connect(tmp_path / "state.sqlite")
+    db.init_db(conn)
+    run_id = repo.create_run(conn, "hash1", {"keywords": "test"})
+    row_ids = []
+    for idx in range(5):
+        raw = RawRecord(provider="Crossref", data={}, record_id=f"10.1/{idx}")
+        row_ids.append(repo.insert_record(conn, run_id, "Crossref", raw, PaperRecord(id=f"10.1/{idx}")))
+    repo.mark_duplicate(conn, row_ids[1], "10.1/0")
+
+    all_ids = [row["record_id"] for row in repo.iter_records(conn, run_id, batch_size=2)]
+    assert all_ids == [f"10.1/{idx}" for idx in range(5)]
+    canonical = [row["record_id"] for row in repo.iter_records(conn, run_id, canonical_only=True, batch_size=2)]
+    assert canonical == ["10.1/0", "10.1/2", "10.1/3", "10.1/4"]
+    newer = [row["record_id"] for row in repo.iter_records(conn, run_id, after_id=row_ids[2])]
+    assert newer == ["10.1/3", "10.1/4"]
+
+
+def test_export_csv_accepts_iterator(tmp_path):
+    path = tmp_path / "results.csv"
+    records = (PaperRecord(title=f"T{idx}", id=str(idx)) for idx in range(3))
+    assert export_csv(records, path) == 3
+    with path.open(encoding="utf-8-sig", newline="") as handle:
+        rows = list(csv.DictReader(handle))
+    assert [row["Title"] for row in rows] == ["T0", "T1", "T2"]
+
+
+def test_iter_paper_records_reads_typed_columns(tmp_path):
+    conn = db.connect(tmp_path / "state.sqlite")
+    db.init_db(conn)
+    run_id = repo.create_run(conn, "hash1", {"keywords": "test"})
+    record = PaperRecord(title="Typed", id="10.1/x", year="2024", origin="Crossref", oa="true")
+    repo.insert_record(conn, run_id, "Crossref", RawRecord(provider="Crossref", data={}, record_id="10.1/x"), record)
+
+    assert list(repo.iter_paper_records(conn, run_id)) == [record]
+    row = conn.execute("SELECT year, paper_id FROM records WHERE year >= '2020'").fetchone()
+    assert tuple(row) == ("2024", "10.1/x")
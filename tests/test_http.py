@@ -0,0 +1,31 @@
+from papyr.core.http import HttpTransport
+
+
+def test_transport_pools_sessions_per_host_and_injects_mailto(monkeypatch):
+    transport = HttpTransport(mailto="me@example.org")
+    crossref = transport.session_for("https://api.crossref.org/works")
+    assert transport.session_for("https://api.crossref.org/works?rows=1") is crossref
+    assert transport.session_for("https://export.arxiv.org/api/query") is not crossref
+    assert "mailto:me@example.org" in crossref.headers["User-Agent"]
+    assert "mailto" not in transport.session_for("https://export.arxiv.org/api/query").headers["User-Agent"]
+    assert "example.org" not in transport.session_for("https://pdfs.example.com/a.pdf").headers["User-Agent"]
+    assert "gzip" in crossref.headers["Accept-Encoding"]
+
+    calls = []
+
+    def fake_get(self, url, params=None, **kwargs):
+        calls.append((url, params))
+
+    monkeypatch.setattr("requests.Session.get", fake_get)
+    transport.get("https://api.crossref.org/works", params={"rows": 1})
+    transport.get("https://export.arxiv.org/api/query", params={"start": 0})
+    assert calls[0][1] == {"rows": 1, "mailto": "me@example.org"}
+    assert calls[1][1] == {"start": 0}
+    transport.close()
+
+
+def test_custom_user_agent_is_only_sent_to_crossref():
+    transport = HttpTransport(mailto="me@example.org", user_agent="my-review (me@example.org)")
+    assert transport.session_for("https://api.crossref.org/works").headers["User-Agent"] == "my-review (me@example.org)"
+    assert transport.session_for("https://export.arxiv.org/api/query").headers["User-Agent"].startswith("papyr/")
+    transport.close()
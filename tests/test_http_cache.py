@@ -0,0 +1,136 @@
+import json
+
+import requests
+
+from papyr.adapters.crossref import CrossrefProvider
+from papyr.core.http import HttpTransport, get_with_retries
+from papyr.core.http_cache import HttpCache
+from papyr.core.models import ProviderState, RateLimitPolicy, SearchQuery
+from papyr.core.rate_limit import AdaptivePacer, shared_limiter
+
+
+def _response(status, body=b"", headers=None):
+    resp = requests.Response()
+    resp.status_code = status
+    resp._content = body
+    resp.headers.update(headers or {})
+    resp.url = "https://export.arxiv.org/api/query"
+    return resp
+
+
+def test_cache_serves_fresh_hits_and_revalidates_stale(tmp_path, monkeypatch):
+    cache = HttpCache(tmp_path / "cache.sqlite", ttl_seconds=3600)
+    transport = HttpTransport(cache=cache)
+    sent = []
+    replies = [
+        _response(200, b"<feed/>", {"ETag": '"v1"', "Content-Type": "application/atom+xml"}),
+        _response(304),
+    ]
+
+    def fake_get(self, url, params=None, headers=None, **kwargs):
+        sent.append(dict(headers or {}))
+        return replies.pop(0)
+
+    monkeypatch.setattr("requests.Session.get", fake_get)
+    url = "https://export.arxiv.org/api/query"
+    assert transport.get(url, params={"start": 0}).content == b"<feed/>"
+    assert cache.is_fresh(transport.lookup(url, {"start": 0})[1])
+    assert transport.get(url, params={"start": 0}).content == b"<feed/>"
+    assert len(sent) == 1
+
+    cache.ttl_seconds = 0
+    assert not cache.is_fresh(transport.lookup(url, {"start": 0})[1])
+    assert transport.get(url, params={"start": 0}).content == b"<feed/>"
+    assert sent[1]["If-None-Match"] == '"v1"'
+
+
+def test_retrying_get_looks_up_once_and_uncached_requests_skip_the_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr("papyr.core.rate_limit.time.sleep", lambda seconds: None)
+    cache = HttpCache(tmp_path / "cache.sqlite", ttl_seconds=3600)
+    transport = HttpTransport(cache=cache)
+    lookups = []
+    original = cache.lookup
+    monkeypatch.setattr(cache, "lookup", lambda key: lookups.append(key) or original(key))
+    monkeypatch.setattr("requests.Session.get", lambda self, url, **kwargs: _response(200, b"<feed/>"))
+    policy = RateLimitPolicy(min_delay_seconds=0.01)
+    pacer = AdaptivePacer(shared_limiter("cache-test", policy), policy)
+    url = "https://export.arxiv.org/api/query"
+
+    get_with_retries(url, {"start": 0}, pacer, transport=transport)
+    assert len(lookups) == 1
+
+    get_with_retries(url, {"start": 1}, pacer, transport=transport, cache=False)
+    assert len(lookups) == 1
+    assert transport.lookup(url, {"start": 1})[1] is None
+
+
+def test_cache_evicts_least_recently_used(tmp_path):
+    cache = HttpCache(tmp_path / "cache.sqlite", max_bytes=60)
+    for idx in range(3):
+        body = bytes(range(idx, idx + 40))
+        cache.store(f"k{idx}", "u", body, "text/plain", None, None, None)
+    assert cache.lookup("k0") is None
+    assert cache.lookup("k2") is not None
+
+
+DOIS = [f"10.1/{idx}" for idx in range(250)]
+
+
+def _fake_crossref(calls, live):
+    """Crossref `/works` whose cursors only work in the session that issued them."""
+
+    def fake_get(self, url, params=None, **kwargs):
+        calls.append(dict(params))
+        if params["cursor"] == "*":
+            session, offset = len(calls), 0
+            live.add(session)
+        else:
+            session, offset = (int(part) for part in params["cursor"].split(":"))
+            if session not in live:
+                return _crossref_response(400, {"status": "failed"})
+        page = DOIS[offset : offset + params["rows"]]
+        message = {"items": [{"DOI": doi} for doi in page], "next-cursor": f"{session}:{offset + len(page)}"}
+        return _crossref_response(200, {"message": message})
+
+    return fake_get
+
+
+def _crossref_response(status, payload):
+    resp = _response(status, json.dumps(payload).encode("utf-8"))
+    resp.url = "https://api.crossref.org/works"
+    return resp
+
+
+def _crossref_run(tmp_path, transport, limit=None):
+    provider = CrossrefProvider()
+    provider.transport = transport
+    query = SearchQuery(keywords="x", output_dir=str(tmp_path), limit=limit, extra={"rate_limit_db": "off"})
+    return [raw.record_id for raw in provider.search(query, ProviderState())]
+
+
+def test_repeated_crossref_run_is_served_from_the_cache(tmp_path, monkeypatch):
+    monkeypatch.setattr("papyr.core.rate_limit.time.sleep", lambda seconds: None)
+    transport = HttpTransport(cache=HttpCache(tmp_path / "cache.sqlite", ttl_seconds=3600))
+    calls, live = [], set()
+    monkeypatch.setattr("requests.Session.get", _fake_crossref(calls, live))
+    assert _crossref_run(tmp_path, transport) == DOIS
+
+    calls.clear()
+    assert _crossref_run(tmp_path, transport) == DOIS
+    assert calls == []
+
+
+def test_first_uncached_crossref_page_fast_forwards_to_a_live_cursor(tmp_path, monkeypatch):
+    monkeypatch.setattr("papyr.core.rate_limit.time.sleep", lambda seconds: None)
+    transport = HttpTransport(cache=HttpCache(tmp_path / "cache.sqlite", ttl_seconds=3600))
+    calls, live = [], set()
+    monkeypatch.setattr("requests.Session.get", _fake_crossref(calls, live))
+    assert _crossref_run(tmp_path, transport, limit=150) == DOIS[:150]
+
+    # The cached pages' cursors belong to a session that has since expired.
+    live.clear()
+    first_run = len(calls)
+    assert _crossref_run(tmp_path, transport) == DOIS
+    resumed = calls[first_run:]
+    assert resumed[0]["cursor"] == "*" and resumed[0]["select"] == "DOI" and resumed[0]["rows"] == 100
+    assert all(call["cursor"] != calls[1]["cursor"] for call in resumed)
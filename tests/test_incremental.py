@@ -0,0 +1,72 @@
+import pytest
+from rich.console import Console
+
+from papyr.adapters.base import Provider
+from papyr.adapters.crossref import _query_params
+from papyr.core.models import PaperRecord, RateLimitPolicy, RawRecord, SearchQuery
+from papyr.core.pipeline import run_metasearch
+from papyr.core.state import db, repo
+
+
+class _NewestFirstProvider(Provider):
+    name = "Dated"
+    requires_credentials = False
+    credential_fields: list[str] = []
+
+    def __init__(self, ids):
+        self.ids = ids
+        self.yielded = 0
+
+    def is_configured(self, config):
+        return True
+
+    def setup_instructions(self):
+        return []
+
+    def search(self, query, state):
+        start = int(state.cursor or 0)
+        for offset, record_id in enumerate(self.ids[start:], start=start):
+            self.yielded += 1
+            yield RawRecord(provider=self.name, data={}, record_id=record_id)
+            state.cursor = str(offset + 1)
+
+    def normalize(self, raw):
+        return PaperRecord(id=raw.record_id or "", origin=self.name)
+
+    def get_official_urls(self, record):
+        return {"landing_url": record.url, "pdf_url": None}
+
+    def rate_limit_policy(self):
+        return RateLimitPolicy()
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_date_sorted_refresh_stops_at_known_records(tmp_path, parallel):
+    query = SearchQuery(keywords="x", output_dir=str(tmp_path), sort_order="date", parallel_providers=parallel)
+    config = {"PAPYR_INCREMENTAL_STOP_AFTER": "3"}
+    first = _NewestFirstProvider([f"old{idx}" for idx in range(20)])
+    run_metasearch(query, [first], config, console=Console(quiet=True))
+    assert first.yielded == 20
+
+    refresh = _NewestFirstProvider(["new0", "new1"] + first.ids)
+    count, _reason = run_metasearch(query, [refresh], config, console=Console(quiet=True))
+    assert refresh.yielded == 5
+    assert count == 22
+    conn = db.open_state(tmp_path / "state.sqlite")
+    state = repo.get_provider_state(conn, 1, "Dated")
+    assert state.extra.get("complete") and "refresh" not in state.extra
+
+
+def test_relevance_sorted_reruns_are_not_cut_short(tmp_path):
+    query = SearchQuery(keywords="x", output_dir=str(tmp_path))
+    config = {"PAPYR_INCREMENTAL_STOP_AFTER": "3"}
+    run_metasearch(query, [_NewestFirstProvider(["a", "b", "c", "d"])], config, console=Console(quiet=True))
+    rerun = _NewestFirstProvider(["a", "b", "c", "d", "e"])
+    run_metasearch(query, [rerun], config, console=Console(quiet=True))
+    assert rerun.yielded == 1
+
+
+def test_sort_order_is_sent_to_crossref(tmp_path):
+    query = SearchQuery(keywords="x", output_dir=str(tmp_path), sort_order="date")
+    assert _query_params(query) == {"query": "x", "sort": "published", "order": "desc"}
+    assert "sort" not in _query_params(query.model_copy(update={"sort_order": "relevance"}))
@@ -0,0 +1,94 @@
+from pathlib import Path
+
+from rich.console import Console
+
+from papyr.core.models import PaperRecord, RawRecord, SearchQuery
+from papyr.core.pipeline import run_metasearch
+from papyr.core.state import db, repo
+from papyr.core.state.raw_codec import RawPolicy
+from papyr.core.state.writer import StateWriter
+
+
+def _open_run(path, library_path):
+    conn = db.connect(path)
+    db.init_db(conn)
+    db.attach_library(conn, library_path)
+    return conn, repo.create_run(conn, "hash", {"keywords": "test"})
+
+
+def test_library_key_normalizes_doi_and_arxiv_version():
+    assert repo.library_key("Crossref", "https://doi.org/10.1/ABC") == "doi:10.1/abc"
+    assert repo.library_key("arXiv", "2201.12345v3") == "arxiv:2201.12345"
+    assert repo.library_key("SSRN", "abc") is None
+
+
+def test_runs_share_library_records_by_canonical_id(tmp_path):
+    library_path = tmp_path / "library.sqlite"
+    first, first_run = _open_run(tmp_path / "a" / "state.sqlite", library_path)
+    writer = StateWriter(first, first_run)
+    record = PaperRecord(origin="Crossref", title="Shared Paper", id="10.1/ABC")
+    writer.add_record("Crossref", RawRecord(provider="Crossref", data={"DOI": "10.1/ABC"}, record_id="10.1/ABC"), record)
+    writer.flush()
+
+    row = repo.list_records(first, first_run)[0]
+    assert row["library_id"] == "doi:10.1/abc"
+    assert row["raw_json"] == ""
+
+    second, _ = _open_run(tmp_path / "b" / "state.sqlite", library_path)
+    reused = repo.get_library_record(second, "Crossref", "10.1/abc")
+    assert reused is not None and reused.title == "Shared Paper"
+    assert repo.get_library_record(second, "Crossref", "10.1/missing") is None
+
+
+def test_library_payloads_follow_the_raw_policy(tmp_path):
+    conn, run_id = _open_run(tmp_path / "a" / "state.sqlite", tmp_path / "library.sqlite")
+    raw = RawRecord(provider="Crossref", data={"DOI": "10.1/ABC"}, record_id="10.1/ABC")
+    with conn:
+        repo.insert_records(conn, run_id, [("Crossref", raw, PaperRecord(id="10.1/ABC"))], RawPolicy(codec="zlib"))
+    stored = conn.execute("SELECT raw_json, raw_codec FROM library.papers").fetchone()
+    assert stored["raw_codec"] == "zlib"
+    assert repo.get_raw_record(conn, repo.last_record_row_id(conn, run_id)) == raw
+
+    # A run that keeps no payloads leaves the stored one alone; the compact path drops it.
+    with conn:
+        repo.upsert_records(conn, run_id, [("Crossref", raw, PaperRecord(id="10.1/ABC"))], RawPolicy(retention="none"))
+    assert conn.execute("SELECT raw_codec FROM library.papers").fetchone()["raw_codec"] == "zlib"
+    assert repo.compact_raw(conn, RawPolicy(retention="none")) == (0, 1)
+    assert conn.execute("SELECT raw_json FROM library.papers").fetchone()["raw_json"] == ""
+
+
+def test_purge_is_scoped_to_the_run(tmp_path):
+    conn, first_run = _open_run(tmp_path / "state.sqlite", tmp_path / "library.sqlite")
+    second_run = repo.create_run(conn, "other", {"keywords": "other"})
+    with conn:
+        for run_id, doi in ((first_run, "10.1/a"), (second_run, "10.1/b")):
+            raw = RawRecord(provider="Crossref", data={"DOI": doi}, record_id=doi)
+            repo.insert_records(conn, run_id, [("Crossref", raw, PaperRecord(id=doi))])
+        repo.insert_records(conn, first_run, [("SSRN", RawRecord(provider="SSRN", data={}, record_id="s1"), PaperRecord())])
+
+    with conn:
+        assert repo.purge_raw(conn, RawPolicy(retention="none"), first_run) == 2
+    kept = {row["canonical_id"] for row in conn.execute("SELECT canonical_id FROM library.papers WHERE raw_json<>''")}
+    assert kept == {"doi:10.1/b"}
+
+
+def test_attaching_another_library_switches_it(tmp_path):
+    conn, run_id = _open_run(tmp_path / "state.sqlite", tmp_path / "one.sqlite")
+    writer = StateWriter(conn, run_id)
+    raw = RawRecord(provider="Crossref", data={"DOI": "10.1/a"}, record_id="10.1/a")
+    writer.add_record("Crossref", raw, PaperRecord(title="One", id="10.1/a"))
+    writer.flush()
+
+    db.attach_library(conn, tmp_path / "one.sqlite")
+    assert repo.get_library_record(conn, "Crossref", "10.1/a") is not None
+    db.attach_library(conn, tmp_path / "two.sqlite")
+    assert repo.get_library_record(conn, "Crossref", "10.1/a") is None
+
+
+def test_runs_release_their_connection_and_library(tmp_path):
+    query = SearchQuery(keywords="x", output_dir=str(tmp_path / "run"))
+    run_metasearch(query, [], {"PAPYR_LIBRARY_DB": str(tmp_path / "one.sqlite")}, console=Console(quiet=True))
+    assert Path(tmp_path / "run" / "state.sqlite").resolve() not in db._MANAGER._connections()
+
+    run_metasearch(query, [], {"PAPYR_LIBRARY_DB": str(tmp_path / "two.sqlite")}, console=Console(quiet=True))
+    assert (tmp_path / "two.sqlite").exists()
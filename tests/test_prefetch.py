@@ -0,0 +1,116 @@
+import threading
+
+import pytest
+
+from papyr.core.prefetch import PAGE_END, merge_pages, merge_streams, prefetch_pages, stream_pages
+
+
+def _pages(count):
+    fetched = []
+
+    def fetch_page(token):
+        fetched.append(token)
+        next_token = token + 1 if token + 1 < count else None
+        return [f"item-{token}"], next_token
+
+    return fetch_page, fetched
+
+
+@pytest.mark.parametrize("depth", [0, 1, 3])
+def test_prefetch_yields_pages_in_order(depth):
+    fetch_page, _fetched = _pages(4)
+    pages = list(prefetch_pages(fetch_page, 0, depth))
+    assert [items for items, _ in pages] == [["item-0"], ["item-1"], ["item-2"], ["item-3"]]
+    assert pages[-1][1] is None
+
+
+def test_prefetch_reads_ahead_while_consumer_holds_page():
+    fetched_second = threading.Event()
+
+    def fetch_page(token):
+        if token == 1:
+            fetched_second.set()
+        return [token], token + 1 if token < 2 else None
+
+    pages = prefetch_pages(fetch_page, 0, depth=1)
+    first = next(pages)
+    assert first == ([0], 1)
+    assert fetched_second.wait(timeout=2.0)
+    pages.close()
+
+
+def test_prefetch_propagates_fetch_errors():
+    def fetch_page(token):
+        if token == 1:
+            raise RuntimeError("boom")
+        return [token], token + 1
+
+    pages = prefetch_pages(fetch_page, 0, depth=2)
+    assert next(pages) == ([0], 1)
+    with pytest.raises(RuntimeError, match="boom"):
+        next(pages)
+
+
+def test_merge_pages_pages_every_source_to_the_end():
+    sources = {name: _pages(count)[0:1] + (0,) for name, count in (("a", 3), ("b", 2))}
+    pages = list(merge_pages(sources, depth=1))
+    by_source = {}
+    for key, items, _next in pages:
+        by_source.setdefault(key, []).extend(items)
+    assert by_source == {"a": ["item-0", "item-1", "item-2"], "b": ["item-0", "item-1"]}
+
+
+def test_merge_pages_propagates_fetch_errors():
+    def failing(token):
+        raise RuntimeError("boom")
+
+    with pytest.raises(RuntimeError, match="boom"):
+        list(merge_pages({"a": (failing, 0)}))
+
+
+def _streamed(count, size=2):
+    def fetch_page(token):
+        for idx in range(size):
+            yield f"item-{token}-{idx}"
+        return token + 1 if token + 1 < count else None
+
+    return fetch_page
+
+
+@pytest.mark.parametrize("buffer", [0, 1, 5])
+def test_stream_pages_yields_items_then_page_ends(buffer):
+    events = list(stream_pages(_streamed(2), 0, buffer))
+    assert events == [
+        ("item-0-0", None),
+        ("item-0-1", None),
+        (PAGE_END, 1),
+        ("item-1-0", None),
+        ("item-1-1", None),
+        (PAGE_END, None),
+    ]
+
+
+def test_stream_pages_hands_over_items_before_the_page_ends():
+    release = threading.Event()
+
+    def fetch_page(token):
+        yield "first"
+        assert release.wait(timeout=2.0)
+        yield "second"
+        return None
+
+    events = stream_pages(fetch_page, 0, buffer=4)
+    assert next(events) == ("first", None)
+    release.set()
+    assert list(events) == [("second", None), (PAGE_END, None)]
+
+
+def test_merge_streams_pages_every_source_to_the_end():
+    events = list(merge_streams({"a": (_streamed(3), 0), "b": (_streamed(1), 0)}, buffer=2))
+    by_source = {}
+    for key, item, _next in events:
+        if item is not PAGE_END:
+            by_source.setdefault(key, []).append(item)
+    assert by_source["a"] == [f"item-{page}-{idx}" for page in range(3) for idx in range(2)]
+    assert by_source["b"] == ["item-0-0", "item-0-1"]
+    assert sum(item is PAGE_END for _key, item, _next in events) == 4
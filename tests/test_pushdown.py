@@ -0,0 +1,97 @@
+import sqlite3
+
+import pytest
+from rich.console import Console
+
+from papyr.adapters.arxiv import ArxivProvider, search_expression
+from papyr.adapters.base import Provider
+from papyr.adapters.crossref import CrossrefProvider, _query_params
+from papyr.core.models import PaperRecord, ProviderState, RateLimitPolicy, RawRecord, SearchQuery
+from papyr.core.pipeline import run_metasearch
+from papyr.core.pushdown import ResidualFilter
+
+
+def _query(tmp_path, **kwargs):
+    return SearchQuery(keywords="graph neural", output_dir=str(tmp_path), **kwargs)
+
+
+def test_crossref_pushes_types_access_and_single_field(tmp_path):
+    query = _query(tmp_path, types=["journal-article", "preprint"], access_filter="open", fields_to_search=["Title"])
+    filters = CrossrefProvider()._filters(query, 2020, 2021)
+    assert "type:journal-article" in filters and "type:posted-content" in filters
+    assert "has-license:true" in filters and "has-full-text:true" in filters
+    assert _query_params(query) == {"query.title": "graph neural"}
+    assert CrossrefProvider().pushdown(query, ProviderState()) >= {"types", "access", "fields"}
+
+    both = _query(tmp_path, fields_to_search=["title", "authors"])
+    assert _query_params(both) == {"query.bibliographic": "graph neural"}
+    assert "fields" not in CrossrefProvider().pushdown(both, ProviderState())
+
+
+def test_arxiv_scopes_fields_with_prefixes(tmp_path):
+    assert search_expression(_query(tmp_path)) == "all:graph neural"
+    assert search_expression(_query(tmp_path, fields_to_search=["title", "abstract"])) == (
+        "((ti:graph AND ti:neural) OR (abs:graph AND abs:neural))"
+    )
+    assert search_expression(_query(tmp_path, fields_to_search=["keywords"])) == "all:graph neural"
+    query = _query(tmp_path, year_start=2020, year_end=2021, fields_to_search=["authors"])
+    assert ArxivProvider().pushdown(query, ProviderState()) == {"types", "access", "years", "fields"}
+    scoped = ProviderState(cursor="200", extra={"search_query": "au:graph AND au:neural"})
+    assert ArxivProvider().pushdown(query, scoped) == {"types", "access", "years", "fields"}
+    assert ArxivProvider().pushdown(query, ProviderState(cursor="200")) == {"types", "access"}
+    query.extra = {**query.extra, "arxiv_window_results": "10000"}
+    assert ArxivProvider().pushdown(query, ProviderState()) == {"types", "access", "years", "fields"}
+
+
+def test_arxiv_skips_queries_that_exclude_preprints(tmp_path):
+    assert list(ArxivProvider().search(_query(tmp_path, access_filter="closed"), ProviderState())) == []
+    assert list(ArxivProvider().search(_query(tmp_path, types=["book"]), ProviderState())) == []
+
+
+def test_residual_filter_applies_and_counts_local_constraints(tmp_path):
+    query = _query(tmp_path, year_start=2020, languages=["English"], fields_to_search=["title"])
+    residual = ResidualFilter(query, {"years"})
+    keep = PaperRecord(title="Graph Neural Networks", year="2021")
+    assert residual.matches(RawRecord(provider="X", data={"language": "en"}), keep)
+    assert not residual.matches(RawRecord(provider="X", data={"language": "de"}), keep)
+    assert not residual.matches(RawRecord(provider="X", data={}), PaperRecord(title="Graphs", year="2021"))
+    assert residual.dropped == {"languages": 1, "fields": 1}
+    assert residual.summary() == (
+        "server-side: years; local: fields, languages; filtered locally 2 of 3 (fields=1, languages=1)"
+    )
+
+
+class _TypedProvider(Provider):
+    name = "Typed"
+    requires_credentials = False
+    credential_fields: list[str] = []
+
+    def is_configured(self, config):
+        return True
+
+    def setup_instructions(self):
+        return []
+
+    def search(self, query, state):
+        for idx, kind in enumerate(["journal-article", "book", "journal-article"]):
+            yield RawRecord(provider=self.name, data={"type": kind}, record_id=f"r{idx}")
+
+    def normalize(self, raw):
+        return PaperRecord(id=raw.record_id or "", origin=self.name, type=raw.data["type"])
+
+    def get_official_urls(self, record):
+        return {"landing_url": record.url, "pdf_url": None}
+
+    def rate_limit_policy(self):
+        return RateLimitPolicy()
+
+
+@pytest.mark.parametrize("parallel", [False, True])
+def test_pipeline_filters_what_providers_do_not_push_down(tmp_path, parallel, caplog):
+    query = _query(tmp_path, types=["journal-article"], parallel_providers=parallel)
+    count, _reason = run_metasearch(query, [_TypedProvider()], {}, console=Console(quiet=True))
+    assert count == 2
+    conn = sqlite3.connect(tmp_path / "state.sqlite")
+    assert {row[0] for row in conn.execute("SELECT type FROM records")} == {"journal-article"}
+    conn.close()
+    assert "Typed filters: server-side: none; local: types; filtered locally 1 of 3 (types=1)" in caplog.text
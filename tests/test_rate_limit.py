@@ -0,0 +1,62 @@
+import pytest
+
+from papyr.core.rate_limit import _MemoryBuckets, _SqliteBuckets, rate_limit_store_path
+
+
+def test_memory_bucket_allows_burst_then_spaces_calls():
+    buckets = _MemoryBuckets()
+    delays = [buckets.reserve("Crossref", rate=1.0, capacity=2.0, now=100.0) for _ in range(4)]
+    assert delays == [0.0, 0.0, pytest.approx(1.0), pytest.approx(2.0)]
+
+
+def test_sqlite_bucket_is_shared_between_stores(tmp_path):
+    path = tmp_path / "rate_limits.sqlite"
+    first = _SqliteBuckets(path)
+    second = _SqliteBuckets(path)
+    assert first.reserve("arXiv", rate=1 / 3, capacity=1.0, now=50.0) == 0.0
+    assert second.reserve("arXiv", rate=1 / 3, capacity=1.0, now=50.0) == pytest.approx(3.0)
+    assert second.reserve("Crossref", rate=1.0, capacity=1.0, now=50.0) == 0.0
+
+
+def test_rate_limit_store_can_be_disabled(tmp_path):
+    assert rate_limit_store_path({"rate_limit_db": "off"}) is None
+    assert rate_limit_store_path({"rate_limit_db": str(tmp_path / "x.sqlite")}) == tmp_path / "x.sqlite"
+
+
+class _Resp:
+    def __init__(self, headers):
+        self.headers = headers
+
+
+def _pacer(saved=None, min_delay=1.0):
+    from papyr.core.models import RateLimitPolicy
+    from papyr.core.rate_limit import AdaptivePacer, shared_limiter
+
+    policy = RateLimitPolicy(min_delay_seconds=min_delay)
+    return AdaptivePacer(shared_limiter("test", policy), policy, saved)
+
+
+def test_pacer_halves_rate_and_honors_retry_after():
+    pacer = _pacer(min_delay=3.0)
+    assert pacer.throttled(_Resp({})) == pytest.approx(6.0)
+    assert pacer.throttled(_Resp({"Retry-After": "20"})) == 20.0
+    assert pacer.interval == pytest.approx(12.0)
+    pacer.succeeded(_Resp({}))
+    assert 3.0 <= pacer.interval < 12.0
+
+
+def test_pacer_never_goes_below_the_policy_delay_for_generous_headers():
+    pacer = _pacer(min_delay=1.0)
+    for _ in range(20):
+        pacer.succeeded(_Resp({"X-Rate-Limit-Limit": "50", "X-Rate-Limit-Interval": "1s"}))
+    assert pacer.interval == pytest.approx(1.0)
+    resumed = _pacer(saved={"interval": 0.02, "min_interval": 0.02}, min_delay=1.0)
+    assert resumed.interval == pytest.approx(1.0)
+
+
+def test_pacer_uses_stricter_crossref_limit_headers_and_resumes_from_snapshot():
+    pacer = _pacer(min_delay=1.0)
+    pacer.succeeded(_Resp({"X-Rate-Limit-Limit": "1", "X-Rate-Limit-Interval": "5s"}))
+    assert pacer.interval == pytest.approx(5.0)
+    resumed = _pacer(saved=pacer.snapshot(), min_delay=1.0)
+    assert resumed.interval == pytest.approx(5.0)
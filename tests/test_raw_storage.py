@@ -0,0 +1,43 @@
+from papyr.core.models import PaperRecord, RawRecord
+from papyr.core.state import db, repo
+from papyr.core.state.raw_codec import RawPolicy
+
+
+def _run(tmp_path):
+    conn = db.connect(tmp_path / "state.sqlite")
+    db.init_db(conn)
+    return conn, repo.create_run(conn, "hash1", {"keywords": "test"})
+
+
+def _raw(idx):
+    return RawRecord(provider="Crossref", data={"reference": ["x" * 200] * 5}, record_id=f"10.1/{idx}")
+
+
+def test_raw_payloads_are_compressed_and_read_back(tmp_path):
+    conn, run_id = _run(tmp_path)
+    row_id = repo.insert_record(conn, run_id, "Crossref", _raw(0), PaperRecord(id="10.1/0"))
+    stored = conn.execute("SELECT raw_json, raw_codec FROM records WHERE id=?", (row_id,)).fetchone()
+    assert stored["raw_codec"] == "zlib"
+    assert len(stored["raw_json"]) < len(_raw(0).model_dump_json())
+    assert repo.get_raw_record(conn, row_id) == _raw(0)
+
+
+def test_compact_recodes_legacy_rows_and_applies_retention(tmp_path):
+    conn, run_id = _run(tmp_path)
+    with conn:
+        repo.insert_records(conn, run_id, [("Crossref", _raw(0), PaperRecord(id="10.1/0"))], RawPolicy(codec="none"))
+    row_id = repo.last_record_row_id(conn, run_id)
+    assert conn.execute("SELECT raw_codec FROM records").fetchone()["raw_codec"] is None
+
+    assert repo.compact_raw(conn, RawPolicy(codec="zlib")) == (1, 0)
+    assert repo.get_raw_record(conn, row_id) == _raw(0)
+    assert repo.compact_raw(conn, RawPolicy(codec="zlib", retention="none")) == (0, 1)
+    assert repo.get_raw_record(conn, row_id) is None
+
+
+def test_retention_none_skips_raw_storage(tmp_path):
+    conn, run_id = _run(tmp_path)
+    with conn:
+        repo.insert_records(conn, run_id, [("Crossref", _raw(0), PaperRecord(id="10.1/0"))], RawPolicy(retention="none"))
+    assert repo.get_raw_record(conn, repo.last_record_row_id(conn, run_id)) is None
+    assert RawPolicy(retention="days:30").retention_days == 30
@@ -0,0 +1,103 @@
+import json
+
+import pytest
+import requests
+from rich.console import Console
+from rich.progress import Progress
+
+from papyr.adapters.crossref import CrossrefProvider, RelevanceCutoff
+from papyr.core.models import ProviderState, SearchQuery
+from papyr.core.pipeline import SearchProgress
+
+# Scores decay from 100 by 1 per work over 1000 matching works.
+WORKS = [{"DOI": f"10.1/{idx}", "score": 100.0 - idx} for idx in range(1000)]
+
+
+def _response(payload):
+    resp = requests.Response()
+    resp.status_code = 200
+    resp.url = "https://api.crossref.org/works"
+    resp._content = json.dumps(payload).encode("utf-8")
+    return resp
+
+
+@pytest.fixture
+def calls(monkeypatch):
+    monkeypatch.setattr("papyr.core.rate_limit.time.sleep", lambda seconds: None)
+    calls = []
+
+    def fake_get(self, url, params=None, **kwargs):
+        calls.append(dict(params))
+        offset = 0 if params["cursor"] == "*" else int(params["cursor"].split(":")[1])
+        page = WORKS[offset : offset + params["rows"]]
+        message = {"items": page, "next-cursor": f"c:{offset + len(page)}", "total-results": len(WORKS)}
+        return _response({"message": message})
+
+    monkeypatch.setattr("requests.Session.get", fake_get)
+    return calls
+
+
+def _query(tmp_path, **extra):
+    return SearchQuery(
+        keywords="x",
+        output_dir=str(tmp_path),
+        extra={"rate_limit_db": "off", "prefetch_pages": "0", "crossref_score_window": "10", **extra},
+    )
+
+
+def test_cutoff_uses_rolling_mean_against_ratio_of_top_score():
+    cutoff = RelevanceCutoff(min_ratio=0.5, window=4)
+    results = [cutoff.add(score) for score in (10, 8, 6, 4, 2, 1)]
+    assert results == [False, False, False, False, False, True]
+    assert cutoff.top == 10
+    assert cutoff.threshold == 5
+
+    restored = RelevanceCutoff(min_ratio=0.5, window=4, snapshot=cutoff.snapshot())
+    assert restored.reached and restored.position == 6
+
+
+def test_projection_extrapolates_decay():
+    cutoff = RelevanceCutoff(min_score=50, window=10)
+    for work in WORKS[:20]:
+        cutoff.add(work["score"])
+    # Mean of the last ten is 85.5; 14.5 points of decay over 20 works puts a score of 50 near 69.
+    assert cutoff.projected() == 69
+
+
+def test_search_stops_once_scores_decay(calls, tmp_path):
+    state = ProviderState()
+    query = _query(tmp_path, crossref_min_score_ratio="0.6")
+
+    records = list(CrossrefProvider().search(query, state))
+
+    # The rolling mean of ten works first falls below 60 at the work scored 55.
+    assert len(records) == 46
+    assert len(calls) == 1
+    assert "score" in calls[0]["select"].split(",")
+    assert CrossrefProvider().normalize(records[0]).score == "100.0"
+    assert state.extra["estimate"] == 46
+    assert state.extra["relevance"]["top"] == 100.0
+
+
+def test_no_cutoff_when_not_sorted_by_relevance(calls, tmp_path):
+    query = _query(tmp_path, crossref_min_score_ratio="0.6")
+    query.sort_order = "citations"
+    state = ProviderState()
+
+    assert len(list(CrossrefProvider().search(query, state))) == len(WORKS)
+    assert state.extra["estimate"] == len(WORKS)
+    assert "relevance" not in state.extra
+
+
+def test_progress_total_follows_provider_estimates():
+    with Progress(console=Console(quiet=True)) as progress:
+        task_id = progress.add_task("Searching", total=None)
+        totals = SearchProgress(progress, task_id)
+        state = ProviderState(extra={"estimate": 50})
+        for _ in range(3):
+            totals.advance("Crossref", state)
+            totals.advance("arXiv", ProviderState())
+        assert progress.tasks[0].total == 53
+
+        totals.finish("Crossref")
+        assert progress.tasks[0].total == 6
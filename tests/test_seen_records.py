@@ -0,0 +1,48 @@
+from papyr.core.models import PaperRecord, RawRecord
+from papyr.core.state import db, repo
+from papyr.core.state.seen import SeenRecords
+from papyr.core.state.writer import StateWriter
+from papyr.util.bloom import BloomFilter
+
+
+def _raw(record_id):
+    return RawRecord(provider="Crossref", data={}, record_id=record_id)
+
+
+def test_unique_index_skips_records_already_stored(tmp_path):
+    conn = db.connect(tmp_path / "state.sqlite")
+    db.init_db(conn)
+    run_id = repo.create_run(conn, "hash1", {"keywords": "test"})
+    first = repo.insert_record(conn, run_id, "Crossref", _raw("10.1/a"), PaperRecord(id="10.1/a"))
+    assert repo.insert_record(conn, run_id, "Crossref", _raw("10.1/a"), PaperRecord(id="10.1/a")) == first
+    with conn:
+        assert repo.insert_records(conn, run_id, [("Crossref", _raw("10.1/a"), PaperRecord(id="10.1/a"))]) == 0
+    assert repo.count_records(conn, run_id) == 1
+
+
+def test_seen_records_checks_writer_buffer_and_database(tmp_path):
+    conn = db.connect(tmp_path / "state.sqlite")
+    db.init_db(conn)
+    run_id = repo.create_run(conn, "hash1", {"keywords": "test"})
+    repo.insert_record(conn, run_id, "Crossref", _raw("10.1/stored"), PaperRecord(id="10.1/stored"))
+    writer = StateWriter(conn, run_id)
+    seen = SeenRecords(conn, run_id, writer, bloom_capacity=1000)
+
+    assert seen.seen("Crossref", "10.1/stored")
+    assert not seen.seen("arXiv", "10.1/stored")
+    assert not seen.seen("Crossref", "10.1/new")
+    writer.add_record("Crossref", _raw("10.1/new"), PaperRecord(id="10.1/new"))
+    seen.add("Crossref", "10.1/new")
+    assert seen.seen("Crossref", "10.1/new")
+    writer.flush()
+    assert seen.seen("Crossref", "10.1/new")
+
+
+def test_bloom_filter_has_no_false_negatives():
+    bloom = BloomFilter(500, error_rate=0.01)
+    keys = [f"key-{idx}" for idx in range(500)]
+    for key in keys:
+        bloom.add(key)
+    assert all(key in bloom for key in keys)
+    false_positives = sum(f"other-{idx}" in bloom for idx in range(5000))
+    assert false_positives < 150
@@ -0,0 +1,41 @@
+from papyr.core.models import PaperRecord, ProviderState, RawRecord
+from papyr.core.state import db, repo
+from papyr.core.state.writer import StateWriter
+
+
+def _raw(record_id):
+    return RawRecord(provider="Crossref", data={}, record_id=record_id)
+
+
+def test_writer_batches_until_threshold(tmp_path):
+    conn = db.connect(tmp_path / "state.sqlite")
+    db.init_db(conn)
+    run_id = repo.create_run(conn, "hash1", {"keywords": "test"})
+    writer = StateWriter(conn, run_id, max_rows=3, max_delay_ms=60_000)
+
+    for record_id in ("a", "b"):
+        writer.add_record("Crossref", _raw(record_id), PaperRecord(id=record_id))
+        assert not writer.maybe_flush()
+    assert repo.count_records(conn, run_id) == 0
+
+    writer.add_record("Crossref", _raw("c"), PaperRecord(id="c"))
+    assert writer.maybe_flush()
+    assert repo.list_record_ids(conn, run_id) == {"a", "b", "c"}
+
+
+def test_writer_commits_cursor_with_page_records(tmp_path):
+    conn = db.connect(tmp_path / "state.sqlite")
+    db.init_db(conn)
+    run_id = repo.create_run(conn, "hash1", {"keywords": "test"})
+    writer = StateWriter(conn, run_id, max_rows=100, max_delay_ms=60_000)
+    state = ProviderState()
+    writer.track_state("Crossref", state)
+
+    writer.add_record("Crossref", _raw("a"), PaperRecord(id="a"))
+    assert not writer.maybe_flush()
+    state.cursor = "page-2"
+    assert writer.maybe_flush()
+
+    stored = repo.get_provider_state(conn, run_id, "Crossref")
+    assert stored is not None and stored.cursor == "page-2"
+    assert repo.list_record_ids(conn, run_id) == {"a"}